@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+import time
+import zipfile
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# 拡張子ごとの圧縮レベルが指定されていない場合の圧縮レベル
+DEFAULT_COMPRESS_LEVEL = 6
+
+
+def archive_file_path(delivery_root, job_name: str = None) -> str:
+    """
+    ZIP形式で納品する場合の出力先ファイルパス。
+    納品先ルートと同じ場所に "<納品先ルート>.zip" ([Job:<ジョブ名>] の場合は
+    "<納品先ルート>.<ジョブ名>.zip") として作成する。
+    """
+
+    root = os.path.normpath(str(delivery_root))
+    if job_name is None:
+        return f"{root}.zip"
+    return f"{root}.{job_name}.zip"
+
+
+class ZipWriter:
+    """
+    納品物を、フォルダにコピーする代わりにZIPファイルへ直接書き込む。
+
+    ZIP内のエントリ名は、フォルダで納品した場合の納品先ルートからの相対パスと同じになる
+    (例: "030.調査/成果物/レビュー記録表_調査.xlsx")。ディレクトリのエントリも作成する。
+
+    ファイルは少しずつ読みながら書き込むため、ZIPファイルやファイルの大きさに関係なく
+    メモリ使用量は一定である。書き込み中は "<出力先>.tmp" に書き、close() で置き換える
+    (途中で失敗した場合に、前回の正常なZIPファイルを壊さない)。
+
+    使い方:
+        with ZipWriter("納品物.zip", {".xlsx": 0, "*": 6}) as writer:
+            writer.add(src_path, "030.調査/調査検討書_A.xlsx")
+    """
+
+    def __init__(self, archive_path, compression: Dict[str, int] = None):
+        """
+        Args:
+            archive_path: 出力先のZIPファイルのパス
+            compression (dict): 拡張子 (".xlsx" など小文字) -> 圧縮レベル (0は無圧縮で格納)。
+                "*" はその他の拡張子
+        """
+
+        self.archive_path = str(archive_path)
+        self._tmp_path = f"{self.archive_path}.tmp"
+        self._compression = compression or {}
+        self._zip = zipfile.ZipFile(
+            self._tmp_path, "w", allowZip64=True, strict_timestamps=False
+        )
+        self._dirs = set()
+        # ZipFile は複数スレッドからの同時書き込みに対応していないため、書き込みを直列化する
+        self._lock = threading.Lock()
+
+    def compress_level(self, arcname: str) -> int:
+        """エントリ名の拡張子に対応する圧縮レベル"""
+
+        extension = os.path.splitext(arcname)[1].lower()
+        level = self._compression.get(extension)
+        if level is None:
+            level = self._compression.get("*", DEFAULT_COMPRESS_LEVEL)
+        return level
+
+    def add(self, src: str, arcname: str):
+        """
+        ファイルを1つZIPに追加する。copy_executor のコピー関数と同じ (src, dst) の形で呼べる。
+
+        Args:
+            src (str): 追加するファイルのパス
+            arcname (str): ZIP内のエントリ名 ("/" 区切り)
+
+        Returns:
+            None (内容のハッシュは計算しない)
+        """
+
+        level = self.compress_level(arcname)
+        with self._lock:
+            self._add_parent_dirs(arcname)
+            if level == 0:
+                self._zip.write(src, arcname, compress_type=zipfile.ZIP_STORED)
+            else:
+                self._zip.write(
+                    src,
+                    arcname,
+                    compress_type=zipfile.ZIP_DEFLATED,
+                    compresslevel=level,
+                )
+        return None
+
+    def close(self, commit: bool = True):
+        """
+        ZIPファイルを書き終える。commit が False の場合は書きかけのファイルを削除する。
+        """
+
+        self._zip.close()
+        if commit:
+            os.replace(self._tmp_path, self.archive_path)
+        else:
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(commit=exc_type is None)
+
+    def _add_parent_dirs(self, arcname: str):
+        """エントリの親ディレクトリのエントリを、まだなければ作成する"""
+
+        parts = arcname.split("/")[:-1]
+        for i in range(1, len(parts) + 1):
+            dir_name = "/".join(parts[:i]) + "/"
+            if dir_name in self._dirs:
+                continue
+            self._dirs.add(dir_name)
+            info = zipfile.ZipInfo(dir_name, time.localtime()[:6])
+            info.external_attr = (0o40755 << 16) | 0x10  # ディレクトリ属性
+            self._zip.writestr(info, b"")
@@ -0,0 +1,94 @@
+###############################################################
+#
+# 納品物の差分 (delta) のベンチマーク
+#
+# 件数の多いマニフェストを2つ作成し、delta.compare による比較の所要時間を計測する。
+# 新しい方は、古い方の一部のファイルを変更・削除・追加・名前変更したもの。
+#
+# 実行ディレクトリ
+# delivery_automation_tool
+#
+# 実行コマンド
+# python benchmarks/bench_delta.py [--entries 1000000] [--change-rate 0.01]
+#
+##############################################################
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import delta  # noqa: E402
+import manifest  # noqa: E402
+
+
+def build_manifests(base: Path, entries: int, change_rate: float) -> tuple:
+    """
+    古い納品物と新しい納品物のマニフェストを作成する。
+
+    Returns:
+        tuple[Path, Path]: 古い方と新しい方のマニフェストのパス
+    """
+
+    step = max(1, int(1 / change_rate)) if change_rate > 0 else entries + 1
+    old_entries = {}
+    new_entries = {}
+    for i in range(entries):
+        path = f"{i % 10 * 10 + 30:03d}.phase/成果物/{i // 1000:05d}/file_{i:08d}.xlsx"
+        sha256 = f"{i:064x}"
+        entry = manifest.ManifestEntry(path, f"/teams/{path}", i, i, sha256)
+        old_entries[path] = entry
+        kind = i // step % 4 if i % step == 0 else None
+        if kind == 0:
+            # 変更
+            new_entries[path] = entry._replace(size=i + 1, sha256=f"{i + 1:064x}x")
+        elif kind == 1:
+            # 削除
+            continue
+        elif kind == 2:
+            # 名前の変更
+            renamed = path.replace("file_", "renamed_")
+            new_entries[renamed] = entry._replace(path=renamed)
+        else:
+            new_entries[path] = entry
+            if kind == 3:
+                # 追加
+                added = path.replace("file_", "added_")
+                new_entries[added] = entry._replace(path=added, sha256=None)
+
+    old_path = base / "old.jsonl"
+    new_path = base / "new.jsonl"
+    manifest.Manifest(old_path, old_entries).save()
+    manifest.Manifest(new_path, new_entries).save()
+    return old_path, new_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="納品物の差分のベンチマーク")
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--change-rate", type=float, default=0.01)
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp())
+    try:
+        old_path, new_path = build_manifests(tmp_dir, args.entries, args.change_rate)
+        start = time.perf_counter()
+        result = delta.compare(
+            delta.read_snapshot(old_path), delta.read_snapshot(new_path)
+        )
+        elapsed = time.perf_counter() - start
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    print(
+        f"{args.entries}件: {elapsed:.2f} 秒 (追加 {len(result.added)}, 削除 {len(result.removed)},"
+        f" 変更 {len(result.modified)}, 名前変更 {len(result.renamed)}, 変更なし {result.unchanged})"
+    )
+
+
+if __name__ == "__main__":
+    main()
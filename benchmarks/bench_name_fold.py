@@ -0,0 +1,107 @@
+###############################################################
+#
+# ファイル名の正規化 (NFC + 大文字小文字の同一視) のベンチマーク
+#
+# ASCII・NFC・NFD (macOS で同期した Teams フォルダの形) のファイル名を混ぜて作成し、
+# 正規化なし (str.casefold のみ) と rule_engine.fold_name / fold_name_width、
+# および正規化を含めた照合全体の所要時間を比較する。
+#
+# 実行ディレクトリ
+# delivery_automation_tool
+#
+# 実行コマンド
+# python benchmarks/bench_name_fold.py [--names 500000]
+#
+##############################################################
+
+import argparse
+import sys
+import time
+import unicodedata
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import config_manager  # noqa: E402
+import rule_engine  # noqa: E402
+
+# (フェーズ, 成果物か, ファイル名の先頭) の組。濁点・半濁点を含む名前は NFD で長さが変わる
+_SAMPLES = (
+    ("030.調査", False, "調査検討書_"),
+    ("030.調査", True, "レビュー記録表_調査_"),
+    ("060.UD作成", False, "単体試験仕様書_"),
+    ("080.SD作成", True, "レビュー記録表_SD作成_"),
+)
+
+
+def build_names(count: int) -> list:
+    """ASCII・NFC・NFD のファイル名を 1/3 ずつ含む (フェーズ, 成果物か, ファイル名) のリストを作成する"""
+
+    names = []
+    for i in range(count):
+        phase, is_artifact, prefix = _SAMPLES[i % len(_SAMPLES)]
+        kind = i % 3
+        if kind == 0:
+            name = f"file_{i:08d}.xlsx"
+        else:
+            name = f"{prefix}{i:08d}.xlsx"
+            if kind == 2:
+                name = unicodedata.normalize("NFD", name)
+        names.append((phase, is_artifact, name))
+    return names
+
+
+def measure(label: str, func, names: list) -> float:
+    start = time.perf_counter()
+    for phase, is_artifact, name in names:
+        func(phase, is_artifact, name)
+    elapsed = time.perf_counter() - start
+    print(f"{label}: {elapsed:.3f} 秒 ({elapsed / len(names) * 1e9:.0f} ns/件)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ファイル名の正規化のベンチマーク")
+    parser.add_argument("--names", type=int, default=500_000)
+    args = parser.parse_args()
+
+    names = build_names(args.names)
+    rules = rule_engine.RuleEngine(config_manager.DEFAULT_MAPPINGS)
+    wide_rules = rule_engine.RuleEngine(
+        config_manager.DEFAULT_MAPPINGS, rule_engine.fold_name_width
+    )
+
+    print(f"{args.names}件 (ASCII・NFC・NFD を 1/3 ずつ)")
+    base = measure(
+        "str.casefold のみ", lambda phase, is_artifact, name: name.casefold(), names
+    )
+    fold = measure(
+        "fold_name", lambda phase, is_artifact, name: rule_engine.fold_name(name), names
+    )
+    measure(
+        "fold_name_width",
+        lambda phase, is_artifact, name: rule_engine.fold_name_width(name),
+        names,
+    )
+    measure(
+        "照合 (fold_name)",
+        lambda phase, is_artifact, name: rules.match(phase, is_artifact, name),
+        names,
+    )
+    measure(
+        "照合 (fold_name_width)",
+        lambda phase, is_artifact, name: wide_rules.match(phase, is_artifact, name),
+        names,
+    )
+    print(f"正規化による増加: {fold - base:.3f} 秒")
+
+    matched = sum(
+        1
+        for phase, is_artifact, name in names
+        if rules.match(phase, is_artifact, name) is not None
+    )
+    print(f"合致: {matched}件")
+
+
+if __name__ == "__main__":
+    main()
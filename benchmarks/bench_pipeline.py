@@ -0,0 +1,272 @@
+###############################################################
+#
+# 納品処理全体のベンチマーク
+#
+# tree_generator.py で作成したダミーのTeamsフォルダを使い、次の各段階を
+# 個別に、および process_files 全体 (end_to_end) として計測する。
+#   walk  : フェーズフォルダ配下の走査 (walker.walk_phase_tree)
+#   match : 走査結果とマッチング条件の照合 (rule_engine.RuleEngine.match)
+#   copy  : コピー計画の実行 (file_processor.execute_plan)
+#   tree  : ツリーの出力 (tree_report.write_tree_report)
+#
+# 結果はJSONで出力でき、保存済みの結果 (ベースライン) と比較して
+# 遅くなった段階があれば終了コード1で終了する。
+#
+# 実行ディレクトリ
+# delivery_automation_tool
+#
+# 実行コマンド
+# python benchmarks/bench_pipeline.py [--preset large] [--repeat 3]
+#     [--output 結果.json] [--baseline ベースライン.json --tolerance 0.2]
+#
+##############################################################
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import file_processor  # noqa: E402
+import rule_engine  # noqa: E402
+import tree_report  # noqa: E402
+import walker  # noqa: E402
+import tree_generator  # noqa: E402
+
+RESULT_VERSION = 1
+STAGES = ("walk", "match", "copy", "tree", "end_to_end")
+
+# ベースラインとの比較で、この秒数未満の差は誤差として扱う
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def time_stage(func, repeat: int, setup=None) -> dict:
+    """
+    func を repeat 回実行し、所要時間を集計する。setup は各回の前に実行する (計測しない)。
+
+    Returns:
+        dict: seconds (最小値), median (中央値), runs (各回), items (func の戻り値)
+    """
+
+    runs = []
+    items = 0
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        items = func()
+        runs.append(time.perf_counter() - start)
+    seconds = min(runs)
+    return {
+        "seconds": seconds,
+        "median": statistics.median(runs),
+        "runs": runs,
+        "items": items,
+        "items_per_sec": items / seconds if seconds > 0 else None,
+    }
+
+
+def run_benchmark(src_root: Path, work_dir: Path, config: dict, repeat: int) -> dict:
+    """
+    各段階を計測する。
+
+    Args:
+        src_root (Path): 計測に使うTeamsルートフォルダ
+        work_dir (Path): コピー先などに使う作業フォルダ
+        config (dict): process_files に渡す設定 (パス以外)
+        repeat (int): 各段階の実行回数
+
+    Returns:
+        dict: 段階名 -> time_stage の結果
+    """
+
+    rules = rule_engine.RuleEngine(config["mappings"])
+    dst_root = work_dir / "delivery"
+    path_config = dict(config, teams_root_path=src_root, delivery_root_path=dst_root)
+
+    def reset_delivery():
+        shutil.rmtree(dst_root, ignore_errors=True)
+
+    stages = {}
+
+    def walk():
+        return sum(1 for _ in walker.walk_phase_tree(src_root, rules.phases))
+
+    stages["walk"] = time_stage(walk, repeat)
+
+    records = list(walker.walk_phase_tree(src_root, rules.phases))
+
+    def match():
+        return sum(
+            1
+            for record in records
+            if rules.match(record.phase, record.is_artifact, record.entry.name)
+        )
+
+    stages["match"] = time_stage(match, repeat)
+
+    ops = list(file_processor.plan_delivery(path_config, rules, records, {}))
+    delivered = []
+
+    def copy():
+        summary = file_processor.execute_plan(path_config, ops)
+        delivered[:] = summary.delivered
+        return summary.copied
+
+    stages["copy"] = time_stage(copy, repeat, setup=reset_delivery)
+
+    tree_path = work_dir / "tree.txt"
+
+    def tree():
+        tree_report.write_tree_report(tree_path, [(str(dst_root), delivered)])
+        return len(delivered)
+
+    stages["tree"] = time_stage(tree, repeat)
+
+    def end_to_end():
+        summary = file_processor.process_files(path_config, rules)
+        tree_report.write_tree_report(tree_path, [(str(dst_root), summary.delivered)])
+        return summary.copied
+
+    stages["end_to_end"] = time_stage(end_to_end, repeat, setup=reset_delivery)
+    return stages
+
+
+def compare_with_baseline(result: dict, baseline: dict, tolerance: float) -> list:
+    """
+    ベースラインと比較し、遅くなった段階を返す。
+
+    Returns:
+        list[tuple[str, float, float]]: (段階名, ベースラインの秒数, 今回の秒数)
+    """
+
+    if baseline.get("spec") != result["spec"]:
+        print("警告: ベースラインとツリーの条件が異なります。比較結果は参考値です。")
+
+    regressions = []
+    for stage, current in result["stages"].items():
+        base = baseline.get("stages", {}).get(stage)
+        if base is None:
+            continue
+        before, after = base["seconds"], current["seconds"]
+        ratio = after / before if before > 0 else float("inf")
+        marker = ""
+        if after > before * (1 + tolerance) and after - before > MIN_REGRESSION_SECONDS:
+            regressions.append((stage, before, after))
+            marker = "  <-- 低下"
+        print(
+            f"{stage:<10} {before:>9.3f} 秒 -> {after:>9.3f} 秒 ({ratio:.2f}倍){marker}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="納品処理全体のベンチマーク")
+    parser.add_argument(
+        "--root",
+        type=Path,
+        help="計測に使う既存のTeamsフォルダ。省略時はダミーのツリーを一時フォルダに作成する",
+    )
+    tree_generator.add_spec_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3, help="各段階の実行回数")
+    parser.add_argument("--copy-workers", type=int, default=4)
+    parser.add_argument("--hash-files", action="store_true")
+    parser.add_argument("--output", type=Path, help="結果 (JSON) の出力先")
+    parser.add_argument("--baseline", type=Path, help="比較するベースライン (JSON)")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="ベースラインより何割遅くなったら低下とみなすか (既定: 0.2)",
+    )
+    args = parser.parse_args()
+
+    # 計測中の進捗表示とログは捨てる (表示の時間を計測に含めない)
+    logging.disable(logging.WARNING)
+
+    spec = tree_generator.spec_from_args(args)
+    config = {
+        "mappings": spec.mappings,
+        "copy_workers": args.copy_workers,
+        "hash_files": args.hash_files,
+    }
+
+    work_dir = Path(tempfile.mkdtemp())
+    try:
+        src_root = args.root
+        tree_info = None
+        if src_root is None:
+            src_root = work_dir / "teams"
+            start = time.perf_counter()
+            generated = tree_generator.generate_tree(src_root, spec)
+            tree_info = dict(
+                dirs=generated.dirs,
+                files=generated.files,
+                bytes=generated.bytes,
+                expected_matches=generated.expected_matches,
+                generate_seconds=time.perf_counter() - start,
+            )
+            print(
+                f"ツリー作成: フォルダ {generated.dirs} / ファイル {generated.files}"
+                f" / 納品対象 {generated.expected_matches}"
+                f" ({tree_info['generate_seconds']:.1f} 秒)"
+            )
+
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            stages = run_benchmark(src_root, work_dir, config, args.repeat)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    spec_dict = asdict(spec)
+    spec_dict.pop("mappings")
+    result = {
+        "version": RESULT_VERSION,
+        "spec": spec_dict if args.root is None else {"root": str(args.root)},
+        "config": {k: v for k, v in config.items() if k != "mappings"},
+        "tree": tree_info,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "stages": stages,
+    }
+
+    for stage in STAGES:
+        s = stages[stage]
+        per_sec = f"{s['items_per_sec']:,.0f} 件/秒" if s["items_per_sec"] else "-"
+        print(
+            f"{stage:<10} {s['seconds']:>9.3f} 秒 (中央値 {s['median']:.3f} 秒)"
+            f"  {s['items']:>8} 件  {per_sec}"
+        )
+
+    if args.output:
+        args.output.write_text(
+            json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        print(f"結果を出力しました: {args.output}")
+
+    if args.baseline:
+        print("--- ベースラインとの比較 ---")
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_with_baseline(result, baseline, args.tolerance)
+        if regressions:
+            print(
+                f"性能が低下した段階があります: {', '.join(r[0] for r in regressions)}"
+            )
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+###############################################################
+#
+# 走査 (walk) のベンチマーク
+#
+# 従来の os.walk による全体走査と、walker.walk_phase_tree による
+# 枝刈り走査とで、訪問したディレクトリ数と所要時間を比較する。
+#
+# 実行ディレクトリ
+# delivery_automation_tool
+#
+# 実行コマンド
+# python benchmarks/bench_walker.py [--root 既存のTeamsフォルダ]
+#
+#   --root を省略した場合は、一時ディレクトリにダミーのツリーを作成して計測する。
+#
+##############################################################
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import walker  # noqa: E402
+from config_manager import DEFAULT_MAPPINGS  # noqa: E402
+
+# 既定のマッピングに含まれるフェーズフォルダ名
+PHASES = frozenset(phase for _, phase, _ in DEFAULT_MAPPINGS)
+
+
+def build_sample_tree(base: Path, noise_dirs: int, files_per_dir: int):
+    """
+    フェーズフォルダと、納品に関係のない大きなフォルダ (アーカイブ・会議録画など) を持つ
+    ダミーのツリーを作成する。
+    """
+
+    for phase in sorted(PHASES):
+        artifact_dir = base / phase / "成果物" / "内部"
+        artifact_dir.mkdir(parents=True)
+        (base / phase / "作業中").mkdir()
+        for i in range(files_per_dir):
+            (base / phase / f"資料_{i}.xlsx").touch()
+            (artifact_dir / f"レビュー記録表_{i}.xlsx").touch()
+
+    for top in ("アーカイブ", "会議の録画", "共有資料"):
+        for i in range(noise_dirs):
+            noise_dir = base / top / f"{i:04d}" / "sub"
+            noise_dir.mkdir(parents=True)
+            for j in range(files_per_dir):
+                (noise_dir / f"file_{j}.txt").touch()
+
+
+def bench_os_walk(root) -> tuple:
+    """従来方式: os.walkで全ディレクトリを列挙する"""
+
+    start = time.perf_counter()
+    dirs = 0
+    for _ in os.walk(root):
+        dirs += 1
+    return dirs, time.perf_counter() - start
+
+
+def bench_walker(root) -> tuple:
+    """新方式: フェーズフォルダ以外を枝刈りしながら走査する"""
+
+    start = time.perf_counter()
+    stats = walker.WalkStats()
+    for _ in walker.walk_phase_tree(root, PHASES, stats):
+        pass
+    return stats, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="走査のベンチマーク")
+    parser.add_argument("--root", type=Path, help="計測対象のTeamsルートフォルダ")
+    parser.add_argument("--noise-dirs", type=int, default=500)
+    parser.add_argument("--files-per-dir", type=int, default=5)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    root = args.root
+    if root is None:
+        tmp_dir = Path(tempfile.mkdtemp())
+        root = tmp_dir
+        build_sample_tree(root, args.noise_dirs, args.files_per_dir)
+
+    try:
+        walk_dirs, walk_time = bench_os_walk(root)
+        stats, walker_time = bench_walker(root)
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+
+    print(f"os.walk       : 訪問ディレクトリ {walk_dirs:>8} / {walk_time:.3f} 秒")
+    print(
+        f"walk_phase_tree: 訪問ディレクトリ {stats.dirs_visited:>8} / {walker_time:.3f} 秒"
+        f" (枝刈り {stats.dirs_pruned}, 対象ファイル {stats.files_yielded})"
+    )
+
+
+if __name__ == "__main__":
+    main()
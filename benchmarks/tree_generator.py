@@ -0,0 +1,267 @@
+###############################################################
+#
+# ベンチマーク・テスト用のダミーのTeamsフォルダを作成する
+#
+# フェーズフォルダ (030.調査 など) と「成果物」フォルダ、作業用フォルダ、
+# 納品に関係のないフォルダ (アーカイブ・会議の録画など) を持つツリーを作成する。
+# 同じ条件 (シード値を含む) で実行すれば、常に同じツリーが作成される。
+#
+# 実行ディレクトリ
+# delivery_automation_tool
+#
+# 実行コマンド
+# python benchmarks/tree_generator.py <作成先> [--preset large] [--depth 3 --fanout 3 ...]
+#
+##############################################################
+
+import argparse
+import random
+import sys
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config_manager import DEFAULT_MAPPINGS  # noqa: E402
+from rule_engine import has_wildcard  # noqa: E402
+from walker import ARTIFACT_DIR_NAME  # noqa: E402
+
+# フェーズフォルダ配下の作業用フォルダ名 (末尾に番号を付けて使う)
+WORK_DIR_NAMES = ["作業中", "参考資料", "打合せ", "旧版", "レビュー", "検討メモ"]
+# 成果物フォルダ配下のフォルダ名
+ARTIFACT_SUBDIR_NAMES = ["内部", "外部", "第1版", "最終版", "提出用"]
+# ルート直下の、納品に関係のないフォルダ名
+NOISE_DIR_NAMES = ["アーカイブ", "会議の録画", "共有資料", "個人用", "General"]
+# どのルールにも合致しないファイル名の先頭部分
+NOISE_FILE_WORDS = ["議事録", "メモ", "下書き", "参考", "画像", "見積", "スケジュール"]
+NOISE_FILE_EXTENSIONS = [".txt", ".xlsx", ".docx", ".png", ".pdf", ".msg"]
+# 合致するファイル名に付ける拡張子 (納品物はOfficeファイルが中心)
+MATCH_FILE_EXTENSIONS = [".xlsx", ".xlsx", ".docx", ".pptx"]
+
+# 作成するツリーの大きさの目安
+#   small: 数百フォルダ・数千ファイル (既定) / large: 数万フォルダ・数十万ファイル
+PRESETS = {
+    "small": dict(depth=3, fanout=3, files_per_dir=10),
+    "large": dict(depth=4, fanout=7, files_per_dir=15, max_file_size=1024),
+}
+
+
+@dataclass
+class TreeSpec:
+    """
+    作成するツリーの条件。
+
+    Attributes:
+        depth (int): フェーズフォルダ配下のフォルダの深さ
+        fanout (int): 1つのフォルダ直下のサブフォルダ数
+        files_per_dir (int): 1つのフォルダ直下のファイル数
+        min_file_size (int): ファイルサイズの最小値 (バイト)
+        max_file_size (int): ファイルサイズの最大値 (バイト)
+        match_ratio (float): ファイル名がマッチング条件に合致する割合 (0.0-1.0)
+        noise_dirs (int): ルート直下に作成する、納品に関係のないフォルダ数
+        seed (int): 乱数のシード値
+        mappings (list): マッチング条件 (config_manager.DEFAULT_MAPPINGS と同じ形式)
+    """
+
+    depth: int = 3
+    fanout: int = 3
+    files_per_dir: int = 10
+    min_file_size: int = 0
+    max_file_size: int = 4096
+    match_ratio: float = 0.3
+    noise_dirs: int = 3
+    seed: int = 0
+    mappings: list = field(default_factory=lambda: list(DEFAULT_MAPPINGS))
+
+
+@dataclass
+class GeneratedTree:
+    """
+    作成したツリーの集計。
+
+    Attributes:
+        root (Path): ルートフォルダ
+        dirs (int): 作成したフォルダ数
+        files (int): 作成したファイル数
+        bytes (int): 作成したファイルの合計サイズ
+        expected_matches (int): 納品対象になるはずのファイル数
+    """
+
+    root: Path
+    dirs: int = 0
+    files: int = 0
+    bytes: int = 0
+    expected_matches: int = 0
+
+
+class _Generator:
+    def __init__(self, root: Path, spec: TreeSpec):
+        self.spec = spec
+        self.rng = random.Random(spec.seed)
+        self.result = GeneratedTree(root)
+        # ファイル名を一意にするための通し番号 (成果物のフラット化で同名にならないように)
+        self.serial = 0
+        payload_rng = random.Random(spec.seed + 1)
+        self.payload = bytes(payload_rng.getrandbits(8) for _ in range(65536))
+
+        # フェーズごとの、直下用・成果物用のパターン
+        self.patterns = {}
+        for pattern, phase, is_artifact in spec.mappings:
+            self.patterns.setdefault(phase, ([], []))[int(is_artifact)].append(pattern)
+
+    def generate(self) -> GeneratedTree:
+        root = self.result.root
+        root.mkdir(parents=True, exist_ok=True)
+        for phase in sorted(self.patterns):
+            top, artifact = self.patterns[phase]
+            self._fill_dir(root / phase, top, countable=True)
+            self._phase_subdirs(root / phase, artifact, self.spec.depth)
+        for i in range(self.spec.noise_dirs):
+            name = f"{NOISE_DIR_NAMES[i % len(NOISE_DIR_NAMES)]}{i // len(NOISE_DIR_NAMES) or ''}"
+            self._noise_subtree(root / name, self.spec.depth)
+        return self.result
+
+    def _phase_subdirs(self, parent: Path, artifact_patterns: list, depth: int):
+        """フェーズフォルダ直下: 先頭のサブフォルダを成果物フォルダにする"""
+
+        if depth <= 0:
+            return
+        for i in range(self.spec.fanout):
+            if i == 0:
+                self._artifact_subtree(
+                    parent / ARTIFACT_DIR_NAME, artifact_patterns, depth
+                )
+            else:
+                self._work_subtree(
+                    parent / self._dir_name(WORK_DIR_NAMES, i), artifact_patterns, depth
+                )
+
+    def _artifact_subtree(self, path: Path, patterns: list, depth: int):
+        """成果物フォルダ配下: すべての階層のファイルが納品対象になり得る"""
+
+        self._fill_dir(path, patterns, countable=True)
+        if depth > 1:
+            for i in range(self.spec.fanout):
+                self._artifact_subtree(
+                    path / self._dir_name(ARTIFACT_SUBDIR_NAMES, i), patterns, depth - 1
+                )
+
+    def _work_subtree(self, path: Path, patterns: list, depth: int):
+        """作業用フォルダ配下: 合致する名前のファイルがあっても納品対象にならない"""
+
+        self._fill_dir(path, patterns, countable=False)
+        if depth > 1:
+            for i in range(self.spec.fanout):
+                self._work_subtree(
+                    path / self._dir_name(WORK_DIR_NAMES, i), patterns, depth - 1
+                )
+
+    def _noise_subtree(self, path: Path, depth: int):
+        self._fill_dir(path, [], countable=False)
+        if depth > 1:
+            for i in range(self.spec.fanout):
+                self._noise_subtree(path / f"{i:03d}", depth - 1)
+
+    def _fill_dir(self, path: Path, patterns: list, countable: bool):
+        path.mkdir(parents=True, exist_ok=True)
+        self.result.dirs += 1
+        for _ in range(self.spec.files_per_dir):
+            self.serial += 1
+            if patterns and self.rng.random() < self.spec.match_ratio:
+                name = self._matching_name(self.rng.choice(patterns))
+                if countable:
+                    self.result.expected_matches += 1
+            else:
+                name = (
+                    f"{self.rng.choice(NOISE_FILE_WORDS)}_{self.serial}"
+                    f"{self.rng.choice(NOISE_FILE_EXTENSIONS)}"
+                )
+            self._write_file(path / name)
+
+    def _matching_name(self, pattern: str) -> str:
+        if has_wildcard(pattern):
+            return pattern.replace("*", f"{self.serial}").replace("?", "x")
+        return f"{pattern}{self.serial}{self.rng.choice(MATCH_FILE_EXTENSIONS)}"
+
+    def _write_file(self, path: Path):
+        size = self.rng.randint(self.spec.min_file_size, self.spec.max_file_size)
+        payload = self.payload
+        with open(path, "wb") as f:
+            remaining = size
+            while remaining > 0:
+                chunk = payload[: min(remaining, len(payload))]
+                f.write(chunk)
+                remaining -= len(chunk)
+        self.result.files += 1
+        self.result.bytes += size
+
+    @staticmethod
+    def _dir_name(names: list, i: int) -> str:
+        return f"{names[i % len(names)]}_{i:02d}"
+
+
+def generate_tree(root, spec: TreeSpec = None) -> GeneratedTree:
+    """
+    ダミーのTeamsフォルダを作成する。
+
+    Args:
+        root: 作成先のルートフォルダ (存在しなければ作成する)
+        spec (TreeSpec): 作成するツリーの条件。省略時は既定値
+
+    Returns:
+        GeneratedTree: 作成したフォルダ数・ファイル数と、納品対象になるはずのファイル数
+    """
+
+    return _Generator(Path(root), spec or TreeSpec()).generate()
+
+
+def add_spec_arguments(parser: argparse.ArgumentParser):
+    """TreeSpec の各項目をコマンド引数として追加する (ベンチマークと共用)"""
+
+    defaults = TreeSpec()
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    for name in (
+        "depth",
+        "fanout",
+        "files_per_dir",
+        "min_file_size",
+        "max_file_size",
+        "noise_dirs",
+        "seed",
+    ):
+        parser.add_argument(
+            f"--{name.replace('_', '-')}",
+            dest=name,
+            type=int,
+            help=f"省略時: プリセットの値 (プリセットにない場合は {getattr(defaults, name)})",
+        )
+    parser.add_argument(
+        "--match-ratio", dest="match_ratio", type=float, help="省略時: 0.3"
+    )
+
+
+def spec_from_args(args) -> TreeSpec:
+    """add_spec_arguments で追加した引数から TreeSpec を作る"""
+
+    values = dict(PRESETS[args.preset])
+    for name in asdict(TreeSpec()):
+        if getattr(args, name, None) is not None:
+            values[name] = getattr(args, name)
+    return TreeSpec(**values)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ダミーのTeamsフォルダを作成する")
+    parser.add_argument("root", type=Path, help="作成先のフォルダ")
+    add_spec_arguments(parser)
+    args = parser.parse_args()
+
+    result = generate_tree(args.root, spec_from_args(args))
+    print(
+        f"フォルダ:{result.dirs} ファイル:{result.files}"
+        f" 合計:{result.bytes / 1024 / 1024:.1f}MB 納品対象:{result.expected_matches}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import concurrent.futures
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, Tuple
+
+import copy_executor
+import manifest
+
+logger = logging.getLogger(__name__)
+
+# 納品先ルートに置くチェックサムファイルの名前 (sha256sum -c で検証できる形式)
+CHECKSUM_FILE_NAME = "SHA256SUMS"
+
+
+@dataclass
+class VerifySummary:
+    """
+    チェックサム検証の集計結果。
+
+    Attributes:
+        ok (int): 内容が一致したファイル数
+        mismatched (list[str]): 内容が一致しなかったファイル (納品先ルートからの相対パス)
+        missing (list[str]): 読み込めなかったファイル (存在しない場合を含む)
+        bytes_read (int): 読み込んだ合計バイト数
+        elapsed (float): 所要時間 (秒)
+    """
+
+    ok: int = 0
+    mismatched: List[str] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+    bytes_read: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def mb_per_sec(self) -> float:
+        if self.elapsed <= 0:
+            return 0.0
+        return self.bytes_read / 1024 / 1024 / self.elapsed
+
+
+def write_checksum_file(
+    delivery_root, entries: Iterable[manifest.ManifestEntry]
+) -> int:
+    """
+    納品済みファイルのSHA-256を、納品先ルートの SHA256SUMS に書き出す。
+    ハッシュはコピー時に計算済みのもの (マニフェストの記録) を使い、ファイルを読み直さない。
+
+    形式は sha256sum と同じ "<SHA-256>  <納品先ルートからの相対パス>" の1ファイル1行。
+
+    Returns:
+        int: 書き出したファイル数 (SHA-256の記録がないファイルは含めない)
+    """
+
+    path = os.path.join(delivery_root, CHECKSUM_FILE_NAME)
+    tmp_path = f"{path}.tmp"
+    count = 0
+    with open(tmp_path, "w", encoding="utf-8", newline="\n") as f:
+        for entry in sorted(entries, key=lambda e: manifest.path_sort_key(e.path)):
+            if entry.sha256:
+                f.write(f"{entry.sha256}  {entry.path}\n")
+                count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def read_checksum_file(checksum_path) -> Iterator[Tuple[str, str]]:
+    """
+    SHA256SUMS を読み込む。
+
+    Yields:
+        tuple[str, str]: (SHA-256, 相対パス)
+
+    Raises:
+        ValueError: 形式が不正な行がある場合。
+    """
+
+    with open(checksum_path, encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.rstrip("\n")
+            if not line:
+                continue
+            digest, sep, rel_path = line.partition(" ")
+            if not sep or len(digest) != 64:
+                raise ValueError(f"{checksum_path} の{line_no}行目の形式が不正です")
+            # sha256sum のバイナリモード表記 ("*パス") にも対応する
+            yield digest.lower(), (
+                rel_path[1:] if rel_path[:1] in (" ", "*") else rel_path
+            )
+
+
+def verify_delivery(
+    delivery_root, workers: int = None, on_failure=None
+) -> VerifySummary:
+    """
+    納品先のファイルを SHA256SUMS と照合する。ハッシュの計算は複数プロセスで並列に行う。
+
+    Args:
+        delivery_root: 納品先ルートパス
+        workers (int): プロセス数。省略時はCPU数
+        on_failure (Callable): 不一致または読み込めなかったファイルごとに
+            (相対パス, 理由) を受け取るコールバック
+
+    Returns:
+        VerifySummary: 検証の集計結果
+
+    Raises:
+        FileNotFoundError: SHA256SUMS が存在しない場合。
+        ValueError: SHA256SUMS の形式が不正な場合。
+    """
+
+    expected = list(read_checksum_file(os.path.join(delivery_root, CHECKSUM_FILE_NAME)))
+    paths = [
+        os.path.join(delivery_root, *rel_path.split("/")) for _, rel_path in expected
+    ]
+
+    workers = workers or os.cpu_count() or 1
+    # 小さいファイルが多い場合にプロセス間の受け渡しが律速にならないよう、まとめて渡す
+    chunksize = max(1, min(64, len(paths) // (4 * workers)))
+
+    summary = VerifySummary()
+    start = time.perf_counter()
+    # concurrent.futures.ProcessPoolExecutor は初回の参照時に multiprocessing を読み込む。
+    # (このモジュールは納品のたびに読み込まれるが、プロセスプールを使うのは verify だけのため)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        hashed = pool.map(_hash_file, paths, chunksize=chunksize)
+        for (digest, rel_path), (size, actual, error) in zip(expected, hashed):
+            summary.bytes_read += size
+            if error is not None:
+                summary.missing.append(rel_path)
+                reason = error
+            elif actual != digest:
+                summary.mismatched.append(rel_path)
+                reason = "内容が一致しません"
+            else:
+                summary.ok += 1
+                continue
+            if on_failure is not None:
+                on_failure(rel_path, reason)
+    summary.elapsed = time.perf_counter() - start
+    return summary
+
+
+def _hash_file(path: str) -> tuple:
+    """
+    ワーカープロセスで1ファイルのSHA-256を計算する。
+
+    Returns:
+        tuple: (サイズ, SHA-256, エラー内容)。読み込めなかった場合はSHA-256がNone
+    """
+
+    try:
+        size = os.path.getsize(path)
+        return size, copy_executor.sha256_file(path), None
+    except OSError as e:
+        return 0, None, str(e)
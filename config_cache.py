@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Optional, Tuple
+
+import config_manager
+import rule_engine
+import walker
+
+logger = logging.getLogger(__name__)
+
+# キャッシュの形式を変えた場合は上げる (古いキャッシュは読み込まずに作り直す)
+CACHE_VERSION = 1
+
+# キャッシュの既定の保存先
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "delivery_automation_tool"
+
+# 変更されたらキャッシュを作り直すモジュール (設定の検証・ルールの作成を行うもの)
+_CODE_MODULES = (config_manager, rule_engine, walker)
+
+
+def load(
+    config_file_path: Path, cache_dir: Optional[Path] = DEFAULT_CACHE_DIR
+) -> Tuple[dict, rule_engine.RuleEngine]:
+    """
+    設定ファイルを読み込み、マッチングルール (RuleEngine) とともに返す。
+
+    スクリプトから何度も呼ばれる場合に、毎回 INI の解析・検証と、ルールのトライ木・
+    正規表現の組み立てをしなくて済むよう、結果を pickle にして cache_dir に保存しておく。
+    なお、正規表現オブジェクトは pickle にはパターン文字列として保存され、読み込み時に
+    re がコンパイルし直すため、正規表現のコンパイル自体は省略できない。
+    キャッシュは設定ファイルのパス・更新日時・内容の SHA-256 (と本ツールの該当モジュールの
+    更新日時) が一致する場合だけ使い、それ以外は設定ファイルを読み込み直して保存し直す。
+    キャッシュの読み書きに失敗しても、設定ファイルから読み込んで処理を続ける。
+
+    Args:
+        config_file_path (Path): 設定ファイルへのパス
+        cache_dir (Path): キャッシュの保存先。None の場合はキャッシュを使わない
+
+    Returns:
+        tuple[dict, rule_engine.RuleEngine]: config_manager.load_config の戻り値と、
+            それから作成した RuleEngine
+
+    Raises:
+        config_manager.load_config と同じ
+    """
+
+    config_file_path = Path(config_file_path)
+    if cache_dir is None or not config_file_path.is_file():
+        # 設定ファイルがない場合のエラーは load_config に任せる
+        return _load_uncached(config_file_path)
+
+    key = _cache_key(config_file_path)
+    cache_path = Path(cache_dir) / f"{_path_digest(config_file_path)}.pickle"
+    cached = _read_cache(cache_path, key)
+    if cached is not None:
+        logging.info(f"設定ファイル {config_file_path} をキャッシュから読み込みます。")
+        return cached
+
+    config, rules = _load_uncached(config_file_path)
+    # 読み込みの途中で設定ファイルが変更された場合は、どちらの内容か分からないため保存しない
+    if _cache_key(config_file_path) == key:
+        _write_cache(cache_path, key, config, rules)
+    return config, rules
+
+
+def _load_uncached(config_file_path: Path) -> Tuple[dict, rule_engine.RuleEngine]:
+    config = config_manager.load_config(config_file_path)
+    return config, rule_engine.RuleEngine.from_config(config)
+
+
+def _cache_key(config_file_path: Path) -> tuple:
+    """キャッシュが使えるかを判定する値 (パス・更新日時・内容のハッシュ・モジュールの更新日時)"""
+
+    stat = config_file_path.stat()
+    content_hash = hashlib.sha256(config_file_path.read_bytes()).hexdigest()
+    code_stamp = tuple(os.stat(module.__file__).st_mtime_ns for module in _CODE_MODULES)
+    return (
+        CACHE_VERSION,
+        os.path.abspath(config_file_path),
+        stat.st_mtime_ns,
+        content_hash,
+        code_stamp,
+    )
+
+
+def _path_digest(config_file_path: Path) -> str:
+    """設定ファイルごとのキャッシュファイル名"""
+
+    return hashlib.sha256(
+        os.path.abspath(config_file_path).encode("utf-8")
+    ).hexdigest()[:32]
+
+
+def _read_cache(cache_path: Path, key: tuple):
+    try:
+        with open(cache_path, "rb") as f:
+            cached = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # 壊れたキャッシュや古い形式のキャッシュは、読み込み直して上書きする
+        logging.warning(f"設定のキャッシュを読み込めませんでした: {cache_path} ({e})")
+        return None
+    if not isinstance(cached, dict) or cached.get("key") != key:
+        return None
+    return cached["config"], cached["rules"]
+
+
+def _write_cache(
+    cache_path: Path, key: tuple, config: dict, rules: rule_engine.RuleEngine
+):
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(
+                {"key": key, "config": config, "rules": rules},
+                f,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        # 同時に実行された場合も、読み込む側が書きかけのファイルを見ないように置き換える
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logging.warning(f"設定のキャッシュを保存できませんでした: {cache_path} ({e})")
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
@@ -1,9 +1,92 @@
 import logging
 import configparser
 from pathlib import Path
+from typing import Iterable, Tuple
+
+from walker import ARTIFACT_DIR_NAME
 
 logger = logging.getLogger(__name__)
 
+# 必須のパス項目 ([General]、または各[Job:<ジョブ名>]セクションに記述する)
+REQUIRED_PATH_KEYS = ("teams_root_path", "delivery_root_path")
+
+# 1回の実行で複数のTeamsフォルダを処理する場合のセクション名の接頭辞 (例: [Job:マイグレ])
+JOB_SECTION_PREFIX = "Job:"
+
+# 任意項目の既定値
+DEFAULT_COPY_WORKERS = 4  # 同時にコピーするファイル数
+DEFAULT_MAX_INFLIGHT_MB = 256  # コピー中のファイルの合計サイズの上限 (MB)
+DEFAULT_LARGE_FILE_MB = (
+    512  # このサイズ以上のファイルは中断しても再開できる方法でコピーする (MB)
+)
+
+# コマンド引数の既定値 (main.py の --help で表示するため、処理を行うモジュールではなくここに置く)
+# 監視モード (watcher) の既定値 (秒)
+DEFAULT_POLL_INTERVAL_SECONDS = 2.0
+DEFAULT_DEBOUNCE_SECONDS = 2.0
+# 同時に実行するプロジェクト数 (fanout) の既定値
+DEFAULT_PROJECT_WORKERS = 4
+# 同じデバイス (ドライブ・共有フォルダ) を使うプロジェクトを同時に実行する数 (fanout) の既定値
+DEFAULT_PER_DEVICE = 1
+
+# 前回納品したがコピー元から消えたファイルの扱い (先頭が既定値)
+#   report: 標準出力に表示するのみ / delete: 納品先から削除する
+STALE_FILE_ACTIONS = ("report", "delete")
+
+# 納品の形式 (先頭が既定値)
+#   folder: 納品先ルートにフォルダとしてコピーする / zip: 納品先と同じ構成のZIPファイルに直接書き込む
+DELIVERY_FORMATS = ("folder", "zip")
+
+# 納品先にファイルを置く方法 (先頭が既定値)
+#   copy: 常にコピーする
+#   reflink: コピー元とデータを共有する複製 (reflink) を試し、できなければコピーする
+#   hardlink: reflink、ハードリンクの順に試し、どちらもできなければコピーする
+LINK_MODES = ("copy", "reflink", "hardlink")
+
+# [Compression]セクションがない場合の、ZIPに格納するファイルの拡張子ごとの圧縮レベル
+# (0: 無圧縮で格納, 1-9: deflateの圧縮レベル, "*": その他の拡張子)
+# Officeファイル (OOXML) や画像はそれ自体が圧縮済みのため、圧縮しても小さくならない
+DEFAULT_COMPRESSION = {
+    ".xlsx": 0,
+    ".xlsm": 0,
+    ".docx": 0,
+    ".docm": 0,
+    ".pptx": 0,
+    ".pptm": 0,
+    ".zip": 0,
+    ".7z": 0,
+    ".png": 0,
+    ".jpg": 0,
+    ".jpeg": 0,
+    "*": 6,
+}
+
+# [Mappings]セクションがない場合のマッチング条件
+# (パターン, コピー先フェーズフォルダ名, 成果物フォルダ配下のファイルが対象か)
+DEFAULT_MAPPINGS = [
+    ("調査検討書_", "030.調査", False),
+    ("030_レビューチェックリスト_", "030.調査", True),
+    ("レビュー記録表_調査", "030.調査", True),
+    ("機能設計書_", "040.設計", False),
+    ("040_レビューチェックリスト_", "040.設計", True),
+    ("レビュー記録表_設計", "040.設計", True),
+    ("050_レビューチェックリスト_", "050.製造", True),
+    ("レビュー記録表_CD", "050.製造", True),
+    ("単体試験仕様書_", "060.UD作成", False),
+    ("060_レビューチェックリスト_", "060.UD作成", True),
+    ("レビュー記録表_UD作成", "060.UD作成", True),
+    ("単体試験成績書_", "070.UD消化", False),
+    ("070_レビューチェックリスト_", "070.UD消化", True),
+    ("レビュー記録表_UD消化", "070.UD消化", True),
+    ("結合試験仕様書_", "080.SD作成", False),
+    ("080_レビューチェックリスト_", "080.SD作成", True),
+    ("レビュー記録表_SD作成", "080.SD作成", True),
+    ("結合試験成績書_", "090.SD消化", False),
+    ("試験結果報告書_", "090.SD消化", False),
+    ("090_レビューチェックリスト_", "090.SD消化", True),
+    ("レビュー記録表_SD消化", "090.SD消化", True),
+]
+
 
 def load_config(config_file_path: Path) -> dict:
     """
@@ -18,11 +101,12 @@ def load_config(config_file_path: Path) -> dict:
     Raises:
         FileNotFoundError: 設定ファイルが見つからない場合。
         configparser.Error: INIファイルの解析中にエラーが発生した場合。
-        ValueError: 必須項目が不足している場合。
+        ValueError: 必須項目が不足している場合、または値が不正な場合。
     """
 
     logging.info(f"設定ファイル {config_file_path} を読み込みます。")
     config = configparser.ConfigParser()
+    config.optionxform = str  # [Mappings]のパターンの大文字小文字を保持する
     config_data = {}
 
     if not config_file_path.is_file():
@@ -35,28 +119,214 @@ def load_config(config_file_path: Path) -> dict:
 
     general_section = config["General"]
 
-    required_general_keys = {
-        "teams_root_path": Path,
-        "delivery_root_path": Path,
+    # [Job:<ジョブ名>]セクションがない場合は、[General]のパスが必須 (1ジョブのみ)。
+    # ある場合は、各ジョブのセクションのパスを使う ([General]のパスは省略時の既定値)。
+    job_sections = [
+        name for name in config.sections() if name.startswith(JOB_SECTION_PREFIX)
+    ]
+
+    if not job_sections:
+        paths = _read_paths(general_section, "General")
+        config_data.update(paths)
+        config_data["jobs"] = [dict(paths, name=None)]
+    else:
+        defaults = {
+            key: Path(general_section[key])
+            for key in REQUIRED_PATH_KEYS
+            if general_section.get(key)
+        }
+        config_data.update(defaults)
+        config_data["jobs"] = []
+        for section_name in job_sections:
+            job_name = section_name[len(JOB_SECTION_PREFIX) :].strip()
+            if not job_name or any(c in job_name for c in '\\/:*?"<>|'):
+                raise ValueError(
+                    f"[{section_name}]セクションのジョブ名が不正です。フォルダ名に使える文字で指定してください。"
+                )
+            paths = _read_paths(config[section_name], section_name, defaults)
+            config_data["jobs"].append(dict(paths, name=job_name))
+
+    # 任意項目 (省略時は既定値を使用)
+    optional_general_keys = {
+        "copy_workers": (_positive_int, DEFAULT_COPY_WORKERS),
+        "max_inflight_mb": (_positive_int, DEFAULT_MAX_INFLIGHT_MB),
+        "large_file_mb": (_positive_int, DEFAULT_LARGE_FILE_MB),
+        "hash_files": (_boolean, False),
+        "stale_files": (_choice(STALE_FILE_ACTIONS), STALE_FILE_ACTIONS[0]),
+        "delivery_format": (_choice(DELIVERY_FORMATS), DELIVERY_FORMATS[0]),
+        "link_mode": (_choice(LINK_MODES), LINK_MODES[0]),
+        "dedup": (_boolean, False),
+        "fold_width": (_boolean, False),
     }
 
-    for key, expected_type in required_general_keys.items():
-        if key not in general_section:
-            raise ValueError(f"[General]セクションの必須項目'{key}'が見つかりません。")
+    for key, (converter, default) in optional_general_keys.items():
         value = general_section.get(key)
 
-        if value is None or value is "":
-            raise ValueError(f"[General]セクションの必須項目'{key}'の値が空です。")
+        if value is None or value == "":
+            config_data[key] = default
+            continue
 
         try:
-            if expected_type == Path:
-                config_data[key] = Path(value)
-            else:
-                config_data[key] = value
+            config_data[key] = converter(value)
+        except ValueError as e:
+            raise ValueError(
+                f"[General]セクションの'{key}'の値が不正です。{e} 実際の値: '{value}'"
+            )
+
+    config_data["mappings"] = (
+        # パターンに "%" を書けるよう、値の展開 (interpolation) はしない
+        _parse_mappings(config.items("Mappings", raw=True))
+        if "Mappings" in config
+        else list(DEFAULT_MAPPINGS)
+    )
+
+    config_data["compression"] = (
+        _parse_compression(config["Compression"])
+        if "Compression" in config
+        else dict(DEFAULT_COMPRESSION)
+    )
 
+    return config_data
+
+
+def _parse_compression(compression_section) -> dict:
+    """
+    [Compression]セクションを {拡張子: 圧縮レベル} に変換する (delivery_format = zip の場合に使用)。
+
+    記述形式:
+        拡張子 = 圧縮レベル
+
+        拡張子: ".xlsx" のようにドットから書く (大文字小文字は区別しない)。"*" はその他の拡張子
+        圧縮レベル: 0 (無圧縮で格納) から 9 (最大圧縮)
+
+    例:
+        .xlsx = 0
+        .txt = 9
+        * = 6
+
+    "*" を省略した場合、その他の拡張子には DEFAULT_COMPRESSION の "*" の値を使う。
+    """
+
+    compression = {"*": DEFAULT_COMPRESSION["*"]}
+    for extension, value in compression_section.items():
+        if extension != "*" and not (extension.startswith(".") and len(extension) > 1):
+            raise ValueError(
+                f"[Compression]セクションの拡張子'{extension}'が不正です。'.xlsx' の形式で指定してください。"
+            )
+        try:
+            level = int(value)
         except ValueError:
+            level = -1
+        if not 0 <= level <= 9:
             raise ValueError(
-                f"[General]セクションの'{key}'の値が不正な型です。期待される型: {expected_type.__name__}, 実際の値: '{value}'"
+                f"[Compression]セクションの'{extension}'の圧縮レベルが不正です。0から9で指定してください。実際の値: '{value}'"
             )
+        compression[extension.lower()] = level
+    return compression
 
-    return config_data
+
+def _parse_mappings(mappings_items: Iterable[Tuple[str, str]]) -> list:
+    """
+    [Mappings]セクションの (キー, 値) の並びを (パターン, フェーズフォルダ名, 成果物か) のリストに変換する。
+
+    記述形式:
+        パターン = コピー先 [, コピー先 ...]
+
+        パターン: ファイル名の先頭部分 (前方一致)。"*"、"?" を含む場合はワイルドカードとして
+                  ファイル名全体と照合する (例: *.py)。大文字小文字は区別しない。
+        コピー先: "<フェーズフォルダ名>" または "<フェーズフォルダ名>/成果物"。
+                  前者はフェーズフォルダ直下のファイル、後者は成果物フォルダ配下のファイルが対象。
+
+    例:
+        調査検討書_ = 030.調査
+        レビュー記録表_調査 = 030.調査/成果物
+        *.py = 050.製造/成果物
+
+    INIファイルの制約により、";" または "#" で始まるパターンはコメント行として無視され、
+    "=" または ":" を含むパターンはその位置でパターンとコピー先に分かれる。
+    このようなパターンは、先頭や該当箇所を "?" に置き換えたワイルドカードで指定する
+    (例: "?memo_*" で "#memo_..." に合致する)。"%" はそのまま書ける。
+    """
+
+    mappings = []
+    for pattern, value in mappings_items:
+        if not pattern:
+            raise ValueError("[Mappings]セクションにパターンが空の行があります。")
+        if not value:
+            raise ValueError(f"[Mappings]セクションの'{pattern}'のコピー先が空です。")
+
+        for destination in value.split(","):
+            parts = [p for p in destination.strip().replace("\\", "/").split("/") if p]
+            if len(parts) == 1:
+                mappings.append((pattern, parts[0], False))
+            elif len(parts) == 2 and parts[1] == ARTIFACT_DIR_NAME:
+                mappings.append((pattern, parts[0], True))
+            else:
+                raise ValueError(
+                    f"[Mappings]セクションの'{pattern}'のコピー先が不正です。"
+                    f"'<フェーズフォルダ名>' または '<フェーズフォルダ名>/{ARTIFACT_DIR_NAME}' の形式で指定してください。実際の値: '{destination.strip()}'"
+                )
+
+    if not mappings:
+        raise ValueError("[Mappings]セクションにマッピングが1件もありません。")
+
+    return mappings
+
+
+def _read_paths(section, section_name: str, defaults: dict = None) -> dict:
+    """
+    セクションから必須のパス (teams_root_path, delivery_root_path) を読み込む。
+    セクションにない項目は defaults の値を使う。
+    """
+
+    paths = {}
+    for key in REQUIRED_PATH_KEYS:
+        if key not in section:
+            if defaults and key in defaults:
+                paths[key] = defaults[key]
+                continue
+            raise ValueError(
+                f"[{section_name}]セクションの必須項目'{key}'が見つかりません。"
+            )
+        value = section.get(key)
+
+        if value is None or value == "":
+            raise ValueError(
+                f"[{section_name}]セクションの必須項目'{key}'の値が空です。"
+            )
+
+        paths[key] = Path(value)
+
+    return paths
+
+
+def _positive_int(value: str) -> int:
+    """1以上の整数に変換する"""
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError("期待される型: int")
+    if number <= 0:
+        raise ValueError("1以上の値を指定してください。")
+    return number
+
+
+def _boolean(value: str) -> bool:
+    """true/false, yes/no, on/off, 1/0 を真偽値に変換する"""
+
+    states = configparser.ConfigParser.BOOLEAN_STATES
+    if value.lower() not in states:
+        raise ValueError("true または false を指定してください。")
+    return states[value.lower()]
+
+
+def _choice(choices: tuple):
+    """指定された選択肢のいずれかであることを確認する変換関数を返す"""
+
+    def convert(value: str) -> str:
+        if value not in choices:
+            raise ValueError(f"{' / '.join(choices)} のいずれかを指定してください。")
+        return value
+
+    return convert
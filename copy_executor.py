@@ -0,0 +1,673 @@
+import collections
+import errno
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from config_manager import DEFAULT_COPY_WORKERS, DEFAULT_MAX_INFLIGHT_MB
+
+logger = logging.getLogger(__name__)
+
+# 既定値: コピー中 (待ち含む) の合計バイト数の上限 (同時にコピーするスレッド数は config_manager の値)
+DEFAULT_MAX_INFLIGHT_BYTES = DEFAULT_MAX_INFLIGHT_MB * 1024 * 1024
+
+# ハッシュを計算しながらコピーする場合の読み書きの単位 (バッファはスレッドごとに使い回す)
+COPY_BUFFER_SIZE = 4 * 1024 * 1024
+_buffers = threading.local()
+
+# 大きなファイルを再開可能な方法でコピーする場合の設定
+#   コピー中は "<コピー先>.part" に書き込み、RESUMABLE_CHUNK_SIZE ごとに
+#   "<コピー先>.part.json" へ進捗を記録する。完了したらコピー先に置き換える
+PART_SUFFIX = ".part"
+CHECKPOINT_SUFFIX = ".part.json"
+CHECKPOINT_VERSION = 1
+RESUMABLE_CHUNK_SIZE = 64 * 1024 * 1024
+# 再開時に、書き込み済みの末尾をコピー元と照合するバイト数
+RESUME_VERIFY_BYTES = 1024 * 1024
+# カーネル内でのコピー (copy_file_range / sendfile) に対応していない場合の errno
+_KERNEL_COPY_UNSUPPORTED = {
+    errno.ENOSYS,
+    errno.EXDEV,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSOCK,
+    errno.EBADF,
+}
+
+# 複数ジョブの進捗表示が1行の途中で混ざらないようにするためのロック
+_print_lock = threading.Lock()
+
+# コピー結果の状態
+STATUS_COPIED = "copied"
+STATUS_SKIPPED = "skipped"
+STATUS_FAILED = "failed"
+
+
+class CopyTask(NamedTuple):
+    """
+    1ファイル分のコピー指示。
+
+    Attributes:
+        src (str): コピー元ファイルパス
+        dst (str): コピー先ファイルパス
+        size (int): ファイルサイズ (バイト)。同時コピー量の制御に使用する
+        label (str): 進捗表示に使う見出し (例: "コピー (トップレベル)")
+        mtime_ns (int): コピー元の更新日時 (ナノ秒)。マニフェストの記録に使用する
+    """
+
+    src: str
+    dst: str
+    size: int
+    label: str = "コピー"
+    mtime_ns: int = 0
+
+
+class CopyResult(NamedTuple):
+    """
+    1ファイル分のコピー結果。
+
+    Attributes:
+        task (CopyTask): 対応するコピー指示
+        status (str): STATUS_COPIED / STATUS_SKIPPED / STATUS_FAILED のいずれか
+        error (Exception): 失敗時の例外。成功時はNone
+        elapsed (float): コピーにかかった秒数
+        sha256 (str): コピーした内容のSHA-256 (コピー関数が計算した場合のみ)
+    """
+
+    task: CopyTask
+    status: str
+    error: Optional[Exception] = None
+    elapsed: float = 0.0
+    sha256: Optional[str] = None
+
+
+@dataclass
+class CopySummary:
+    """
+    コピー処理全体の集計結果。
+    """
+
+    copied: int = 0
+    skipped: int = 0
+    failed: int = 0
+    bytes_copied: int = 0
+    stale: int = 0  # コピー元から消えた納品済みファイル数
+    # リンク・重複排除 (link_mode, dedup) によって書き込まずに済んだバイト数と、短縮時間の推定値
+    bytes_linked: int = 0
+    seconds_saved: float = 0.0
+    # 処理後の納品済みファイルの記録 (manifest.ManifestEntry)。ツリー出力に使用する
+    delivered: list = field(default_factory=list, repr=False)
+    # ZIP形式で納品した場合の出力先ZIPファイル (フォルダで納品した場合はNone)
+    archive_path: Optional[str] = None
+
+
+def copy_file(src: str, dst: str) -> Optional[str]:
+    """
+    ファイルをコピーする。コピー先に同名のファイルがあれば上書きする (設計書4.1)。
+
+    Returns:
+        None (内容のハッシュは計算しない)
+    """
+
+    _break_link(dst)
+    shutil.copy2(src, dst)
+    return None
+
+
+def copy_file_with_hash(src: str, dst: str) -> str:
+    """
+    ファイルを1回だけ読みながらコピーし、書き込んだ内容のSHA-256を返す。
+    コピー後にもう一度コピー元を読み直すことはない。
+    更新日時などのメタデータは shutil.copy2 と同様にコピーする。
+    """
+
+    _break_link(dst)
+    buf = _buffer()
+    view = memoryview(buf)
+    digest = hashlib.sha256()
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        for n in iter(lambda: fsrc.readinto(buf), 0):
+            chunk = view[:n]
+            digest.update(chunk)
+            fdst.write(chunk)
+    shutil.copystat(src, dst)
+    return digest.hexdigest()
+
+
+def copy_file_resumable(src: str, dst: str, with_hash: bool = False) -> Optional[str]:
+    """
+    大きなファイルを、中断しても続きから再開できるようにコピーする。
+
+    "<コピー先>.part" に一定量ずつ書き込み、書き込んだ分をディスクに反映するたびに
+    "<コピー先>.part.json" に進捗 (コピー元のサイズ・更新日時とコピー済みのバイト数) を記録する。
+    前回のコピーが途中で終わっていれば、記録したコピー元が変わっていないこと、
+    およびコピー済みの末尾がコピー元と一致することを確認してから続きをコピーする。
+    完了後にメタデータをコピーし、コピー先へ置き換える (それまで既存のコピー先には触れない)。
+
+    ハッシュを計算しない場合は、対応していれば os.copy_file_range または os.sendfile で
+    カーネル内でコピーする。
+
+    Args:
+        src (str): コピー元ファイルパス
+        dst (str): コピー先ファイルパス
+        with_hash (bool): 内容のSHA-256を計算するか (再開時は .part の既存部分を読んで計算する)
+
+    Returns:
+        str: with_hash=True の場合は内容のSHA-256。それ以外はNone
+
+    Raises:
+        OSError: コピーに失敗した場合、またはコピー中にコピー元が変更された場合。
+    """
+
+    part_path = dst + PART_SUFFIX
+    checkpoint_path = dst + CHECKPOINT_SUFFIX
+    st = os.stat(src)
+    digest = hashlib.sha256() if with_hash else None
+
+    with open(src, "rb", buffering=0) as fsrc:
+        offset = _resume_offset(fsrc, st, part_path, checkpoint_path)
+        if offset:
+            print_message(
+                f"コピーを再開: {os.path.basename(dst)} ({offset}バイト目から)"
+            )
+        with open(part_path, "r+b" if offset else "wb", buffering=0) as fdst:
+            fdst.truncate(offset)
+            if digest is not None and offset:
+                _hash_range(fdst, 0, offset, digest)
+            fdst.seek(offset)
+
+            while offset < st.st_size:
+                count = min(RESUMABLE_CHUNK_SIZE, st.st_size - offset)
+                copied = _copy_range(fsrc, fdst, offset, count, digest)
+                if copied < count:
+                    raise OSError(f"コピー中にコピー元のサイズが変わりました: {src}")
+                offset += copied
+                # 進捗は、書き込んだ内容をディスクに反映してから記録する
+                os.fsync(fdst.fileno())
+                _write_checkpoint(checkpoint_path, src, st, offset)
+
+    current = os.stat(src)
+    if (current.st_size, current.st_mtime_ns) != (st.st_size, st.st_mtime_ns):
+        _remove_quietly(checkpoint_path)
+        raise OSError(f"コピー中にコピー元が更新されました: {src}")
+
+    shutil.copystat(src, part_path)
+    os.replace(part_path, dst)
+    _remove_quietly(checkpoint_path)
+    return digest.hexdigest() if digest is not None else None
+
+
+def _resume_offset(
+    fsrc, st: os.stat_result, part_path: str, checkpoint_path: str
+) -> int:
+    """
+    前回のコピーの続きから再開できる位置を返す。再開できない場合は0。
+    """
+
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        part_size = os.path.getsize(part_path)
+    except (OSError, ValueError):
+        return 0
+
+    offset = checkpoint.get("offset") if isinstance(checkpoint, dict) else None
+    if not isinstance(offset, int) or isinstance(offset, bool):
+        # 形式が不正な進捗の記録は、次回以降も読み込まないよう .part とともに削除する
+        logging.warning(
+            f"コピーの進捗の記録が不正なため、最初からコピーします: {part_path}"
+        )
+        _remove_quietly(checkpoint_path)
+        _remove_quietly(part_path)
+        return 0
+    if (
+        checkpoint.get("version") != CHECKPOINT_VERSION
+        or checkpoint.get("size") != st.st_size
+        or checkpoint.get("mtime_ns") != st.st_mtime_ns
+        or not 0 < offset <= min(part_size, st.st_size)
+    ):
+        return 0
+
+    # コピー済みの末尾をコピー元と照合する (一致しなければ最初からコピーし直す)
+    verify_from = max(0, offset - RESUME_VERIFY_BYTES)
+    with open(part_path, "rb") as fpart:
+        fpart.seek(verify_from)
+        written = fpart.read(offset - verify_from)
+    fsrc.seek(verify_from)
+    if fsrc.read(offset - verify_from) != written:
+        return 0
+    return offset
+
+
+def _copy_range(fsrc, fdst, offset: int, count: int, digest) -> int:
+    """
+    コピー元の offset から count バイトを、コピー先の現在位置 (= offset) に書き込む。
+
+    Returns:
+        int: コピーしたバイト数 (コピー元が短くなった場合は count 未満)
+    """
+
+    kernel_copy = None
+    if digest is None and _kernel_copy is not None:
+        devices = (os.fstat(fsrc.fileno()).st_dev, os.fstat(fdst.fileno()).st_dev)
+        kernel_copy = _device_kernel_copy(devices)
+    while kernel_copy is not None:
+        try:
+            return kernel_copy(fsrc.fileno(), fdst.fileno(), offset, count)
+        except OSError as e:
+            if e.errno not in _KERNEL_COPY_UNSUPPORTED:
+                raise
+            # 対応していないファイルシステムでは、以降は次の方法でコピーする
+            kernel_copy = _disable_kernel_copy(devices, kernel_copy)
+
+    copied = 0
+    buf = _buffer()
+    view = memoryview(buf)
+    fsrc.seek(offset)
+    fdst.seek(offset)
+    while copied < count:
+        n = fsrc.readinto(view[: min(len(buf), count - copied)])
+        if not n:
+            break
+        chunk = view[:n]
+        if digest is not None:
+            digest.update(chunk)
+        fdst.write(chunk)
+        copied += n
+    return copied
+
+
+def _copy_file_range(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    copied = 0
+    while copied < count:
+        n = os.copy_file_range(
+            src_fd, dst_fd, count - copied, offset + copied, offset + copied
+        )
+        if n == 0:
+            break
+        copied += n
+    # copy_file_range はファイル位置を進めないため、以降の書き込みに合わせて進める
+    os.lseek(dst_fd, offset + copied, os.SEEK_SET)
+    return copied
+
+
+def _sendfile(src_fd: int, dst_fd: int, offset: int, count: int) -> int:
+    # コピー先への書き込み位置 (= offset) から書き込まれる
+    os.lseek(dst_fd, offset, os.SEEK_SET)
+    copied = 0
+    while copied < count:
+        n = os.sendfile(dst_fd, src_fd, offset + copied, count - copied)
+        if n == 0:
+            break
+        copied += n
+    return copied
+
+
+# 使用するカーネル内でのコピー関数 (Linuxでのみ利用可能。対応していなければNone)
+#   copy_file_range (Python 3.8以降) -> sendfile -> 通常の読み書き の順に試す
+if hasattr(os, "copy_file_range"):
+    _kernel_copy = _copy_file_range
+elif sys.platform.startswith("linux") and hasattr(os, "sendfile"):
+    _kernel_copy = _sendfile
+else:
+    _kernel_copy = None
+
+# (コピー元のデバイス, コピー先のデバイス) ごとの、失敗したため切り替えたコピー関数。
+# 対応しているかはファイルシステムの組み合わせによるため、1つの組み合わせで失敗しても
+# 他の組み合わせのコピーには影響させない。複数のコピースレッドから参照・更新される
+_kernel_copy_fallbacks: Dict[Tuple[int, int], Optional[Callable]] = {}
+_kernel_copy_lock = threading.Lock()
+
+
+def _device_kernel_copy(devices: Tuple[int, int]) -> Optional[Callable]:
+    """デバイスの組み合わせに使うカーネル内でのコピー関数 (使えない場合はNone)"""
+
+    with _kernel_copy_lock:
+        return _kernel_copy_fallbacks.get(devices, _kernel_copy)
+
+
+def _disable_kernel_copy(
+    devices: Tuple[int, int], failed: Callable
+) -> Optional[Callable]:
+    """
+    デバイスの組み合わせで failed が使えなかったことを記録し、次に試すコピー関数を返す。
+    他のスレッドが先に切り替えていた場合は、その結果を返す。
+    """
+
+    with _kernel_copy_lock:
+        current = _kernel_copy_fallbacks.get(devices, _kernel_copy)
+        if current is failed:
+            current = _sendfile if failed is _copy_file_range else None
+            _kernel_copy_fallbacks[devices] = current
+        return current
+
+
+def _hash_range(f, start: int, end: int, digest):
+    buf = _buffer()
+    view = memoryview(buf)
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        n = f.readinto(view[: min(len(buf), remaining)])
+        if not n:
+            raise OSError("コピー途中のファイルを読み込めませんでした")
+        digest.update(view[:n])
+        remaining -= n
+
+
+def _write_checkpoint(checkpoint_path: str, src: str, st: os.stat_result, offset: int):
+    tmp_path = checkpoint_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": CHECKPOINT_VERSION,
+                "src": src,
+                "size": st.st_size,
+                "mtime_ns": st.st_mtime_ns,
+                "offset": offset,
+            },
+            f,
+        )
+    os.replace(tmp_path, checkpoint_path)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _break_link(dst: str):
+    """
+    コピー先がハードリンク (link_mode = hardlink や dedup で作成したもの) であれば削除する。
+    そのまま上書きすると、リンク先 (コピー元や他の納品ファイル) の内容まで変わるため。
+    """
+
+    try:
+        if os.lstat(dst).st_nlink > 1:
+            os.remove(dst)
+    except FileNotFoundError:
+        pass
+
+
+def sha256_file(path: str) -> str:
+    """ファイル内容のSHA-256を16進文字列で返す"""
+
+    buf = _buffer()
+    view = memoryview(buf)
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for n in iter(lambda: f.readinto(buf), 0):
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+
+def _buffer() -> bytearray:
+    """
+    読み書き用のバッファ。スレッドごとに1つ確保し、以降のファイルでも使い回す。
+    """
+
+    buf = getattr(_buffers, "buf", None)
+    if buf is None:
+        buf = _buffers.buf = bytearray(COPY_BUFFER_SIZE)
+    return buf
+
+
+class _ByteBudget:
+    """
+    コピー中の合計バイト数を上限以内に抑えるための仕組み。
+    上限を超えるサイズのファイルは、他にコピー中のものがなければ単独で通す。
+    """
+
+    def __init__(self, limit: int):
+        self._limit = max(1, limit)
+        self._inflight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, size: int) -> int:
+        size = min(size, self._limit)
+        with self._cond:
+            while self._inflight > 0 and self._inflight + size > self._limit:
+                self._cond.wait()
+            self._inflight += size
+        return size
+
+    def release(self, size: int):
+        with self._cond:
+            self._inflight -= size
+            self._cond.notify_all()
+
+
+class CopyPool:
+    """
+    複数の CopyExecutor で共有するスレッドプールとバイト数の上限。
+    複数ジョブを同時に実行する場合に、全体のコピーの同時実行数をこの1つで制限する。
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_COPY_WORKERS,
+        max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+    ):
+        self.threads = ThreadPoolExecutor(max_workers=max(1, max_workers))
+        self.budget = _ByteBudget(max_inflight_bytes)
+
+    def shutdown(self):
+        self.threads.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+
+class CopyExecutor:
+    """
+    スレッドプールでファイルコピーを並列実行する。
+
+    走査側は submit() でコピー指示を次々に渡し、コピーは裏で進む (走査とコピーが重なる)。
+    コピー中の合計バイト数が上限に達している間は submit() が待つため、
+    メモリや回線を使い過ぎることはない。
+
+    1ファイルのコピーに失敗しても他のファイルの処理は続ける (設計書5.2)。
+    結果は完了順ではなく submit() した順に on_result へ渡すため、進捗表示の順序は
+    並列度によらず一定になる。
+
+    使い方:
+        with CopyExecutor(max_workers=4) as executor:
+            executor.submit(CopyTask(src, dst, size))
+        print(executor.summary)
+    """
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_COPY_WORKERS,
+        max_inflight_bytes: int = DEFAULT_MAX_INFLIGHT_BYTES,
+        copy_func: Callable[[str, str], Optional[str]] = copy_file,
+        on_result: Callable[[CopyResult], None] = None,
+        pool: CopyPool = None,
+        large_copy_func: Callable[[str, str], Optional[str]] = None,
+        large_file_threshold: int = 0,
+        serial: bool = False,
+    ):
+        """
+        Args:
+            max_workers (int): 同時にコピーするスレッド数
+            max_inflight_bytes (int): コピー待ち・コピー中の合計バイト数の上限
+            copy_func (Callable): (src, dst) を受け取ってコピーするコピー関数。
+                内容のSHA-256を計算した場合はそれを返す (計算しない場合はNone)
+            on_result (Callable): コピー結果を submit() 順に受け取るコールバック。
+                省略時は標準出力に進捗を表示する
+            pool (CopyPool): 他の CopyExecutor と共有するプール。指定した場合は
+                max_workers と max_inflight_bytes は使わず、close() でもプールは終了しない
+            large_copy_func (Callable): large_file_threshold バイト以上のファイルに使うコピー関数
+                (copy_file_resumable など)。省略時はすべて copy_func でコピーする
+            large_file_threshold (int): large_copy_func を使うファイルサイズの下限 (バイト)
+            serial (bool): コピーを submit() 順に1件ずつ実行する (ZIPへの書き込みなど、
+                同時に呼べないコピー関数用)。プールのスレッドは同時に1つしか使わない
+        """
+
+        self._owns_pool = pool is None
+        self._pool = pool or CopyPool(max_workers, max_inflight_bytes)
+        self._copy_func = copy_func
+        self._large_copy_func = large_copy_func
+        self._large_file_threshold = large_file_threshold
+        self._on_result = on_result or print_progress
+
+        # 順序どおりに結果を報告するための状態
+        self._lock = threading.Lock()
+        self._next_seq = 0
+        self._submitted = 0
+        self._pending = {}
+
+        # この CopyExecutor が登録した未完了のコピー数 (共有プールでも自分の分だけ待つため)
+        self._outstanding = 0
+        self._done = threading.Condition(self._lock)
+
+        # serial の場合に、実行中のコピーが終わるのを待っているコピー
+        self._serial = serial
+        self._waiting = collections.deque()
+        self._running = False
+
+        self.summary = CopySummary()
+
+    def submit(self, task: CopyTask):
+        """
+        コピー指示を登録する。コピー中の合計バイト数が上限に達している場合は空くまで待つ。
+        """
+
+        reserved = self._pool.budget.acquire(task.size)
+        seq = self._submitted
+        self._submitted += 1
+        with self._lock:
+            self._outstanding += 1
+            if self._serial:
+                if self._running:
+                    self._waiting.append((seq, task, reserved))
+                    return
+                self._running = True
+        self._pool.threads.submit(self._run, seq, task, reserved)
+
+    def skip(self, task: CopyTask):
+        """
+        コピー不要 (前回から変更なし) のファイルを記録する。
+        コピーはしないが、進捗の報告順と件数の集計には含める。
+        """
+
+        seq = self._submitted
+        self._submitted += 1
+        self._report(seq, CopyResult(task, STATUS_SKIPPED))
+
+    def close(self):
+        """
+        登録済みのコピーがすべて終わるまで待ち、スレッドプールを終了する
+        (共有プールの場合は終了しない)。
+        """
+
+        with self._done:
+            while self._outstanding:
+                self._done.wait()
+        if self._owns_pool:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _run(self, seq: int, task: CopyTask, reserved: int):
+        """
+        ワーカースレッドで1ファイルをコピーする。例外はここで捕捉し、失敗として記録する。
+        """
+
+        copy_func = self._copy_func
+        if (
+            self._large_copy_func is not None
+            and task.size >= self._large_file_threshold
+        ):
+            copy_func = self._large_copy_func
+
+        start = time.perf_counter()
+        try:
+            digest = copy_func(task.src, task.dst)
+            result = CopyResult(
+                task, STATUS_COPIED, None, time.perf_counter() - start, digest
+            )
+        except Exception as e:
+            result = CopyResult(task, STATUS_FAILED, e, time.perf_counter() - start)
+        finally:
+            self._pool.budget.release(reserved)
+
+        self._report(seq, result)
+        next_run = None
+        with self._done:
+            self._outstanding -= 1
+            if self._serial:
+                if self._waiting:
+                    next_run = self._waiting.popleft()
+                else:
+                    self._running = False
+            self._done.notify_all()
+        if next_run is not None:
+            self._pool.threads.submit(self._run, *next_run)
+
+    def _report(self, seq: int, result: CopyResult):
+        """
+        結果を一旦保留し、submit() 順で連続している分だけを報告する。
+        """
+
+        with self._lock:
+            self._pending[seq] = result
+            while self._next_seq in self._pending:
+                ready = self._pending.pop(self._next_seq)
+                self._next_seq += 1
+                self._count(ready)
+                try:
+                    self._on_result(ready)
+                except Exception as e:
+                    logging.error(f"進捗の報告中にエラーが発生しました: {e}")
+
+    def _count(self, result: CopyResult):
+        if result.status == STATUS_COPIED:
+            self.summary.copied += 1
+            self.summary.bytes_copied += result.task.size
+        elif result.status == STATUS_SKIPPED:
+            self.summary.skipped += 1
+        else:
+            self.summary.failed += 1
+
+
+def print_progress(result: CopyResult):
+    """
+    コピー結果を標準出力に表示する (既定の進捗表示)。
+    """
+
+    task = result.task
+    file_name = os.path.basename(task.dst)
+    dst_dir = os.path.dirname(task.dst)
+
+    if result.status == STATUS_COPIED:
+        print_message(f"{task.label}: {file_name} -> {dst_dir}")
+    elif result.status == STATUS_FAILED:
+        print_message(f"コピー失敗: {task.src} -> {dst_dir} ({result.error})")
+        logging.error(f"コピーに失敗しました: {task.src} ({result.error})")
+
+
+def print_message(message: str):
+    """
+    標準出力に1行表示する。複数ジョブを同時に実行していても行が混ざらない。
+    """
+
+    with _print_lock:
+        print(message)
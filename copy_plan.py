@@ -0,0 +1,115 @@
+import json
+import logging
+from typing import IO, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PLAN_VERSION = 1
+
+# コピー計画の操作の種類
+ACTION_COPY = "copy"  # コピーする (新規または変更あり)
+ACTION_SKIP = "skip"  # 前回から変更がないためコピーしない
+ACTION_STALE = "stale"  # 前回納品したがコピー元に存在しない
+
+
+class PlanOp(NamedTuple):
+    """
+    コピー計画の1操作。
+
+    Attributes:
+        action (str): ACTION_COPY / ACTION_SKIP / ACTION_STALE のいずれか
+        path (str): 納品先ルートからの相対パス ("/" 区切り)
+        src (str): コピー元ファイルのパス
+        size (int): コピー元のサイズ
+        mtime_ns (int): コピー元の更新日時 (ナノ秒)
+    """
+
+    action: str
+    path: str
+    src: str
+    size: int
+    mtime_ns: int
+
+    @property
+    def is_top_level(self) -> bool:
+        """フェーズフォルダ直下 (トップレベル) のファイルか"""
+
+        return self.path.count("/") == 1
+
+
+class PlanJob(NamedTuple):
+    """
+    コピー計画のジョブ1つ分の見出し。計画ファイルでは、この行の後に続く操作がこのジョブに属する。
+    """
+
+    name: Optional[str]
+    teams_root_path: str
+    delivery_root_path: str
+
+
+def write_job(f: IO[str], job: PlanJob):
+    """ジョブの見出しを1行書き出す"""
+
+    record = {"plan_version": PLAN_VERSION, "job": job._asdict()}
+    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def write_ops(f: IO[str], ops: Iterable[PlanOp]) -> dict:
+    """
+    操作を1行ずつ書き出す (JSON Lines)。計画全体をメモリに持たない。
+
+    Returns:
+        dict: 操作の種類ごとの件数
+    """
+
+    counts = {ACTION_COPY: 0, ACTION_SKIP: 0, ACTION_STALE: 0}
+    for op in ops:
+        counts[op.action] += 1
+        f.write(json.dumps(list(op), ensure_ascii=False, separators=(",", ":")) + "\n")
+    return counts
+
+
+def read_plan(f: IO[str]) -> Iterator[Tuple[PlanJob, Iterator[PlanOp]]]:
+    """
+    計画ファイルをジョブごとに読み込む。
+
+    Yields:
+        tuple[PlanJob, Iterator[PlanOp]]: ジョブと、そのジョブの操作。
+            操作は次のジョブに進む前に読み切ること (ファイルを先頭から順に読むため)
+
+    Raises:
+        ValueError: 形式が不正な場合。
+    """
+
+    pending_job = None
+    lines = iter(f)
+
+    def ops() -> Iterator[PlanOp]:
+        nonlocal pending_job
+        for line in lines:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                pending_job = _parse_job(record)
+                return
+            yield PlanOp(*record)
+
+    for line in lines:
+        if line.strip():
+            pending_job = _parse_job(json.loads(line))
+            break
+
+    while pending_job is not None:
+        job, pending_job = pending_job, None
+        job_ops = ops()
+        yield job, job_ops
+        # 呼び出し側が読み残した操作を読み飛ばし、次のジョブの見出しまで進める
+        for _ in job_ops:
+            pass
+
+
+def _parse_job(record) -> PlanJob:
+    if not isinstance(record, dict) or record.get("plan_version") != PLAN_VERSION:
+        raise ValueError(f"コピー計画の形式が不正です: {record}")
+    return PlanJob(**record["job"])
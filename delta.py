@@ -0,0 +1,405 @@
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import checksums
+import copy_executor
+import link_copy
+import manifest
+
+logger = logging.getLogger(__name__)
+
+# 差分の種類 (テキスト出力の先頭の記号)
+KIND_ADDED = "A"
+KIND_REMOVED = "D"
+KIND_MODIFIED = "M"
+KIND_RENAMED = "R"
+
+DELTA_VERSION = 1
+
+# 納品先ルートを直接比較する場合に、納品物として扱わないファイル
+_WORK_FILE_SUFFIXES = (
+    copy_executor.PART_SUFFIX,
+    copy_executor.CHECKPOINT_SUFFIX,
+    link_copy.LINK_TMP_SUFFIX,
+)
+
+
+class SnapshotEntry(NamedTuple):
+    """
+    納品物の1ファイル分の情報。
+
+    Attributes:
+        path (str): 納品先ルートからの相対パス ("/" 区切り)
+        size (int): サイズ
+        mtime_ns (int): 更新日時 (ナノ秒)
+        sha256 (str): 内容のSHA-256。マニフェストに記録がない場合や、納品先ルートを
+            直接比較する場合はNone (必要になった時点で file_path から計算する)
+        file_path (str): ファイルの実際のパス (納品先ルートを直接比較する場合のみ)
+    """
+
+    path: str
+    size: int
+    mtime_ns: int
+    sha256: Optional[str] = None
+    file_path: Optional[str] = None
+
+
+@dataclass
+class DeltaResult:
+    """
+    2つの納品物の差分。
+
+    Attributes:
+        added (list[SnapshotEntry]): 新しい納品物にだけあるファイル
+        removed (list[SnapshotEntry]): 古い納品物にだけあるファイル
+        modified (list[tuple[SnapshotEntry, SnapshotEntry]]): 内容が変わったファイル (古い方, 新しい方)
+        renamed (list[tuple[SnapshotEntry, SnapshotEntry]]): 内容が同じで名前・場所が変わったファイル
+        unchanged (int): 変わっていないファイル数
+        elapsed (float): 所要時間 (秒)
+    """
+
+    added: List[SnapshotEntry] = field(default_factory=list)
+    removed: List[SnapshotEntry] = field(default_factory=list)
+    modified: List[Tuple[SnapshotEntry, SnapshotEntry]] = field(default_factory=list)
+    renamed: List[Tuple[SnapshotEntry, SnapshotEntry]] = field(default_factory=list)
+    unchanged: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added or self.removed or self.modified or self.renamed)
+
+
+class ManifestSnapshot:
+    """
+    マニフェストファイルの納品物。反復すると SnapshotEntry を相対パスの順に返す。
+
+    compare で2つのマニフェストを比べる場合は、同じ内容の行をJSONとして解釈せずに
+    変更なしとして読み飛ばす (大半のファイルが変わっていない場合に速い)。
+    """
+
+    def __init__(self, manifest_path):
+        self.manifest_path = manifest_path
+
+    def __iter__(self) -> Iterator[SnapshotEntry]:
+        return (_parse_line(line) for line in self.lines())
+
+    def lines(self) -> Iterator[str]:
+        return manifest.read_lines(self.manifest_path)
+
+
+def read_snapshot(location):
+    """
+    納品物を開く。
+
+    Args:
+        location: マニフェストファイル (.delivery_manifest*.jsonl)、または納品先ルートのディレクトリ。
+            ディレクトリの場合は納品先のファイルを直接走査する
+            (マニフェスト・SHA256SUMS・コピー途中の一時ファイルは含めない)
+
+    Returns:
+        Iterable[SnapshotEntry]: 納品物のファイル (相対パスの順 (manifest.path_sort_key) に返す)
+    """
+
+    if os.path.isdir(location):
+        return _walk_delivery_root(str(location))
+    return ManifestSnapshot(location)
+
+
+def compare(
+    old: Iterable[SnapshotEntry],
+    new: Iterable[SnapshotEntry],
+    check_hash: bool = False,
+    detect_renames: bool = True,
+) -> DeltaResult:
+    """
+    2つの納品物を比較する。
+
+    どちらも相対パスの順に並んでいることを前提に、先頭から1件ずつ突き合わせる
+    (両方の一覧を辞書に読み込まない)。メモリに残すのは追加・削除・変更のあったファイルだけ。
+
+    Args:
+        old (Iterable[SnapshotEntry]): 古い納品物 (read_snapshot の戻り値)
+        new (Iterable[SnapshotEntry]): 新しい納品物
+        check_hash (bool): サイズが同じファイルは、更新日時ではなく内容のSHA-256で比較する
+            (ハッシュが得られない場合は更新日時で比較する)
+        detect_renames (bool): 削除と追加の組のうち、サイズとSHA-256が同じものを名前の変更とする
+
+    Returns:
+        DeltaResult: 差分
+
+    Raises:
+        FileNotFoundError: マニフェストが存在しない場合。
+        ValueError: マニフェストの形式が不正な場合、またはどちらかが相対パスの順に並んでいない場合。
+    """
+
+    start = time.perf_counter()
+    result = DeltaResult()
+    hashes = {}
+
+    old_cursor = _Cursor(old, "古い納品物")
+    new_cursor = _Cursor(new, "新しい納品物")
+    while not (old_cursor.done and new_cursor.done):
+        if old_cursor.line is not None and old_cursor.line == new_cursor.line:
+            # マニフェストの行がまったく同じなら、解釈せずに変更なしとする
+            result.unchanged += 1
+            old_cursor.advance()
+            new_cursor.advance()
+            continue
+
+        if new_cursor.done or (
+            not old_cursor.done and old_cursor.key() < new_cursor.key()
+        ):
+            old_cursor.key()  # 並び順の確認
+            result.removed.append(old_cursor.entry())
+            old_cursor.advance()
+            continue
+        if old_cursor.done or new_cursor.key() < old_cursor.key():
+            new_cursor.key()  # 並び順の確認
+            result.added.append(new_cursor.entry())
+            new_cursor.advance()
+            continue
+
+        old_entry = old_cursor.entry()
+        new_entry = new_cursor.entry()
+        if _is_modified(old_entry, new_entry, check_hash, hashes):
+            result.modified.append((old_entry, new_entry))
+        else:
+            result.unchanged += 1
+        old_cursor.advance()
+        new_cursor.advance()
+
+    if detect_renames:
+        _detect_renames(result, hashes)
+    result.elapsed = time.perf_counter() - start
+    return result
+
+
+def write_text(result: DeltaResult, f):
+    """
+    差分をテキストで出力する。1行1ファイルで、先頭に種類の記号 (A/D/M/R) を付ける。
+    名前の変更は "R <古いパス> -> <新しいパス>"。相対パスの順に並べ、最後に件数を出力する。
+    """
+
+    lines = [(e.path, f"{KIND_ADDED} {e.path}") for e in result.added]
+    lines += [(e.path, f"{KIND_REMOVED} {e.path}") for e in result.removed]
+    lines += [(n.path, f"{KIND_MODIFIED} {n.path}") for _, n in result.modified]
+    lines += [
+        (n.path, f"{KIND_RENAMED} {o.path} -> {n.path}") for o, n in result.renamed
+    ]
+    for _, line in sorted(lines, key=lambda item: manifest.path_sort_key(item[0])):
+        f.write(line + "\n")
+    f.write(
+        f"追加:{len(result.added)}件 削除:{len(result.removed)}件"
+        f" 変更:{len(result.modified)}件 名前変更:{len(result.renamed)}件"
+        f" 変更なし:{result.unchanged}件\n"
+    )
+
+
+def write_json(result: DeltaResult, output_path, old_label: str, new_label: str):
+    """差分をJSONで出力する"""
+
+    def entry_dict(entry: SnapshotEntry) -> dict:
+        return {
+            "path": entry.path,
+            "size": entry.size,
+            "mtime_ns": entry.mtime_ns,
+            "sha256": entry.sha256,
+        }
+
+    def sort_key(entry: SnapshotEntry) -> tuple:
+        return manifest.path_sort_key(entry.path)
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": DELTA_VERSION,
+                "old": old_label,
+                "new": new_label,
+                "summary": {
+                    "added": len(result.added),
+                    "removed": len(result.removed),
+                    "modified": len(result.modified),
+                    "renamed": len(result.renamed),
+                    "unchanged": result.unchanged,
+                },
+                "added": [entry_dict(e) for e in sorted(result.added, key=sort_key)],
+                "removed": [
+                    entry_dict(e) for e in sorted(result.removed, key=sort_key)
+                ],
+                "modified": [
+                    {"old": entry_dict(o), "new": entry_dict(n)}
+                    for o, n in sorted(result.modified, key=lambda p: sort_key(p[1]))
+                ],
+                "renamed": [
+                    {"old": entry_dict(o), "new": entry_dict(n)}
+                    for o, n in sorted(result.renamed, key=lambda p: sort_key(p[1]))
+                ],
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+        f.write("\n")
+
+
+class _Cursor:
+    """
+    比較中の納品物の現在位置。マニフェストの行は、必要になるまでJSONとして解釈しない。
+    """
+
+    def __init__(self, snapshot: Iterable[SnapshotEntry], label: str):
+        self.label = label
+        if isinstance(snapshot, ManifestSnapshot):
+            self._lines = snapshot.lines()
+            self._entries = None
+        else:
+            self._lines = None
+            self._entries = iter(snapshot)
+        self._previous_key = None
+        self.done = False
+        self.advance()
+
+    def advance(self):
+        self.line = None
+        self._entry = None
+        self._key = None
+        if self._lines is not None:
+            self.line = next(self._lines, None)
+            self.done = self.line is None
+        else:
+            self._entry = next(self._entries, None)
+            self.done = self._entry is None
+
+    def entry(self) -> SnapshotEntry:
+        if self._entry is None:
+            self._entry = _parse_line(self.line)
+        return self._entry
+
+    def key(self) -> tuple:
+        if self._key is None:
+            entry = self.entry()
+            self._key = manifest.path_sort_key(entry.path)
+            if self._previous_key is not None and self._key <= self._previous_key:
+                raise ValueError(
+                    f"{self.label}が相対パスの順に並んでいません: {entry.path}"
+                )
+            self._previous_key = self._key
+        return self._key
+
+
+def _parse_line(line: str) -> SnapshotEntry:
+    entry = manifest.ManifestEntry(**json.loads(line))
+    return SnapshotEntry(entry.path, entry.size, entry.mtime_ns, entry.sha256)
+
+
+def _is_modified(
+    old: SnapshotEntry, new: SnapshotEntry, check_hash: bool, hashes: dict
+) -> bool:
+    if old.size != new.size:
+        return True
+    if check_hash:
+        old_digest = _digest(old, hashes)
+        new_digest = _digest(new, hashes)
+        if old_digest is not None and new_digest is not None:
+            return old_digest != new_digest
+    return old.mtime_ns != new.mtime_ns
+
+
+def _detect_renames(result: DeltaResult, hashes: dict):
+    """
+    削除と追加の組のうち、内容が同じものを名前の変更に振り替える。
+    ハッシュは、同じサイズの組がある場合にだけ計算する。
+    """
+
+    removed_by_size = defaultdict(list)
+    for entry in result.removed:
+        removed_by_size[entry.size].append(entry)
+
+    matched = set()
+    added = []
+    for entry in result.added:
+        candidates = removed_by_size.get(entry.size)
+        match = None
+        if candidates:
+            digest = _digest(entry, hashes)
+            if digest is not None:
+                for i, old in enumerate(candidates):
+                    if _digest(old, hashes) == digest:
+                        match = candidates.pop(i)
+                        break
+        if match is None:
+            added.append(entry)
+        else:
+            matched.add(match.path)
+            result.renamed.append((match, entry))
+
+    result.added = added
+    result.removed = [entry for entry in result.removed if entry.path not in matched]
+
+
+def _digest(entry: SnapshotEntry, hashes: dict) -> Optional[str]:
+    """
+    エントリのSHA-256。記録がなければファイルから計算する (同じファイルは1回だけ)。
+    計算できない場合はNone。
+    """
+
+    if entry.sha256 is not None or entry.file_path is None:
+        return entry.sha256
+    digest = hashes.get(entry.file_path)
+    if digest is None:
+        try:
+            digest = copy_executor.sha256_file(entry.file_path)
+        except OSError as e:
+            logging.warning(f"ハッシュを計算できませんでした: {entry.file_path} ({e})")
+            return None
+        hashes[entry.file_path] = digest
+    return digest
+
+
+def _walk_delivery_root(root: str) -> Iterator[SnapshotEntry]:
+    """
+    納品先ルートを深さ優先・名前順に走査する (manifest.path_sort_key の順になる)。
+    """
+
+    stack = [("", iter(_sorted_scandir(root)))]
+    while stack:
+        rel_dir, it = stack[-1]
+        entry = next(it, None)
+        if entry is None:
+            stack.pop()
+            continue
+
+        rel_path = f"{rel_dir}{entry.name}"
+        if entry.is_dir(follow_symlinks=False):
+            # サブディレクトリの中身は、名前順でそのディレクトリの位置に並ぶ
+            stack.append((rel_path + "/", iter(_sorted_scandir(entry.path))))
+            continue
+        if not rel_dir and _is_delivery_metadata(entry.name):
+            continue
+        if entry.name.endswith(_WORK_FILE_SUFFIXES):
+            continue
+        st = entry.stat()
+        yield SnapshotEntry(rel_path, st.st_size, st.st_mtime_ns, None, entry.path)
+
+
+def _sorted_scandir(dir_path: str) -> list:
+    try:
+        with os.scandir(dir_path) as it:
+            return sorted(it, key=lambda e: e.name)
+    except OSError as e:
+        logging.warning(f"ディレクトリを読み込めませんでした: {dir_path} ({e})")
+        return []
+
+
+def _is_delivery_metadata(name: str) -> bool:
+    """納品先ルート直下のマニフェスト・チェックサムファイル (書き込み途中の一時ファイルを含む) か"""
+
+    return name.startswith(checksums.CHECKSUM_FILE_NAME) or name.startswith(
+        ".delivery_manifest."
+    )
@@ -0,0 +1,374 @@
+import contextlib
+import glob
+import json
+import logging
+import os
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import config_manager
+import copy_executor
+import file_processor
+from config_manager import DEFAULT_PER_DEVICE, DEFAULT_PROJECT_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# 設定ファイルのディレクトリを指定した場合に読み込むファイル
+CONFIG_FILE_PATTERN = "*.ini"
+
+REPORT_VERSION = 1
+_LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+
+class ProjectResult(NamedTuple):
+    """
+    1プロジェクト (設定ファイル1つ) 分の実行結果。
+
+    Attributes:
+        name (str): プロジェクト名 (設定ファイル名から拡張子を除いたもの)
+        config_path (str): 設定ファイルのパス
+        jobs (list[file_processor.JobResult]): ジョブごとの実行結果 (delivered は含まない)
+        elapsed (float): 所要時間 (秒)。待ち時間は含まない
+        error (str): 設定ファイルの読み込みなど、プロジェクト自体が失敗した場合のエラー
+        log_path (str): プロジェクトのログファイルのパス
+        started_at (float): 開始時刻 (time.time())
+    """
+
+    name: str
+    config_path: str
+    jobs: list
+    elapsed: float
+    error: Optional[str] = None
+    log_path: Optional[str] = None
+    started_at: float = 0.0
+
+    @property
+    def failed(self) -> bool:
+        return self.error is not None or any(
+            job.error is not None or job.summary.failed for job in self.jobs
+        )
+
+
+class _Project(NamedTuple):
+    name: str
+    config_path: Path
+    devices: frozenset
+
+
+def find_config_files(location) -> List[Path]:
+    """
+    設定ファイルを列挙する。
+
+    Args:
+        location: 設定ファイルのあるディレクトリ (直下の *.ini を使う)、
+            または設定ファイルのパターン (例: "projects/*/config.ini")
+
+    Returns:
+        list[Path]: 設定ファイルのパス (名前順)
+    """
+
+    location = str(location)
+    if os.path.isdir(location):
+        paths = glob.glob(os.path.join(glob.escape(location), CONFIG_FILE_PATTERN))
+    else:
+        paths = glob.glob(location, recursive=True)
+    return sorted(Path(p) for p in paths if os.path.isfile(p))
+
+
+def run_projects(
+    config_paths: List[Path],
+    log_dir,
+    workers: int = DEFAULT_PROJECT_WORKERS,
+    per_device: int = DEFAULT_PER_DEVICE,
+) -> List[ProjectResult]:
+    """
+    複数のプロジェクトの納品を、プロセスプールで並行して実行する。
+
+    各プロジェクトは別のプロセスで process_jobs と同じ処理を行い、ログと進捗表示は
+    log_dir/<プロジェクト名>.log に出力する。
+    同じデバイス (Teamsフォルダ・納品先のいずれか) を使うプロジェクトは、
+    per_device 件までしか同時に実行しない (共有フォルダへの同時アクセスで遅くならないように)。
+
+    Args:
+        config_paths (list[Path]): 設定ファイルのパス
+        log_dir: プロジェクトごとのログの出力先ディレクトリ
+        workers (int): 同時に実行するプロジェクト数 (プロセス数)
+        per_device (int): 1つのデバイスを同時に使うプロジェクト数の上限
+
+    Returns:
+        list[ProjectResult]: プロジェクトごとの実行結果 (config_paths の順)
+
+    Raises:
+        ValueError: workers または per_device が1未満の場合。
+    """
+
+    if workers < 1 or per_device < 1:
+        # 1未満では開始できるプロジェクトがなく、終わらなくなる
+        raise ValueError(
+            f"workers と per_device には1以上を指定してください。実際の値: {workers}, {per_device}"
+        )
+
+    names = _project_names(config_paths)
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    pending = []
+    for name, config_path in zip(names, config_paths):
+        try:
+            config = config_manager.load_config(Path(config_path))
+        except Exception as e:
+            logging.error(f"{name}: 設定ファイルを読み込めませんでした: {e}")
+            results[name] = ProjectResult(name, str(config_path), [], 0.0, str(e))
+            continue
+        devices = set()
+        for job in config["jobs"]:
+            devices.add(_device_key(job["teams_root_path"]))
+            devices.add(_device_key(job["delivery_root_path"]))
+        pending.append(_Project(name, Path(config_path), frozenset(devices)))
+
+    # デバイスごとの実行中のプロジェクト数。空きがあるプロジェクトから順に開始する
+    active = Counter()
+    running = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            for project in list(pending):
+                if len(running) >= workers:
+                    break
+                if all(active[device] < per_device for device in project.devices):
+                    pending.remove(project)
+                    active.update(project.devices)
+                    log_path = log_dir / f"{project.name}.log"
+                    logging.info(f"{project.name}: 開始 (ログ: {log_path})")
+                    future = executor.submit(
+                        _run_project,
+                        project.name,
+                        str(project.config_path),
+                        str(log_path),
+                    )
+                    running[future] = project
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                project = running.pop(future)
+                active.subtract(project.devices)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # ワーカープロセス自体が異常終了した場合
+                    result = ProjectResult(
+                        project.name, str(project.config_path), [], 0.0, str(e)
+                    )
+                results[project.name] = result
+                status = "失敗" if result.failed else "完了"
+                logging.info(f"{project.name}: {status} ({result.elapsed:.1f}秒)")
+
+    return [results[name] for name in names]
+
+
+def _run_project(name: str, config_path: str, log_path: str) -> ProjectResult:
+    """
+    ワーカープロセスで1プロジェクトを実行する。ログと標準出力はプロジェクトのログファイルに書く。
+    """
+
+    started_at = time.time()
+    start = time.perf_counter()
+    with open(log_path, "w", encoding="utf-8", buffering=1) as log_file:
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging.Formatter(_LOG_FORMAT))
+        root = logging.getLogger()
+        saved_handlers, saved_level = root.handlers[:], root.level
+        root.handlers = [handler]
+        root.setLevel(logging.INFO)
+        try:
+            with contextlib.redirect_stdout(log_file):
+                logging.info(f"iniファイル: {config_path}")
+                config = config_manager.load_config(Path(config_path))
+                jobs = file_processor.process_jobs(config)
+        except Exception as e:
+            logging.error(f"プロジェクトの実行中にエラーが発生しました: {e}")
+            return ProjectResult(
+                name,
+                config_path,
+                [],
+                time.perf_counter() - start,
+                str(e),
+                log_path,
+                started_at,
+            )
+        finally:
+            root.handlers = saved_handlers
+            root.setLevel(saved_level)
+
+    # 納品済みファイルの一覧は親プロセスに返さない (プロセス間の受け渡しを小さくする)
+    for job in jobs:
+        if job.summary is not None:
+            job.summary.delivered = []
+    jobs = [job._replace(error=str(job.error)) if job.error else job for job in jobs]
+    return ProjectResult(
+        name,
+        config_path,
+        jobs,
+        time.perf_counter() - start,
+        None,
+        log_path,
+        started_at,
+    )
+
+
+def print_report(results: List[ProjectResult], wall_seconds: float) -> int:
+    """
+    全プロジェクトの結果を1つの表にまとめて標準出力に表示する。
+
+    Returns:
+        int: 終了コード。失敗したプロジェクト・ファイルがある場合は1
+    """
+
+    print("--- プロジェクト別の実行結果 ---")
+    total = copy_executor.CopySummary()
+    exit_code = 0
+    for result in results:
+        summary = _project_summary(result)
+        status = "失敗" if result.failed else "OK"
+        detail = f" {result.error}" if result.error else ""
+        print(
+            f"[{status}] {result.name}: コピー:{summary.copied}件 変更なし:{summary.skipped}件"
+            f" 失敗:{summary.failed}件 不要:{summary.stale}件 ({result.elapsed:.1f}秒){detail}"
+        )
+        for field in ("copied", "skipped", "failed", "stale", "bytes_copied"):
+            setattr(total, field, getattr(total, field) + getattr(summary, field))
+        if result.failed:
+            exit_code = 1
+
+    busy = sum(result.elapsed for result in results)
+    print(
+        f"合計 {len(results)}プロジェクト コピー:{total.copied}件 変更なし:{total.skipped}件"
+        f" 失敗:{total.failed}件 不要:{total.stale}件"
+    )
+    print(
+        f"経過時間:{wall_seconds:.1f}秒 (各プロジェクトの所要時間の合計:{busy:.1f}秒)"
+    )
+    return exit_code
+
+
+def write_report(results: List[ProjectResult], wall_seconds: float, output_path):
+    """全プロジェクトの結果をJSONで出力する"""
+
+    projects = []
+    for result in results:
+        summary = _project_summary(result)
+        projects.append(
+            {
+                "name": result.name,
+                "config_path": result.config_path,
+                "status": "failed" if result.failed else "ok",
+                "error": result.error,
+                "log_path": result.log_path,
+                "started_at": result.started_at,
+                "elapsed_seconds": result.elapsed,
+                "copied": summary.copied,
+                "skipped": summary.skipped,
+                "failed": summary.failed,
+                "stale": summary.stale,
+                "bytes_copied": summary.bytes_copied,
+                "jobs": [
+                    {
+                        "name": job.name,
+                        "delivery_root": job.delivery_root,
+                        "elapsed_seconds": job.elapsed,
+                        "error": job.error,
+                    }
+                    for job in result.jobs
+                ],
+            }
+        )
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(
+            {
+                "version": REPORT_VERSION,
+                "wall_seconds": wall_seconds,
+                "projects": projects,
+            },
+            f,
+            ensure_ascii=False,
+            indent=2,
+        )
+        f.write("\n")
+
+
+def _project_summary(result: ProjectResult) -> copy_executor.CopySummary:
+    total = copy_executor.CopySummary()
+    for job in result.jobs:
+        if job.summary is None:
+            continue
+        for field in ("copied", "skipped", "failed", "stale", "bytes_copied"):
+            setattr(total, field, getattr(total, field) + getattr(job.summary, field))
+    return total
+
+
+def _project_names(config_paths: List[Path]) -> List[str]:
+    """
+    プロジェクト名 (ログファイル名・結果の識別に使う) を config_paths の順に返す。
+
+    設定ファイル名 (拡張子を除く) が重複する場合は、重複しなくなるまで親フォルダ名を
+    1つずつ先頭に付ける (例: projects/A/config.ini -> "A_config"、
+    a/x.ini と c/a/x.ini -> "a_x" では重複するため、さらに親フォルダ名を付けて "c_a_x")。
+    同じファイルが複数回指定された場合など、それでも重複する場合は連番を付ける。
+    """
+
+    paths = [Path(os.path.abspath(str(p))) for p in config_paths]
+    parents = [[part for part in p.parent.parts if part != p.anchor] for p in paths]
+    depths = [0] * len(paths)
+    names = [p.stem for p in paths]
+
+    while True:
+        # 同じ名前になっている、別のファイルのパス
+        same_name = {}
+        for name, path in zip(names, paths):
+            same_name.setdefault(name, set()).add(path)
+        extended = False
+        for i, name in enumerate(names):
+            if len(same_name[name]) > 1 and depths[i] < len(parents[i]):
+                depths[i] += 1
+                names[i] = "_".join(parents[i][-depths[i] :] + [paths[i].stem])
+                extended = True
+        if not extended:
+            break
+
+    counts = Counter(names)
+    used = set(names)
+    seen = Counter()
+    for i, name in enumerate(names):
+        if counts[name] == 1:
+            continue
+        seen[name] += 1
+        if seen[name] == 1:
+            continue
+        number = seen[name]
+        while f"{name}_{number}" in used:
+            number += 1
+        names[i] = f"{name}_{number}"
+        used.add(names[i])
+    return names
+
+
+def _device_key(path) -> str:
+    """
+    パスが属するデバイスの識別子。まだ存在しないパス (初回の納品先など) は、
+    存在する親フォルダのデバイスとする。取得できない場合はドライブ名・共有名を使う。
+    """
+
+    current = os.path.abspath(str(path))
+    while True:
+        try:
+            return f"dev:{os.stat(current).st_dev}"
+        except OSError:
+            parent = os.path.dirname(current)
+            if parent == current:
+                break
+            current = parent
+    drive, _ = os.path.splitdrive(os.path.abspath(str(path)))
+    return f"drive:{drive.lower()}"
@@ -0,0 +1,466 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, NamedTuple
+
+import rule_engine
+import walker
+
+logger = logging.getLogger(__name__)
+
+INDEX_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS roots (
+    root TEXT PRIMARY KEY,
+    phases TEXT NOT NULL,
+    mtime_ns INTEGER,
+    scanned_at REAL
+);
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    parent TEXT,
+    phase TEXT NOT NULL,
+    in_artifact INTEGER NOT NULL,
+    is_phase_root INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS dirs_parent ON dirs (parent);
+CREATE INDEX IF NOT EXISTS dirs_root ON dirs (root);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    dir TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    is_artifact INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_fold TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER
+);
+CREATE INDEX IF NOT EXISTS files_dir ON files (dir);
+CREATE INDEX IF NOT EXISTS files_name_fold ON files (name_fold);
+CREATE INDEX IF NOT EXISTS files_root_phase ON files (root, phase, is_artifact);
+"""
+
+
+class _FileStat(NamedTuple):
+    """os.stat_result のうち、納品処理が参照する項目だけを持つもの"""
+
+    st_size: int
+    st_mtime_ns: int
+
+
+class IndexedEntry:
+    """
+    索引に登録されたファイル。os.DirEntry と同じく name, path, stat() を持つため、
+    walker.WalkRecord の entry としてそのまま納品処理に渡せる。
+
+    stat() は索引の値ではなく実ファイルを参照する。ディレクトリの更新日時は
+    ファイルの上書きでは変わらないため、索引上のサイズ・更新日時は古い可能性がある。
+    コピー要否の判定には常に最新の値を使う (対象ファイルの分だけ stat が発生する)。
+    """
+
+    __slots__ = ("name", "path")
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+
+    def stat(self) -> os.stat_result:
+        return os.stat(self.path)
+
+
+class IndexRow(NamedTuple):
+    """パターン検索の結果1件"""
+
+    path: str
+    phase: str
+    is_artifact: bool
+    name: str
+    size: int
+    mtime_ns: int
+
+
+@dataclass
+class RefreshStats:
+    """
+    索引の更新結果。
+
+    Attributes:
+        dirs_checked (int): 更新日時を確認したディレクトリ数
+        dirs_rescanned (int): 中身を読み直したディレクトリ数
+        full_scan (bool): 全体を走査し直したか
+    """
+
+    dirs_checked: int = 0
+    dirs_rescanned: int = 0
+    full_scan: bool = False
+
+
+class FileIndex:
+    """
+    Teamsフォルダの納品対象候補ファイルを記録するSQLiteの索引。
+
+    1回目は全体を走査して記録する。2回目以降は記録済みの各ディレクトリの更新日時だけを
+    確認し、変化のあったディレクトリ (ファイルの追加・削除・名前変更があったもの) だけを
+    読み直す。これにより、同じTeamsフォルダに対する複数回の実行やパターン検索で
+    毎回全体を走査せずに済む。
+
+    記録するのは walker.walk_phase_tree が返すファイル (フェーズ直下と成果物配下) のみ。
+    フェーズ構成 (マッピング) が変わった場合は全体を走査し直す。
+    照合用に正規化したファイル名 (name_fold) も記録する。正規化の方法 (fold_width の設定) が
+    前回と異なる場合は、記録済みのファイル名から作り直す。
+    """
+
+    def __init__(self, db_path, fold: Callable[[str], str] = rule_engine.fold_name):
+        """
+        Args:
+            db_path: 索引ファイル (SQLite) のパス
+            fold (Callable[[str], str]): ファイル名の正規化関数。照合に使う RuleEngine の fold を渡す
+        """
+
+        self.db_path = db_path
+        self.fold = fold
+        self._conn = sqlite3.connect(str(db_path))
+        self._conn.executescript(_SCHEMA)
+        version = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'schema_version'"
+        ).fetchone()
+        if version is None:
+            self._conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(INDEX_SCHEMA_VERSION),),
+            )
+        elif int(version[0]) != INDEX_SCHEMA_VERSION:
+            raise ValueError(
+                f"索引の形式が異なります。索引ファイルを削除して作り直してください: {db_path}"
+            )
+        self._sync_fold()
+        self._conn.commit()
+
+    def _sync_fold(self):
+        """記録済みの name_fold が self.fold と異なる正規化で作られていれば作り直す"""
+
+        fold_id = f"{self.fold.__module__}.{self.fold.__qualname__}"
+        recorded = self._conn.execute(
+            "SELECT value FROM meta WHERE key = 'name_fold'"
+        ).fetchone()
+        if recorded is not None and recorded[0] == fold_id:
+            return
+        if recorded is not None:
+            logging.info(
+                f"ファイル名の正規化の設定が変わったため、索引の照合用の名前を作り直します: {self.db_path}"
+            )
+            rows = self._conn.execute("SELECT path, name FROM files").fetchall()
+            self._conn.executemany(
+                "UPDATE files SET name_fold = ? WHERE path = ?",
+                [(self.fold(name), path) for path, name in rows],
+            )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES ('name_fold', ?)",
+            (fold_id,),
+        )
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def refresh(self, src_base, phases, full: bool = False) -> RefreshStats:
+        """
+        索引を最新の状態にする。
+
+        Args:
+            src_base: Teamsのルートパス
+            phases: フェーズフォルダ名の集合
+            full (bool): Trueなら更新日時に関係なく全体を走査し直す
+
+        Returns:
+            RefreshStats: 更新結果
+        """
+
+        root = os.path.abspath(src_base)
+        phases_json = json.dumps(sorted(phases), ensure_ascii=False)
+        stats = RefreshStats()
+
+        with self._conn:
+            known = self._conn.execute(
+                "SELECT phases, mtime_ns FROM roots WHERE root = ?", (root,)
+            ).fetchone()
+            if full or known is None or known[0] != phases_json:
+                stats.full_scan = True
+                self._delete_root(root)
+                self._scan_root(root, phases, stats)
+            else:
+                self._revalidate(root, phases, known[1], stats)
+            self._conn.execute(
+                "UPDATE roots SET phases = ?, scanned_at = ? WHERE root = ?",
+                (phases_json, time.time(), root),
+            )
+
+        logging.info(
+            f"索引を更新しました: {self.db_path} (確認 {stats.dirs_checked} ディレクトリ,"
+            f" 読み直し {stats.dirs_rescanned} ディレクトリ"
+            f"{', 全体走査' if stats.full_scan else ''})"
+        )
+        return stats
+
+    def records(self, src_base) -> Iterator[walker.WalkRecord]:
+        """
+        索引からマッチング対象のファイルを返す (walker.walk_phase_tree の代わりに使える)。
+        正規化済みのファイル名 (folded_name) には索引に記録したものを使う。
+        """
+
+        root = os.path.abspath(src_base)
+        cursor = self._conn.execute(
+            "SELECT phase, is_artifact, name, path, name_fold FROM files"
+            " WHERE root = ? ORDER BY path",
+            (root,),
+        )
+        for phase, is_artifact, name, path, name_fold in cursor:
+            yield walker.WalkRecord(
+                phase, bool(is_artifact), IndexedEntry(name, path), name_fold
+            )
+
+    def query(self, pattern: str, src_base=None) -> List[IndexRow]:
+        """
+        ファイル名のワイルドカードパターン (* と ?) に合致するファイルを索引から検索する。
+        ファイル名とパターンは self.fold で正規化して比較する (大文字小文字を区別しない。
+        fold_width の設定では全角・半角も区別しない)。
+        パターンの先頭がワイルドカードでなければ索引で絞り込まれる。
+
+        Args:
+            pattern (str): ファイル名のパターン (例: "レビュー記録表_*.xlsx")
+            src_base: 指定された場合、このルート配下のファイルに限定する
+        """
+
+        sql = (
+            "SELECT path, phase, is_artifact, name, size, mtime_ns FROM files"
+            " WHERE name_fold GLOB ?"
+        )
+        params = [_escape_glob(self.fold(pattern))]
+        if src_base is not None:
+            sql += " AND root = ?"
+            params.append(os.path.abspath(src_base))
+        sql += " ORDER BY path"
+        return [
+            IndexRow(path, phase, bool(is_artifact), name, size, mtime_ns)
+            for path, phase, is_artifact, name, size, mtime_ns in self._conn.execute(
+                sql, params
+            )
+        ]
+
+    def _scan_root(self, root: str, phases, stats: RefreshStats):
+        """ルートから全体を走査して記録する"""
+
+        mtime_ns = _dir_mtime_ns(root)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO roots (root, phases, mtime_ns) VALUES (?, ?, ?)",
+            (root, "", mtime_ns),
+        )
+        walk_stats = walker.WalkStats()
+        for task in walker.list_phase_dirs(root, phases, walk_stats):
+            self._scan_tree(root, None, task, stats)
+
+    def _scan_tree(self, root: str, parent, task: walker.DirTask, stats: RefreshStats):
+        """ディレクトリとその配下をすべて走査して記録する"""
+
+        stack = [(parent, task)]
+        while stack:
+            parent, task = stack.pop()
+            for subdir in self._scan_one(root, parent, task, stats):
+                stack.append((task.path, subdir))
+
+    def _scan_one(
+        self, root: str, parent, task: walker.DirTask, stats: RefreshStats
+    ) -> list:
+        """
+        ディレクトリ1つを読み直し、直下のファイルの記録を置き換える。
+
+        Returns:
+            list[walker.DirTask]: サブディレクトリ
+        """
+
+        stats.dirs_rescanned += 1
+        # 読み込み前の更新日時を記録する (読み込み中に変化した場合は次回読み直される)
+        mtime_ns = _dir_mtime_ns(task.path)
+        records, subdirs = walker.scan_dir(task, walker.WalkStats(), fold=self.fold)
+
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dirs"
+            " (path, root, parent, phase, in_artifact, is_phase_root, mtime_ns)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                task.path,
+                root,
+                parent,
+                task.phase,
+                task.in_artifact,
+                task.is_phase_root,
+                mtime_ns,
+            ),
+        )
+        self._conn.execute("DELETE FROM files WHERE dir = ?", (task.path,))
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files"
+            " (path, root, dir, phase, is_artifact, name, name_fold, size, mtime_ns)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                (
+                    r.entry.path,
+                    root,
+                    task.path,
+                    r.phase,
+                    r.is_artifact,
+                    r.entry.name,
+                    r.folded_name,
+                    *_entry_stat(r.entry),
+                )
+                for r in records
+            ],
+        )
+        return subdirs
+
+    def _revalidate(self, root: str, phases, root_mtime_ns, stats: RefreshStats):
+        """
+        記録済みのディレクトリの更新日時を確認し、変化したものだけを読み直す。
+        """
+
+        # ルート直下: フェーズフォルダの追加・削除
+        stats.dirs_checked += 1
+        current_root_mtime = _dir_mtime_ns(root)
+        if current_root_mtime != root_mtime_ns:
+            stats.dirs_rescanned += 1
+            self._sync_children(
+                root,
+                None,
+                walker.list_phase_dirs(root, phases, walker.WalkStats()),
+                stats,
+            )
+            self._conn.execute(
+                "UPDATE roots SET mtime_ns = ? WHERE root = ?",
+                (current_root_mtime, root),
+            )
+
+        rows = self._conn.execute(
+            "SELECT path, phase, in_artifact, is_phase_root, mtime_ns FROM dirs"
+            " WHERE root = ? ORDER BY path",
+            (root,),
+        ).fetchall()
+
+        removed = []  # このループ中に削除したディレクトリ
+        for path, phase, in_artifact, is_phase_root, mtime_ns in rows:
+            if any(_is_same_or_descendant(path, r) for r in removed):
+                continue
+
+            stats.dirs_checked += 1
+            current = _dir_mtime_ns(path)
+            if current is None:
+                self._delete_subtree(path)
+                removed.append(path)
+                continue
+            if current == mtime_ns:
+                continue
+
+            task = walker.DirTask(phase, bool(in_artifact), path, bool(is_phase_root))
+            subdirs = self._scan_one(root, self._parent_of(path), task, stats)
+            removed.extend(self._sync_children(root, path, subdirs, stats))
+
+    def _sync_children(self, root: str, parent, subdirs: list, stats) -> list:
+        """
+        読み直したディレクトリの子ディレクトリについて、新しいものは走査して記録し、
+        なくなったものは配下ごと記録を削除する。
+
+        Returns:
+            list[str]: 削除したディレクトリのパス
+        """
+
+        if parent is None:
+            known = self._conn.execute(
+                "SELECT path FROM dirs WHERE root = ? AND parent IS NULL", (root,)
+            ).fetchall()
+        else:
+            known = self._conn.execute(
+                "SELECT path FROM dirs WHERE parent = ?", (parent,)
+            ).fetchall()
+        known_paths = {path for (path,) in known}
+        current_paths = {task.path for task in subdirs}
+
+        for task in subdirs:
+            if task.path not in known_paths:
+                self._scan_tree(root, parent, task, stats)
+
+        removed = sorted(known_paths - current_paths)
+        for path in removed:
+            self._delete_subtree(path)
+        return removed
+
+    def _parent_of(self, path: str):
+        row = self._conn.execute(
+            "SELECT parent FROM dirs WHERE path = ?", (path,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def _delete_subtree(self, path: str):
+        """ディレクトリとその配下の記録を削除する"""
+
+        low, high = _descendant_range(path)
+        self._conn.execute(
+            "DELETE FROM dirs WHERE path = ? OR (path >= ? AND path < ?)",
+            (path, low, high),
+        )
+        self._conn.execute(
+            "DELETE FROM files WHERE dir = ? OR (dir >= ? AND dir < ?)",
+            (path, low, high),
+        )
+
+    def _delete_root(self, root: str):
+        self._conn.execute("DELETE FROM dirs WHERE root = ?", (root,))
+        self._conn.execute("DELETE FROM files WHERE root = ?", (root,))
+        self._conn.execute("DELETE FROM roots WHERE root = ?", (root,))
+
+
+def _dir_mtime_ns(path: str):
+    """ディレクトリの更新日時 (ナノ秒)。存在しない場合はNone"""
+
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _entry_stat(entry: os.DirEntry) -> tuple:
+    try:
+        st = entry.stat()
+    except OSError:
+        return None, None
+    return st.st_size, st.st_mtime_ns
+
+
+def _descendant_range(path: str) -> tuple:
+    """
+    path 配下のパスが取り得る文字列の範囲 [low, high) を返す。
+    LIKE を使うとファイル名によく含まれる "_" のエスケープが必要になるため、範囲検索にする。
+    """
+
+    return path + os.sep, path + chr(ord(os.sep) + 1)
+
+
+def _is_same_or_descendant(path: str, ancestor: str) -> bool:
+    return path == ancestor or path.startswith(ancestor + os.sep)
+
+
+def _escape_glob(pattern: str) -> str:
+    """SQLiteのGLOBで特別な意味を持つ [ と ] をエスケープする (* と ? はそのまま使う)"""
+
+    return "".join(f"[{c}]" if c in "[]" else c for c in pattern)
@@ -1,159 +1,1299 @@
+from __future__ import annotations
+
+import collections
+import concurrent.futures
+import contextlib
+import functools
 import logging
 import os
-import shutil
+import threading
+import time
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+
+import config_manager
+import copy_executor
+import copy_plan
+import manifest
+import rule_engine
+import tree_report
+import walker
 
+# 次のモジュールは、使う場合 (索引・SHA256SUMS・リンク・ZIP) にだけ関数の中で読み込む。
+# main.py が何度も呼ばれるため、ドライランや通常のコピーの起動を遅くしないようにする
+if TYPE_CHECKING:
+    import link_copy
+    import metrics
+    import skip_audit
 
 logger = logging.getLogger(__name__)
 
 
-def process_files(path_config: dict):
+def process_files(
+    path_config: dict,
+    rules: rule_engine.RuleEngine = None,
+    records: Iterable[walker.WalkRecord] = None,
+    pool: copy_executor.CopyPool = None,
+    run_metrics: metrics.RunMetrics = None,
+    audit: skip_audit.SkipAuditWriter = None,
+    shared: SharedRootJob = None,
+):
     """
     基準パスを構築し、指定されたファイルパターンに合致するファイルをTeamsパスから探し、コピーする。
 
+    コピー計画 (plan_delivery) を作りながら、その計画を順に実行する (execute_plan)。
+    計画は1件ずつ受け渡すため、走査とコピーは並行して進む。
+
     Args:
         config (dict): 設定ファイルの読み込み結果
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール。
+            省略時は設定の "mappings" (なければ既定のマッピング) から作成する
+        records (Iterable[walker.WalkRecord]): マッチング対象のファイル。
+            省略時はTeamsフォルダを走査する (索引を使う場合は file_index.FileIndex.records)
+        pool (copy_executor.CopyPool): 複数ジョブで共有するコピー用のプール。
+            省略時はこの呼び出し専用のプールを作成する
+        run_metrics (metrics.RunMetrics): 指定された場合、件数や段階ごとの所要時間を加算する
+        audit (skip_audit.SkipAuditWriter): 指定された場合、納品対象にならなかったファイルを記録する
+        shared (SharedRootJob): 同じ納品先ルートに納品する他のジョブと調整する場合に指定する
+            (execute_plan を参照)
 
     Returns:
-        なし
+        copy_executor.CopySummary: コピー件数などの集計結果
     """
 
-    # 設定情報
-    config = {
-        "030.調査": {
-            "top_level_matcher": ["調査検討書_"],
-            "artifact_matcher": [
-                "030_レビューチェックリスト_",
-                "レビュー記録表_調査",
-            ],
-        },
-        "040.設計": {
-            "top_level_matcher": ["機能設計書_"],
-            "artifact_matcher": ["040_レビューチェックリスト_", "レビュー記録表_設計"],
-        },
-        "050.製造": {
-            "top_level_matcher": [],
-            "artifact_matcher": ["050_レビューチェックリスト_", "レビュー記録表_CD"],
-        },
-        "060.UD作成": {
-            "top_level_matcher": ["単体試験仕様書_"],
-            "artifact_matcher": [
-                "060_レビューチェックリスト_",
-                "レビュー記録表_UD作成",
-            ],
-        },
-        "070.UD消化": {
-            "top_level_matcher": ["単体試験成績書_"],
-            "artifact_matcher": [
-                "070_レビューチェックリスト_",
-                "レビュー記録表_UD消化",
-            ],
-        },
-        "080.SD作成": {
-            "top_level_matcher": ["結合試験仕様書_"],
-            "artifact_matcher": [
-                "080_レビューチェックリスト_",
-                "レビュー記録表_SD作成",
-            ],
-        },
-        "090.SD消化": {
-            "top_level_matcher": ["結合試験成績書_", "試験結果報告書_"],
-            "artifact_matcher": [
-                "090_レビューチェックリスト_",
-                "レビュー記録表_SD消化",
-            ],
-        },
-    }
-
     # コピー元とコピー先のベースパス
     # 環境に合わせてパスを適宜変更してください
     src_base = path_config["teams_root_path"]
     dst_base = path_config["delivery_root_path"]
 
-    logging.info(f"--- ファイルコピーを開始します ---")
-    logging.info(f"探索先ルートバス:{src_base}")
+    # 複数ジョブを同時に実行する場合は、進捗表示の先頭にジョブ名を付ける
+    job_name = path_config.get("job_name")
+    prefix = f"[{job_name}] " if job_name else ""
+
+    logging.info(f"--- {prefix}ファイルコピーを開始します ---")
+    logging.info(f"{prefix}探索先ルートバス:{src_base}")
+
+    stats = walker.WalkStats()
+    if _is_zip_delivery(path_config):
+        # ZIPは毎回すべてのファイルから作り直す (マニフェストは使わない)
+        ops = plan_delivery(
+            path_config,
+            rules,
+            records,
+            {},
+            stats,
+            run_metrics,
+            audit=audit,
+        )
+        summary = execute_plan(path_config, ops, pool=pool, run_metrics=run_metrics)
+        import archive_writer
+
+        output_path = archive_writer.archive_file_path(dst_base, job_name)
+    else:
+        # 前回の納品内容 (マニフェスト) を読み込む。コピー元が変わっていないファイルはコピーしない
+        # 計画側には読み込んだ時点の内容を渡す (実行側はコピーのたびに記録を更新するため)
+        delivered = manifest.Manifest.for_delivery_root(dst_base, job_name)
+        ops = plan_delivery(
+            path_config,
+            rules,
+            records,
+            dict(delivered.entries),
+            stats,
+            run_metrics,
+            audit=audit,
+        )
+        summary = execute_plan(path_config, ops, delivered, pool, run_metrics, shared)
+        output_path = dst_base
+
+    if run_metrics is not None:
+        run_metrics.merge(
+            counters={
+                "dirs_visited": stats.dirs_visited,
+                "dirs_pruned": stats.dirs_pruned,
+            }
+        )
+    if stats.dirs_visited:
+        logging.info(
+            f"走査ディレクトリ数:{stats.dirs_visited} (枝刈り:{stats.dirs_pruned})"
+        )
+    logging.info(f"{prefix}コピー先ベースディレクトリパス:{output_path}")
+    logging.info(
+        f"{prefix}コピー:{summary.copied}件 変更なし:{summary.skipped}件 失敗:{summary.failed}件"
+        f" 不要:{summary.stale}件"
+    )
+    logging.info(f"--- {prefix}ファイルコピーが完了しました ---")
+
+    return summary
+
+
+def process_changes(
+    path_config: dict,
+    rules: rule_engine.RuleEngine,
+    records: Iterable[walker.WalkRecord],
+    dir_paths: Collection[str],
+    pool: copy_executor.CopyPool = None,
+    claimed: Collection[str] = (),
+) -> copy_executor.CopySummary:
+    """
+    変更のあったディレクトリの納品対象だけをコピーし直す (監視モード用)。
+
+    dir_paths 内のファイルから前回納品したもののうち、records に含まれないものは
+    不要ファイルとして扱う。それ以外のディレクトリから納品したファイルには触れない。
+    ZIP納品はファイル単位で更新できないため、process_files で作り直すこと。
+
+    Args:
+        path_config (dict): 設定ファイルの読み込み結果 (1ジョブ分)
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール
+        records (Iterable[walker.WalkRecord]): dir_paths 内のマッチング対象のファイル (すべて)
+        dir_paths (Collection[str]): 変更のあったディレクトリのパス (削除されたものを含む)
+        pool (copy_executor.CopyPool): 複数ジョブで共有するコピー用のプール
+        claimed (Collection[str]): 同じ納品先ルートに他のジョブが納品済みの相対パス。
+            同名ファイルとして扱い、上書きしない
+
+    Returns:
+        copy_executor.CopySummary: コピー件数などの集計結果 (delivered は納品先全体)
+    """
+
+    job_name = path_config.get("job_name")
+    prefix = f"[{job_name}] " if job_name else ""
+    delivered = manifest.Manifest.for_delivery_root(
+        path_config["delivery_root_path"], job_name
+    )
+
+    # 変更のあったディレクトリから納品したものだけを計画の比較対象にする
+    dir_paths = set(dir_paths)
+    previous = {}
+    claimed = set(claimed)
+    for path, entry in delivered.entries.items():
+        if os.path.dirname(entry.src) in dir_paths:
+            previous[path] = entry
+        else:
+            claimed.add(path)
+
+    ops = plan_delivery(path_config, rules, records, previous, claimed=claimed)
+    summary = execute_plan(path_config, ops, delivered, pool)
+    logging.info(
+        f"{prefix}変更の反映 コピー:{summary.copied}件 変更なし:{summary.skipped}件"
+        f" 失敗:{summary.failed}件 不要:{summary.stale}件"
+    )
+    return summary
+
+
+def plan_delivery(
+    path_config: dict,
+    rules: rule_engine.RuleEngine = None,
+    records: Iterable[walker.WalkRecord] = None,
+    previous: Dict[str, manifest.ManifestEntry] = None,
+    stats: walker.WalkStats = None,
+    run_metrics: metrics.RunMetrics = None,
+    claimed: Collection[str] = (),
+    audit: skip_audit.SkipAuditWriter = None,
+) -> Iterator[copy_plan.PlanOp]:
+    """
+    Teamsフォルダを走査して納品対象を探し、コピー計画を1件ずつ返す。
+    ファイルのコピーやディレクトリの作成は一切行わない。
+
+    Args:
+        path_config (dict): 設定ファイルの読み込み結果 (1ジョブ分)
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール
+        records (Iterable[walker.WalkRecord]): マッチング対象のファイル。省略時はTeamsフォルダを走査する
+        previous (dict): 前回の納品内容 (相対パス -> ManifestEntry)。省略時は納品先のマニフェストを読み込む
+        stats (walker.WalkStats): 指定された場合、走査の統計情報を加算する
+        run_metrics (metrics.RunMetrics): 指定された場合、照合件数と段階ごとの所要時間を加算する
+        claimed (Collection[str]): 他のファイルや他のジョブから納品済みの相対パス。
+            同名ファイルとして扱い、上書きしない
+        audit (skip_audit.SkipAuditWriter): 指定された場合、納品対象にならなかったファイルを
+            理由とともに記録する (records を指定した場合、成果物フォルダの外のファイルは記録されない)
+
+    Yields:
+        copy_plan.PlanOp: コピー計画の操作。走査順に copy/skip を返し、最後に stale を返す
+    """
+
+    # マッチングルールは起動時に1回だけコンパイルする
+    if rules is None:
+        rules = rule_engine.RuleEngine.from_config(path_config)
+
+    src_base = path_config["teams_root_path"]
+    job_name = path_config.get("job_name")
+    prefix = f"[{job_name}] " if job_name else ""
+    if previous is None:
+        if _is_zip_delivery(path_config):
+            previous = {}
+        else:
+            previous = manifest.Manifest.for_delivery_root(
+                path_config["delivery_root_path"], job_name
+            ).entries
+    unchanged = manifest.Manifest(None, previous)
+    hash_files = path_config.get("hash_files", False)
+
+    # 今回の納品対象 (納品先ルートからの相対パス)
+    seen_paths = set(claimed)
+
+    # 計測値はこの中でまとめ、最後に1回だけ run_metrics に加える
+    perf = time.perf_counter
+    stage_seconds = collections.Counter()
+    counters = collections.Counter()
+    matched_by_phase = collections.Counter()
+    matched_by_rule = collections.Counter()
+
+    # フェーズフォルダ配下だけを走査する (フェーズ以外のフォルダには降りない)
+    if records is None:
+        on_skip = None
+        if audit is not None:
+            on_skip = functools.partial(audit.outside_artifact, job_name)
+        records = walker.walk_phase_tree(
+            src_base, rules.phases, stats, on_skip, rules.fold
+        )
+    for record in _timed(records, stage_seconds, "walk"):
+        counters["files_examined"] += 1
+        start = perf()
+        rule = rules.match(
+            record.phase, record.is_artifact, record.entry.name, record.folded_name
+        )
+        stage_seconds["match"] += perf() - start
+        if rule is None:
+            # どのルールにも合致しなかったファイルはコピーしない (要件2.1と2.2の注意点、要件3)
+            if audit is not None:
+                audit.unmatched(job_name, record)
+            continue
+
+        if not record.is_artifact:
+            # 2.1. 対象ディレクトリ直下のドキュメントファイル (トップレベルドキュメント) のコピー
+            # 例: src_base/030.調査 直下のファイル -> dst_base/030.調査
+            rel_dir = record.phase
+        else:
+            # 2.2. 「成果物」ディレクトリ内の特定ファイルのコピー (フラット化)
+            # 例: src_base/030.調査/成果物/内部 配下のファイル -> dst_base/030.調査/成果物
+            rel_dir = f"{record.phase}/{walker.ARTIFACT_DIR_NAME}"
+
+        rel_path = f"{rel_dir}/{record.entry.name}"
+        if rel_path in seen_paths:
+            # 成果物のフラット化で同名ファイルが重なった場合は、先に見つかった方を納品する
+            copy_executor.print_message(
+                f"{prefix}同名ファイルのためスキップ: {record.entry.path}"
+            )
+            counters["duplicate_names"] += 1
+            if audit is not None:
+                audit.duplicate_name(job_name, record, rule)
+            continue
+        seen_paths.add(rel_path)
+        counters["files_matched"] += 1
+        matched_by_phase[record.phase] += 1
+        matched_by_rule[f"{rule.pattern} = {rel_dir}"] += 1
+
+        start = perf()
+        size, mtime_ns = _file_stat(record.entry)
+        stage_seconds["stat"] += perf() - start
+        action = copy_plan.ACTION_COPY
+        if unchanged.is_unchanged(rel_path, record.entry.path, size, mtime_ns):
+            action = copy_plan.ACTION_SKIP
+            if hash_files and not previous[rel_path].sha256:
+                # hash_filesを後から有効にした場合、SHA-256の記録がないファイルはコピーし直す
+                action = copy_plan.ACTION_COPY
+        yield copy_plan.PlanOp(action, rel_path, record.entry.path, size, mtime_ns)
+
+    if run_metrics is not None:
+        run_metrics.merge(counters, stage_seconds, matched_by_phase, matched_by_rule)
+
+    # 前回納品したが、今回はコピー元に見つからなかったファイル
+    for path in sorted(previous, key=manifest.path_sort_key):
+        if path not in seen_paths:
+            entry = previous[path]
+            yield copy_plan.PlanOp(
+                copy_plan.ACTION_STALE, path, entry.src, entry.size, entry.mtime_ns
+            )
+
+
+def _timed(iterable: Iterable, stage_seconds: collections.Counter, stage: str):
+    """
+    iterable から次の要素を取り出すのにかかった時間だけを stage_seconds[stage] に加える
+    (要素を受け取った側の処理時間は含めない)。
+    """
+
+    it = iter(iterable)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            stage_seconds[stage] += time.perf_counter() - start
+            return
+        stage_seconds[stage] += time.perf_counter() - start
+        yield item
+
+
+def execute_plan(
+    path_config: dict,
+    ops: Iterable[copy_plan.PlanOp],
+    delivered: manifest.Manifest = None,
+    pool: copy_executor.CopyPool = None,
+    run_metrics: metrics.RunMetrics = None,
+    shared: SharedRootJob = None,
+) -> copy_executor.CopySummary:
+    """
+    コピー計画を先頭から順に実行し、マニフェストを更新する。コピー元の走査は行わない。
+    delivery_format = zip の場合は、納品先にコピーする代わりにZIPファイルへ書き込む。
+
+    Args:
+        path_config (dict): 設定ファイルの読み込み結果 (1ジョブ分)
+        ops (Iterable[copy_plan.PlanOp]): コピー計画。plan_delivery の戻り値、または保存済みの計画
+        delivered (manifest.Manifest): 納品済みファイルの記録。省略時は納品先のマニフェストを読み込む
+        pool (copy_executor.CopyPool): 複数ジョブで共有するコピー用のプール
+        run_metrics (metrics.RunMetrics): 指定された場合、コピー件数と所要時間を加算する
+        shared (SharedRootJob): 同じ納品先ルートに納品する他のジョブと調整する場合に指定する。
+            先のジョブが納品するパスは計画から除き、不要ファイルの処理は
+            SharedDeliveryRoot.finish() まで行わない
+
+    Returns:
+        copy_executor.CopySummary: コピー件数などの集計結果
+    """
+
+    if _is_zip_delivery(path_config):
+        return _execute_plan_to_archive(path_config, ops, pool, run_metrics)
+
+    dst_base = path_config["delivery_root_path"]
+    job_name = path_config.get("job_name")
+    prefix = f"[{job_name}] " if job_name else ""
+    stale_action = path_config.get("stale_files", config_manager.STALE_FILE_ACTIONS[0])
+    hash_files = path_config.get("hash_files", False)
 
     # コピー先ベースディレクトリをまず作成
     os.makedirs(dst_base, exist_ok=True)
+    if delivered is None:
+        delivered = manifest.Manifest.for_delivery_root(dst_base, job_name)
+    if shared is not None:
+        ops = shared.claim(ops, delivered, prefix)
 
-    # os.walkでコピー元ディレクトリツリーを走査
-    for root, _, files in os.walk(src_base):
-        # src_baseからの相対パスを取得
-        relative_path = os.path.relpath(root, src_base)
-        path_parts = relative_path.split(os.sep)
-
-        # 「対象ディレクトリ」のキーを特定 (例: "010.調査")
-        target_folder_key = None
-        if path_parts and path_parts[0] in config:
-            target_folder_key = path_parts[0]
-
-        # 対象ディレクトリではない場合、このパス以下のファイルは処理しない
-        if (
-            target_folder_key is None and relative_path != "."
-        ):  # '.'はsrc_base自体なので、その中のファイルは処理対象
-            continue
+    perf = time.perf_counter
+    stage_seconds = collections.Counter()
+    latencies = []
 
-        # ファイルの処理
-        for file_name in files:
-            src_file_path = os.path.join(root, file_name)
-            file_name_lower = file_name.lower()  # マッチングのために小文字化
+    def on_result(result: copy_executor.CopyResult):
+        """コピー結果を表示し、マニフェストに反映する (submit順に1件ずつ呼ばれる)"""
 
-            # コピー済みフラグ
-            copied = False
+        copy_executor.print_progress(result)
+        if result.status != copy_executor.STATUS_SKIPPED:
+            latencies.append(result.elapsed)
+        task = result.task
+        rel_path = os.path.relpath(task.dst, dst_base).replace(os.sep, "/")
+        if result.status == copy_executor.STATUS_COPIED:
+            delivered.update(
+                manifest.ManifestEntry(
+                    rel_path, task.src, task.size, task.mtime_ns, result.sha256
+                )
+            )
+        elif result.status == copy_executor.STATUS_FAILED:
+            # コピー先が中途半端な状態の可能性があるため、次回は必ずコピーし直す
+            delivered.remove(rel_path)
 
-            # 2.1. 対象ディレクトリ直下のドキュメントファイル (トップレベルドキュメント) のコピー
-            # rootがsrc_base/010.調査 のようなパスで、その中にファイルがある場合
-            if relative_path == target_folder_key and target_folder_key:
-                matchers = config[target_folder_key].get("top_level_matcher", [])
-                for matcher in matchers:
-                    if file_name_lower.startswith(matcher.lower()):
-                        # コピー先のディレクトリパスを作成 (例: dst_base/010.調査)
-                        dst_dir = os.path.join(dst_base, target_folder_key)
-                        os.makedirs(
-                            dst_dir, exist_ok=True
-                        )  # ディレクトリがなければ作成
-
-                        dst_file_path = os.path.join(dst_dir, file_name)
-                        if not os.path.exists(
-                            dst_file_path
-                        ):  # ファイルが既に存在しなければコピー
-                            shutil.copy2(src_file_path, dst_file_path)
-                            print(f"コピー (トップレベル): {file_name} -> {dst_dir}")
-                        copied = True
-                        break
-                if copied:  # コピーされたら次のファイルへ
+    # コピーはスレッドプールで行い、計画の読み込み (走査) はその間も進める
+    large_file_threshold = (
+        path_config.get("large_file_mb", config_manager.DEFAULT_LARGE_FILE_MB)
+        * 1024
+        * 1024
+    )
+    copy_func = (
+        copy_executor.copy_file_with_hash if hash_files else copy_executor.copy_file
+    )
+    # 大きなファイルは、中断しても次回に続きからコピーできる方法でコピーする
+    large_copy_func = functools.partial(
+        copy_executor.copy_file_resumable, with_hash=hash_files
+    )
+    copier = None
+    link_mode = path_config.get("link_mode", config_manager.LINK_MODES[0])
+    if link_mode != "copy" or path_config.get("dedup", False):
+        # リンク・重複排除を使う場合は、コピーするかどうかをファイルごとに LinkCopier が決める
+        import link_copy
+
+        copier = link_copy.LinkCopier(
+            link_mode, path_config.get("dedup", False), hash_files, large_file_threshold
+        )
+        copy_func = copier
+        large_copy_func = None
+
+    executor = copy_executor.CopyExecutor(
+        max_workers=path_config.get(
+            "copy_workers", config_manager.DEFAULT_COPY_WORKERS
+        ),
+        max_inflight_bytes=path_config.get(
+            "max_inflight_mb", config_manager.DEFAULT_MAX_INFLIGHT_MB
+        )
+        * 1024
+        * 1024,
+        copy_func=copy_func,
+        on_result=on_result,
+        pool=pool,
+        large_copy_func=large_copy_func,
+        large_file_threshold=large_file_threshold,
+    )
+    # 作成済みのコピー先ディレクトリ (os.makedirsの重複呼び出しを避ける)
+    created_dirs = set()
+    stale_paths = []
+
+    with executor:
+        for op in ops:
+            if op.action == copy_plan.ACTION_STALE:
+                # 不要ファイルの削除は、コピーがすべて終わってから行う
+                stale_paths.append(op.path)
+                continue
+
+            label = "コピー (トップレベル)" if op.is_top_level else "コピー"
+            rel_dir, _, name = op.path.rpartition("/")
+            dst_dir = os.path.join(dst_base, *rel_dir.split("/"))
+            task = copy_executor.CopyTask(
+                op.src,
+                os.path.join(dst_dir, name),
+                op.size,
+                f"{prefix}{label}",
+                op.mtime_ns,
+            )
+
+            if op.action == copy_plan.ACTION_SKIP:
+                executor.skip(task)
+                continue
+
+            if dst_dir not in created_dirs:
+                start = perf()
+                os.makedirs(dst_dir, exist_ok=True)  # ディレクトリがなければ作成
+                stage_seconds["makedirs"] += perf() - start
+                created_dirs.add(dst_dir)
+
+            # コピー中の合計バイト数が上限に達している場合は、ここで空くのを待つ
+            start = perf()
+            executor.submit(task)
+            stage_seconds["submit_wait"] += perf() - start
+
+        # 計画を最後まで読んだ後、残りのコピーが終わるのを待つ時間
+        drain_start = perf()
+    stage_seconds["drain_wait"] += perf() - drain_start
+
+    summary = executor.summary
+    if copier is not None:
+        summary.bytes_linked = copier.stats.bytes_saved
+        summary.seconds_saved = copier.stats.seconds_saved() or 0.0
+        _log_link_stats(prefix, copier.stats)
+    if shared is not None:
+        # 同じ納品先ルートの後のジョブが納品するかもしれないため、全ジョブが終わってから処理する
+        shared.defer_stale(path_config, delivered, stale_paths, summary)
+    else:
+        start = perf()
+        summary.stale = _handle_stale_files(
+            delivered, stale_paths, dst_base, stale_action
+        )
+        stage_seconds["stale"] += perf() - start
+
+    summary.delivered = list(delivered.entries.values())
+
+    start = perf()
+    try:
+        delivered.save()
+    except OSError as e:
+        logging.error(f"マニフェストを保存できませんでした: {e}")
+    stage_seconds["manifest"] += perf() - start
+
+    if run_metrics is not None:
+        _merge_copy_metrics(
+            run_metrics, summary, latencies, stage_seconds, len(created_dirs)
+        )
+    return summary
+
+
+def _log_link_stats(prefix: str, stats: link_copy.LinkStats):
+    """リンク・重複排除の結果 (方法ごとの件数と、書き込まずに済んだ容量) をログに出力する"""
+
+    counts = " ".join(
+        f"{method}:{count}件" for method, count in sorted(stats.files.items())
+    )
+    seconds_saved = stats.seconds_saved()
+    estimate = f" (推定 {seconds_saved:.1f}秒短縮)" if seconds_saved is not None else ""
+    logging.info(
+        f"{prefix}{counts} 書き込まずに済んだ容量:"
+        f" {stats.bytes_saved / 1024 / 1024:.1f}MB{estimate}"
+    )
+
+
+def _merge_copy_metrics(
+    run_metrics: metrics.RunMetrics,
+    summary: copy_executor.CopySummary,
+    latencies: List[float],
+    stage_seconds: collections.Counter,
+    dirs_created: int,
+):
+    """コピー (またはZIPへの書き込み) の集計結果を計測値に加える"""
+
+    run_metrics.merge(
+        counters={
+            "files_copied": summary.copied,
+            "files_skipped_unchanged": summary.skipped,
+            "files_failed": summary.failed,
+            "files_stale": summary.stale,
+            "bytes_copied": summary.bytes_copied,
+            "bytes_linked": summary.bytes_linked,
+            "dirs_created": dirs_created,
+        },
+        # コピー用スレッドでの所要時間の合計 (複数スレッドで並行するため経過時間より長くなり得る)
+        stage_seconds=dict(stage_seconds, copy=sum(latencies)),
+        copy_latencies=latencies,
+    )
+
+
+def _execute_plan_to_archive(
+    path_config: dict,
+    ops: Iterable[copy_plan.PlanOp],
+    pool: copy_executor.CopyPool = None,
+    run_metrics: metrics.RunMetrics = None,
+) -> copy_executor.CopySummary:
+    """
+    コピー計画を、納品先ルートと同じ構成のZIPファイルへの書き込みとして実行する
+    (delivery_format = zip)。納品先ルートにはファイルをコピーしない。
+
+    ZIPへの書き込みは1件ずつ行い (ZipFileは同時書き込みに対応していない)、
+    その間も計画の読み込み (走査) は進める。書き込みは pool のスレッドで行うため、
+    フォルダで納品するジョブと合わせて同時実行数とコピー待ちの合計バイト数の上限が守られる。
+    前回から変更のないファイル (skip) も含めて、今回の納品対象をすべて書き込む。
+    """
+
+    # ZIP形式の納品でだけ使うため、ここで読み込む (zipfile は読み込みに時間がかかり、
+    # ドライランや通常のコピーの起動を遅くする)
+    import archive_writer
+
+    job_name = path_config.get("job_name")
+    prefix = f"[{job_name}] " if job_name else ""
+    archive_path = archive_writer.archive_file_path(
+        path_config["delivery_root_path"], job_name
+    )
+    os.makedirs(os.path.dirname(archive_path) or ".", exist_ok=True)
+
+    written = []
+    perf = time.perf_counter
+    stage_seconds = collections.Counter()
+    latencies = []
+
+    def on_result(result: copy_executor.CopyResult):
+        """結果を表示し、ZIPに書き込んだファイルを記録する (submit順に1件ずつ呼ばれる)"""
+
+        copy_executor.print_progress(result)
+        if result.status != copy_executor.STATUS_SKIPPED:
+            latencies.append(result.elapsed)
+        if result.status == copy_executor.STATUS_COPIED:
+            task = result.task
+            written.append(
+                manifest.ManifestEntry(task.dst, task.src, task.size, task.mtime_ns)
+            )
+
+    with archive_writer.ZipWriter(
+        archive_path,
+        path_config.get("compression", config_manager.DEFAULT_COMPRESSION),
+    ) as writer:
+        executor = copy_executor.CopyExecutor(
+            max_workers=1,
+            max_inflight_bytes=path_config.get(
+                "max_inflight_mb", config_manager.DEFAULT_MAX_INFLIGHT_MB
+            )
+            * 1024
+            * 1024,
+            copy_func=writer.add,
+            on_result=on_result,
+            pool=pool,
+            serial=True,
+        )
+        with executor:
+            for op in ops:
+                if op.action == copy_plan.ACTION_STALE:
                     continue
+                label = "ZIP格納 (トップレベル)" if op.is_top_level else "ZIP格納"
+                start = perf()
+                executor.submit(
+                    copy_executor.CopyTask(
+                        op.src, op.path, op.size, f"{prefix}{label}", op.mtime_ns
+                    )
+                )
+                stage_seconds["submit_wait"] += perf() - start
 
-            # 2.2. 「成果物」ディレクトリ内の特定ファイルのコピー (フラット化)
-            # パスに「成果物」が含まれ、かつ対象のフォルダキーが特定されている場合
-            # path_partsのどこかに"成果物"が含まれていればOK（例: "010.調査/成果物/内部"）
-            if "成果物" in path_parts and target_folder_key:
-                matchers = config[target_folder_key].get("artifact_matcher", [])
-                for matcher in matchers:
-                    if file_name_lower.startswith(matcher.lower()):
-                        # コピー先のディレクトリパスを作成 (例: dst_base/010.調査/成果物)
-                        dst_dir = os.path.join(dst_base, target_folder_key, "成果物")
-                        os.makedirs(
-                            dst_dir, exist_ok=True
-                        )  # ディレクトリがなければ作成
-
-                        dst_file_path = os.path.join(dst_dir, file_name)
-                        if not os.path.exists(
-                            dst_file_path
-                        ):  # ファイルが既に存在しなければコピー
-                            shutil.copy2(src_file_path, dst_file_path)
-                            print(f"コピー: {file_name} -> {dst_dir}")
-                        copied = True
-                        break
-                if copied:  # コピーされたら次のファイルへ
+            drain_start = perf()
+        stage_seconds["drain_wait"] += perf() - drain_start
+
+    logging.info(f"{prefix}ZIPファイル出力先: {archive_path}")
+    summary = executor.summary
+    summary.delivered = written
+    summary.archive_path = archive_path
+    if run_metrics is not None:
+        _merge_copy_metrics(run_metrics, summary, latencies, stage_seconds, 0)
+    return summary
+
+
+def _is_zip_delivery(path_config: dict) -> bool:
+    return path_config.get("delivery_format") == "zip"
+
+
+class JobResult(NamedTuple):
+    """
+    1ジョブ分の実行結果。
+
+    Attributes:
+        name (str): ジョブ名 ([Job:*]セクションがない場合はNone)
+        summary (copy_executor.CopySummary): コピーの集計結果。ジョブ自体が失敗した場合はNone
+        elapsed (float): 所要時間 (秒)
+        error (Exception): ジョブ自体が失敗した場合の例外
+        delivery_root: ジョブの納品先ルートパス
+    """
+
+    name: Optional[str]
+    summary: Optional[copy_executor.CopySummary]
+    elapsed: float
+    error: Optional[Exception] = None
+    delivery_root: Optional[str] = None
+
+
+def make_job_config(
+    config: dict, teams_root_path, delivery_root_path, job_name: Optional[str]
+) -> dict:
+    """
+    全体の設定に1ジョブ分のパスとジョブ名を設定した、process_files などに渡す設定を作成する。
+
+    Args:
+        config (dict): config_manager.load_config の戻り値
+        teams_root_path: ジョブのTeamsフォルダのルートパス
+        delivery_root_path: ジョブの納品先ルートパス
+        job_name (str): ジョブ名 ([Job:*]セクションがない場合はNone)
+    """
+
+    return dict(
+        config,
+        teams_root_path=teams_root_path,
+        delivery_root_path=delivery_root_path,
+        job_name=job_name,
+    )
+
+
+class SharedDeliveryRoot:
+    """
+    同じ納品先ルートに納品する複数のジョブの間で、どのジョブがどのファイルを納品するかを調整する。
+
+    各ジョブの走査・計画・コピーは同時に進め、同名のパスは設定ファイルの記述順で先のジョブが
+    納品する。後のジョブは、先のジョブの計画がすべて出そろうまで自分の計画を溜めておき
+    (走査は止めない)、先のジョブが納品するパスを除いてから実行する。そのパスは後のジョブの
+    マニフェストからも外す。
+    不要ファイルの処理は全ジョブの実行後に finish() でまとめて行い、
+    他のジョブが納品するパスは削除せず、マニフェストから外すだけにする。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # 今回の実行で納品する (コピーまたは変更なしの) 相対パス -> 納品するジョブの順番
+        self._owners: Dict[str, int] = {}
+        # ジョブごとの、計画が出そろったことを表すイベント (記述順)
+        self._planned: List[threading.Event] = []
+        self._deferred = []
+
+    @classmethod
+    def for_jobs(cls, config: dict, jobs: List[dict]) -> List[Optional[SharedRootJob]]:
+        """
+        ジョブを記述順に納品先ルートごとの SharedDeliveryRoot に加える。
+        ZIP納品はジョブごとに別のファイルに書き込むため、すべて None を返す。
+        """
+
+        if _is_zip_delivery(config):
+            return [None for _ in jobs]
+        by_root = {}
+        return [
+            by_root.setdefault(
+                _delivery_root_key(job["delivery_root_path"]), cls()
+            ).join()
+            for job in jobs
+        ]
+
+    def join(self) -> SharedRootJob:
+        """ジョブを最後の順番に加える (ジョブを始める前に、記述順に呼ぶこと)"""
+
+        with self._lock:
+            self._planned.append(threading.Event())
+            return SharedRootJob(self, len(self._planned) - 1)
+
+    def defer_stale(
+        self,
+        path_config: dict,
+        delivered: manifest.Manifest,
+        stale_paths: List[str],
+        summary: copy_executor.CopySummary,
+    ):
+        """1ジョブ分の不要ファイルの処理を finish() まで保留する"""
+
+        with self._lock:
+            self._deferred.append((path_config, delivered, stale_paths, summary))
+
+    def finish(self, run_metrics: metrics.RunMetrics = None):
+        """
+        保留していた不要ファイルを処理し、各ジョブのマニフェストと集計結果を更新する。
+        同じ納品先ルートのすべてのジョブを実行した後に呼ぶこと。
+        """
+
+        with self._lock:
+            deferred, self._deferred = self._deferred, []
+        for path_config, delivered, stale_paths, summary in deferred:
+            stale_action = path_config.get(
+                "stale_files", config_manager.STALE_FILE_ACTIONS[0]
+            )
+            remaining = []
+            for path in stale_paths:
+                if path in self._owners:
+                    # 他のジョブが納品するファイルは削除しない (以降はそのジョブの記録になる)
+                    delivered.remove(path)
+                else:
+                    remaining.append(path)
+            summary.stale = _handle_stale_files(
+                delivered, remaining, path_config["delivery_root_path"], stale_action
+            )
+            summary.delivered = list(delivered.entries.values())
+            try:
+                delivered.save()
+            except OSError as e:
+                logging.error(f"マニフェストを保存できませんでした: {e}")
+            if run_metrics is not None:
+                run_metrics.add("files_stale", summary.stale)
+
+
+class SharedRootJob:
+    """
+    SharedDeliveryRoot に加わった1ジョブ。
+
+    Attributes:
+        root (SharedDeliveryRoot): 加わった納品先ルート
+        order (int): 納品先ルート内での順番 (小さいほど優先する)
+    """
+
+    def __init__(self, root: SharedDeliveryRoot, order: int):
+        self.root = root
+        self.order = order
+
+    def claim(
+        self,
+        ops: Iterable[copy_plan.PlanOp],
+        delivered: Optional[manifest.Manifest] = None,
+        prefix: str = "",
+    ) -> Iterator[copy_plan.PlanOp]:
+        """
+        計画の copy/skip のパスを、このジョブが納品するものとして記録しながら返す。
+        先のジョブが納品するパスは返さず、delivered からも外す。
+
+        先のジョブの計画がすべて出そろうまでは、受け取った計画を溜めておく。
+        """
+
+        earlier = self.root._planned[: self.order]
+        pending = []
+        try:
+            for op in ops:
+                if pending is not None:
+                    if not all(event.is_set() for event in earlier):
+                        pending.append(op)
+                        continue
+                    yield from self._accepted(pending, delivered, prefix)
+                    pending = None
+                yield from self._accepted((op,), delivered, prefix)
+            if pending is not None:
+                for event in earlier:
+                    event.wait()
+                yield from self._accepted(pending, delivered, prefix)
+        finally:
+            self.planned()
+
+    def planned(self):
+        """このジョブの計画が出そろったことを後のジョブに知らせる (ジョブが失敗した場合も呼ぶ)"""
+
+        self.root._planned[self.order].set()
+
+    def defer_stale(self, *args):
+        """SharedDeliveryRoot.defer_stale を参照"""
+
+        self.root.defer_stale(*args)
+
+    def _accepted(
+        self,
+        ops: Iterable[copy_plan.PlanOp],
+        delivered: Optional[manifest.Manifest],
+        prefix: str,
+    ) -> Iterator[copy_plan.PlanOp]:
+        root = self.root
+        for op in ops:
+            if op.action != copy_plan.ACTION_STALE:
+                with root._lock:
+                    owner = root._owners.setdefault(op.path, self.order)
+                if owner != self.order:
+                    copy_executor.print_message(
+                        f"{prefix}同名ファイルのためスキップ: {op.src}"
+                    )
+                    if delivered is not None:
+                        delivered.remove(op.path)
                     continue
+            yield op
 
-            # どのルールにも合致しなかったファイルはコピーしない (要件2.1と2.2の注意点、要件3)
-            if not copied:
-                # デバッグのために、コピーされなかったファイルをログに出すことも可能
-                # print(f"スキップ: {file_name} in {relative_path} (ルールに合致しないため)")
-                pass
 
-    logging.info(f"コピー先ベースディレクトリパス:{dst_base}")
-    logging.info("--- ファイルコピーが完了しました ---")
+def _delivery_root_key(delivery_root_path) -> str:
+    """同じ納品先ルートかどうかを判定するためのパス"""
+
+    return os.path.normcase(os.path.abspath(delivery_root_path))
+
+
+def process_jobs(
+    config: dict,
+    rules: rule_engine.RuleEngine = None,
+    index_path=None,
+    reindex: bool = False,
+    run_metrics: metrics.RunMetrics = None,
+    profiler: metrics.ThreadProfiler = None,
+    audit: skip_audit.SkipAuditWriter = None,
+) -> List[JobResult]:
+    """
+    設定ファイルの全ジョブ ([Job:*]セクション。なければ[General]の1ジョブ) を1回の実行で処理する。
+
+    各ジョブの走査は同時に進め、コピーはすべてのジョブで1つのプールを共有する。
+    そのため、ジョブ数に関係なくコピーの同時実行数は copy_workers 以下に保たれる。
+    同じ納品先ルートに納品するジョブの同名のファイルは、先のジョブのものを納品する
+    (SharedDeliveryRoot)。
+
+    Args:
+        config (dict): config_manager.load_config の戻り値
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール
+        index_path: 指定された場合、索引を更新してから索引を使って納品対象を探す
+        reindex (bool): 索引を全体走査で作り直すか
+        run_metrics (metrics.RunMetrics): 指定された場合、全ジョブの計測値を加算する
+        profiler (metrics.ThreadProfiler): 指定された場合、各ジョブのスレッドをプロファイルする
+        audit (skip_audit.SkipAuditWriter): 指定された場合、全ジョブで納品対象にならなかった
+            ファイルを記録する
+
+    Returns:
+        list[JobResult]: ジョブごとの実行結果 (設定ファイルの記述順)
+    """
+
+    if rules is None:
+        rules = rule_engine.RuleEngine.from_config(config)
+    jobs = config["jobs"]
+
+    # 索引の更新 (書き込み) は、ジョブを始める前にまとめて行う
+    if index_path is not None:
+        import file_index
+
+        with _stage_timer(run_metrics, "index_refresh"), file_index.FileIndex(
+            index_path, rules.fold
+        ) as index:
+            for job in jobs:
+                index.refresh(job["teams_root_path"], rules.phases, full=reindex)
+
+    pool = copy_executor.CopyPool(
+        config.get("copy_workers", config_manager.DEFAULT_COPY_WORKERS),
+        config.get("max_inflight_mb", config_manager.DEFAULT_MAX_INFLIGHT_MB)
+        * 1024
+        * 1024,
+    )
+    shared_roots = SharedDeliveryRoot.for_jobs(config, jobs)
+    with pool, concurrent.futures.ThreadPoolExecutor(
+        max_workers=len(jobs)
+    ) as job_threads:
+        futures = [
+            job_threads.submit(
+                _run_job,
+                config,
+                job,
+                rules,
+                pool,
+                index_path,
+                run_metrics,
+                profiler,
+                audit,
+                shared,
+            )
+            for job, shared in zip(jobs, shared_roots)
+        ]
+        results = [future.result() for future in futures]
+    # 不要ファイルは、同じ納品先ルートの全ジョブが終わってから処理する
+    for root in {shared.root for shared in shared_roots if shared is not None}:
+        root.finish(run_metrics)
+
+    if config.get("hash_files", False) and not _is_zip_delivery(config):
+        with _stage_timer(run_metrics, "checksums"):
+            write_checksum_files(results)
+    return results
+
+
+def _run_job(
+    config: dict,
+    job: dict,
+    rules: rule_engine.RuleEngine,
+    pool: copy_executor.CopyPool,
+    index_path,
+    run_metrics: metrics.RunMetrics = None,
+    profiler: metrics.ThreadProfiler = None,
+    audit: skip_audit.SkipAuditWriter = None,
+    shared: SharedRootJob = None,
+) -> JobResult:
+    """
+    1ジョブを実行する。ジョブが例外で失敗しても、他のジョブには影響させない。
+    """
+
+    job_config = make_job_config(
+        config, job["teams_root_path"], job["delivery_root_path"], job["name"]
+    )
+    start = time.perf_counter()
+    try:
+        with profiler.thread() if profiler else contextlib.nullcontext():
+            if index_path is None:
+                summary = process_files(
+                    job_config,
+                    rules,
+                    pool=pool,
+                    run_metrics=run_metrics,
+                    audit=audit,
+                    shared=shared,
+                )
+            else:
+                # SQLiteの接続はスレッドをまたいで使えないため、ジョブごとに開く
+                import file_index
+
+                with file_index.FileIndex(index_path, rules.fold) as index:
+                    summary = process_files(
+                        job_config,
+                        rules,
+                        index.records(job["teams_root_path"]),
+                        pool,
+                        run_metrics,
+                        audit,
+                        shared,
+                    )
+    except Exception as e:
+        logging.error(f"ジョブ {job['name'] or ''} の実行中にエラーが発生しました: {e}")
+        return JobResult(
+            job["name"],
+            None,
+            time.perf_counter() - start,
+            e,
+            str(job["delivery_root_path"]),
+        )
+    finally:
+        # 失敗した場合も、同じ納品先ルートの後のジョブを待たせたままにしない
+        if shared is not None:
+            shared.planned()
+    return JobResult(
+        job["name"],
+        summary,
+        time.perf_counter() - start,
+        None,
+        str(job["delivery_root_path"]),
+    )
+
+
+def plan_jobs(
+    config: dict,
+    rules: rule_engine.RuleEngine = None,
+    output_file_path=None,
+    index_path=None,
+    reindex: bool = False,
+    run_metrics: metrics.RunMetrics = None,
+    audit: skip_audit.SkipAuditWriter = None,
+) -> List[JobResult]:
+    """
+    全ジョブのコピー計画だけを作成する (ドライラン)。コピーもディレクトリの作成も行わない。
+
+    計画は JSON Lines 形式で1件ずつ書き出す。書き出した計画は replay_plan で後から
+    実行でき、その際にコピー元を走査し直す必要はない。
+
+    Args:
+        config (dict): config_manager.load_config の戻り値
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール
+        output_file_path: 計画の出力先ファイルパス。省略時は件数の集計のみ行う
+        index_path: 指定された場合、索引を更新してから索引を使って納品対象を探す
+        reindex (bool): 索引を全体走査で作り直すか
+        run_metrics (metrics.RunMetrics): 指定された場合、照合件数と段階ごとの所要時間を加算する
+        audit (skip_audit.SkipAuditWriter): 指定された場合、納品対象にならなかったファイルを記録する
+
+    Returns:
+        list[JobResult]: ジョブごとの計画の件数 (コピー予定を copied、変更なしを skipped に数える)
+    """
+
+    if rules is None:
+        rules = rule_engine.RuleEngine.from_config(config)
+
+    with contextlib.ExitStack() as stack:
+        f = None
+        if output_file_path is not None:
+            f = stack.enter_context(open(output_file_path, "w", encoding="utf-8"))
+        index = None
+        if index_path is not None:
+            import file_index
+
+            index = stack.enter_context(file_index.FileIndex(index_path, rules.fold))
+
+        # 計画は1つのファイルに続けて書き出すため、ジョブは順に処理する
+        results = []
+        shared_roots = SharedDeliveryRoot.for_jobs(config, config["jobs"])
+        for job, shared in zip(config["jobs"], shared_roots):
+            job_config = make_job_config(
+                config, job["teams_root_path"], job["delivery_root_path"], job["name"]
+            )
+            start = time.perf_counter()
+            records = None
+            if index is not None:
+                with _stage_timer(run_metrics, "index_refresh"):
+                    index.refresh(job["teams_root_path"], rules.phases, full=reindex)
+                records = index.records(job["teams_root_path"])
+            ops = plan_delivery(
+                job_config, rules, records, run_metrics=run_metrics, audit=audit
+            )
+            if shared is not None:
+                # 同じ納品先ルートの先のジョブが納品するファイルは、実行時と同じくスキップする
+                ops = shared.claim(ops)
+
+            if f is not None:
+                copy_plan.write_job(
+                    f,
+                    copy_plan.PlanJob(
+                        job["name"],
+                        str(job["teams_root_path"]),
+                        str(job["delivery_root_path"]),
+                    ),
+                )
+                counts = copy_plan.write_ops(f, ops)
+            else:
+                counts = collections.Counter(op.action for op in ops)
+
+            summary = copy_executor.CopySummary(
+                copied=counts[copy_plan.ACTION_COPY],
+                skipped=counts[copy_plan.ACTION_SKIP],
+                stale=counts[copy_plan.ACTION_STALE],
+            )
+            results.append(
+                JobResult(
+                    job["name"],
+                    summary,
+                    time.perf_counter() - start,
+                    None,
+                    str(job["delivery_root_path"]),
+                )
+            )
+
+    if output_file_path is not None:
+        logging.info(f"コピー計画の出力先: {output_file_path}")
+    return results
+
+
+def replay_plan(
+    config: dict, plan_file_path, run_metrics: metrics.RunMetrics = None
+) -> List[JobResult]:
+    """
+    保存済みのコピー計画 (plan_jobs の出力) を実行する。コピー元は走査しない。
+
+    コピー先とコピー元のパスは計画に記録されたものを使い、copy_workers などの
+    実行時の設定は config から取る。計画の作成後にコピー元が変更されていても、
+    マニフェストには計画作成時のサイズと更新日時を記録するため、次回の通常実行でコピーし直される。
+
+    Args:
+        config (dict): config_manager.load_config の戻り値
+        plan_file_path: 計画ファイルのパス
+        run_metrics (metrics.RunMetrics): 指定された場合、コピー件数と所要時間を加算する
+
+    Returns:
+        list[JobResult]: ジョブごとの実行結果 (計画ファイルの記述順)
+
+    Raises:
+        OSError: 計画ファイルを読み込めない場合。
+        ValueError: 計画ファイルの形式が不正な場合。
+    """
+
+    pool = copy_executor.CopyPool(
+        config.get("copy_workers", config_manager.DEFAULT_COPY_WORKERS),
+        config.get("max_inflight_mb", config_manager.DEFAULT_MAX_INFLIGHT_MB)
+        * 1024
+        * 1024,
+    )
+    results = []
+    # 同じ納品先ルートのジョブの不要ファイルは、すべてのジョブを実行してから処理する
+    shared_roots = {}
+    with pool, open(plan_file_path, encoding="utf-8") as f:
+        for job, ops in copy_plan.read_plan(f):
+            job_config = make_job_config(
+                config, job.teams_root_path, job.delivery_root_path, job.name
+            )
+            prefix = f"[{job.name}] " if job.name else ""
+            logging.info(f"--- {prefix}コピー計画を実行します ---")
+            start = time.perf_counter()
+            shared = None
+            if not _is_zip_delivery(job_config):
+                shared = shared_roots.setdefault(
+                    _delivery_root_key(job.delivery_root_path), SharedDeliveryRoot()
+                ).join()
+            summary = execute_plan(
+                job_config, ops, pool=pool, run_metrics=run_metrics, shared=shared
+            )
+            results.append(
+                JobResult(
+                    job.name,
+                    summary,
+                    time.perf_counter() - start,
+                    None,
+                    job.delivery_root_path,
+                )
+            )
+        for root in shared_roots.values():
+            root.finish(run_metrics)
+
+    if config.get("hash_files", False) and not _is_zip_delivery(config):
+        with _stage_timer(run_metrics, "checksums"):
+            write_checksum_files(results)
+    return results
+
+
+def _stage_timer(run_metrics: Optional[metrics.RunMetrics], stage: str):
+    """run_metrics が指定されていれば段階 stage の時間を計るコンテキストマネージャを返す"""
+
+    if run_metrics is None:
+        return contextlib.nullcontext()
+    return run_metrics.timer(stage)
+
+
+def write_checksum_files(results: List[JobResult]):
+    """
+    納品先ルートごとに SHA256SUMS を書き出す (hash_files有効時)。
+    同じ納品先に複数のジョブが納品した場合は1つのファイルにまとめる。
+
+    ハッシュはコピー時に計算したものを使うため、納品先のファイルを読み直すことはない。
+    書き出しに失敗してもメイン処理は中断しない (設計書5.2)。
+
+    Args:
+        results (list[JobResult]): process_jobs または replay_plan の戻り値
+    """
+
+    import checksums
+
+    for root, entries in _delivered_by_root(results).items():
+        try:
+            count = checksums.write_checksum_file(root, entries.values())
+        except OSError as e:
+            logging.error(
+                f"{checksums.CHECKSUM_FILE_NAME}を出力できませんでした: {root} ({e})"
+            )
+            continue
+        logging.info(f"{checksums.CHECKSUM_FILE_NAME}: {root} ({count}件)")
+
+
+def generate_tree_output(
+    results: List[JobResult], output_file_path, fmt: str = "text", details: bool = False
+):
+    """
+    納品先フォルダ (ZIP形式で納品した場合はZIPファイルの中身) のツリーをファイルに出力する。
+
+    外部の tree コマンドは使わず、コピー処理が記録した納品済みファイルの一覧から
+    ツリーを組み立てるため、納品先を走査し直すことはなく、OSにも依存しない。
+    同じ納品先に複数のジョブが納品した場合は1つのツリーにまとめる。
+
+    出力に失敗してもメイン処理は中断せず、エラーを表示するに留める (設計書5.2)。
+
+    Args:
+        results (list[JobResult]): process_jobs の戻り値
+        output_file_path: 出力先ファイルパス
+        fmt (str): "text" (tree /F 形式) または "json"
+        details (bool): ファイルサイズとSHA-256を含めるか
+    """
+
+    trees = _delivered_by_root(results)
+    try:
+        tree_report.write_tree_report(
+            output_file_path,
+            [(root, entries.values()) for root, entries in trees.items()],
+            fmt,
+            details,
+        )
+    except OSError as e:
+        copy_executor.print_message(
+            f"ツリーを出力できませんでした: {output_file_path} ({e})"
+        )
+        logging.error(f"ツリー出力中にエラーが発生しました: {e}")
+        return
+
+    logging.info(f"ツリー出力先: {output_file_path}")
+
+
+def _delivered_by_root(results: List[JobResult]) -> dict:
+    """
+    納品先ルート (ZIP形式で納品した場合はZIPファイル) ごとに納品済みファイルをまとめる。
+    同じ相対パスを複数のジョブが記録している場合は、先のジョブのものを使う。
+
+    Returns:
+        dict: 納品先ルートまたはZIPファイルのパス -> {相対パス: manifest.ManifestEntry}
+    """
+
+    by_root = {}
+    for result in results:
+        if result.summary is None:
+            continue
+        root = result.summary.archive_path or result.delivery_root
+        entries = by_root.setdefault(root, {})
+        for entry in result.summary.delivered:
+            entries.setdefault(entry.path, entry)
+    return by_root
+
+
+def _handle_stale_files(
+    delivered: manifest.Manifest, stale_paths: List[str], dst_base, action: str
+) -> int:
+    """
+    前回納品したが、今回はコピー元に見つからなかったファイルを処理する。
+
+    Args:
+        delivered (manifest.Manifest): 納品済みファイルの記録
+        stale_paths (list[str]): 該当するファイルの納品先ルートからの相対パス
+        dst_base: 納品先ルートパス
+        action (str): "report" なら表示のみ、"delete" なら納品先から削除する
+
+    Returns:
+        int: 該当したファイル数 (削除する場合、既に納品先になかったファイルは数えない)
+    """
+
+    count = 0
+    for path in stale_paths:
+        dst_file_path = os.path.join(dst_base, *path.split("/"))
+        if action != "delete":
+            copy_executor.print_message(
+                f"コピー元に存在しない納品済みファイル: {dst_file_path}"
+            )
+            count += 1
+            continue
+
+        try:
+            os.remove(dst_file_path)
+        except FileNotFoundError:
+            # 保存済みの計画を繰り返し実行した場合など、既に削除されている
+            logging.info(f"不要になったファイルは既にありません: {dst_file_path}")
+            delivered.remove(path)
+            continue
+        except OSError as e:
+            # 削除に失敗しても処理は続ける (設計書5.2)。記録は残し、次回も削除を試みる
+            logging.error(
+                f"不要になったファイルを削除できませんでした: {dst_file_path} ({e})"
+            )
+            count += 1
+            continue
+        delivered.remove(path)
+        copy_executor.print_message(f"削除 (コピー元に存在しない): {dst_file_path}")
+        count += 1
+
+    return count
+
+
+def _file_stat(entry: os.DirEntry) -> tuple:
+    """
+    ファイルのサイズと更新日時 (ナノ秒) を取得する。
+    取得できない場合は (0, 0) とし、エラーはコピー時に報告させる。
+    """
 
-    return
+    try:
+        st = entry.stat()
+    except OSError:
+        return 0, 0
+    return st.st_size, st.st_mtime_ns
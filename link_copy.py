@@ -0,0 +1,237 @@
+import errno
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+import config_manager
+import copy_executor
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# ファイルごとに実際に使われた方法
+METHOD_COPY = "copy"
+METHOD_REFLINK = "reflink"
+METHOD_HARDLINK = "hardlink"
+METHOD_DEDUP = "dedup"  # 同じ内容の納品済みファイルへのハードリンク
+
+# リンクは一時ファイル名で作成してからコピー先に置き換える
+LINK_TMP_SUFFIX = ".linktmp"
+
+# Linux の FICLONE ioctl (linux/fs.h: _IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+# reflink・ハードリンクに対応していないことを示す errno
+_LINK_UNSUPPORTED = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTTY,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.EPERM,
+    errno.EMLINK,
+}
+
+
+class LinkStats:
+    """
+    方法ごとのファイル数・バイト数・所要時間。複数のコピー用スレッドから加算される。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.files = Counter()
+        self.bytes = Counter()
+        self.seconds = Counter()
+
+    def add(self, method: str, size: int, seconds: float):
+        with self._lock:
+            self.files[method] += 1
+            self.bytes[method] += size
+            self.seconds[method] += seconds
+
+    @property
+    def bytes_saved(self) -> int:
+        """コピーせずに済んだ (データを書き込まなかった) バイト数"""
+
+        return sum(size for method, size in self.bytes.items() if method != METHOD_COPY)
+
+    def seconds_saved(self) -> Optional[float]:
+        """
+        コピーせずに済んだことによる短縮時間の推定値 (秒)。
+        今回コピーしたファイルの速度で bytes_saved をコピーした場合の時間から、
+        リンクにかかった時間を引いたもの。今回コピーしたファイルがない場合はNone。
+        """
+
+        with self._lock:
+            copy_bytes = self.bytes[METHOD_COPY]
+            copy_seconds = self.seconds[METHOD_COPY]
+            link_seconds = sum(
+                s for method, s in self.seconds.items() if method != METHOD_COPY
+            )
+        if copy_bytes <= 0 or copy_seconds <= 0:
+            return None
+        return max(0.0, self.bytes_saved * copy_seconds / copy_bytes - link_seconds)
+
+
+class LinkCopier:
+    """
+    コピーの代わりに reflink・ハードリンクを使って納品先にファイルを置くコピー関数。
+    CopyExecutor の copy_func として使う ((src, dst) を受け取り、SHA-256 または None を返す)。
+
+    dedup=True の場合、この実行で納品済みのファイルと同じ内容のファイルは、
+    納品先内の既存のファイルへのハードリンクとして置く (同じ内容を1回だけ保存する)。
+    同じサイズのファイルが既に納品されている場合にだけコピー元の内容のハッシュを計算するため、
+    サイズの異なるファイルを余分に読むことはない。同時にコピー中の同じ内容のファイルは
+    重複排除されない場合がある。
+
+    hardlink の場合、納品先のファイルはコピー元と同じ実体になる
+    (納品先のファイルを編集するとコピー元も変わる) ため、納品先は読み取り専用で扱うこと。
+    """
+
+    def __init__(
+        self,
+        mode: str = "copy",
+        dedup: bool = False,
+        with_hash: bool = False,
+        large_file_threshold: int = None,
+    ):
+        """
+        Args:
+            mode (str): config_manager.LINK_MODES のいずれか
+            dedup (bool): 同じ内容のファイルを納品先で1つにまとめるか
+            with_hash (bool): 内容のSHA-256を計算して返すか (hash_files)
+            large_file_threshold (int): コピーする場合に copy_executor.copy_file_resumable を使う
+                ファイルサイズの下限 (バイト)。省略時は使わない
+        """
+
+        if mode not in config_manager.LINK_MODES:
+            raise ValueError(f"不正なリンクの方法です: {mode}")
+        self.dedup = dedup
+        self.with_hash = with_hash
+        self.large_file_threshold = large_file_threshold
+        self.stats = LinkStats()
+
+        self._lock = threading.Lock()
+        self._sizes = set()
+        self._by_digest: Dict[str, str] = {}
+        # 一度対応していないと分かった方法は、以降のファイルでは試さない
+        self._reflink_supported = mode in ("reflink", "hardlink") and fcntl is not None
+        self._hardlink_supported = mode == "hardlink"
+
+    def __call__(self, src: str, dst: str) -> Optional[str]:
+        size = os.stat(src).st_size
+        digest = None
+        if self.dedup:
+            with self._lock:
+                same_size_seen = size in self._sizes
+                self._sizes.add(size)
+            if same_size_seen:
+                start = time.perf_counter()
+                digest = copy_executor.sha256_file(src)
+                with self._lock:
+                    existing = self._by_digest.get(digest)
+                if existing is not None and _try(os.link, existing, dst) is None:
+                    self.stats.add(METHOD_DEDUP, size, time.perf_counter() - start)
+                    return digest if self.with_hash else None
+
+        digest = self._deliver(src, dst, size, digest)
+        if self.dedup:
+            with self._lock:
+                self._by_digest.setdefault(digest, dst)
+        return digest if self.with_hash else None
+
+    def _deliver(self, src: str, dst: str, size: int, digest: Optional[str]):
+        """
+        reflink・ハードリンク・コピーの順に試して dst に置く。
+
+        Returns:
+            str: 内容のSHA-256 (with_hash または dedup の場合のみ。それ以外はNone)
+        """
+
+        need_hash = (self.with_hash or self.dedup) and digest is None
+        start = time.perf_counter()
+
+        method = None
+        if self._reflink_supported:
+            err = _try(_reflink, src, dst)
+            if err is None:
+                method = METHOD_REFLINK
+            elif err != errno.EMLINK:
+                self._reflink_supported = False
+        if method is None and self._hardlink_supported:
+            err = _try(os.link, src, dst)
+            if err is None:
+                method = METHOD_HARDLINK
+            elif err != errno.EMLINK:
+                self._hardlink_supported = False
+
+        if method is not None:
+            if need_hash:
+                # データは書き込まないが、ハッシュのためにコピー元を1回読む
+                digest = copy_executor.sha256_file(src)
+        else:
+            method = METHOD_COPY
+            digest = self._copy(src, dst, size, need_hash) or digest
+
+        self.stats.add(method, size, time.perf_counter() - start)
+        return digest
+
+    def _copy(self, src: str, dst: str, size: int, need_hash: bool) -> Optional[str]:
+        if self.large_file_threshold is not None and size >= self.large_file_threshold:
+            return copy_executor.copy_file_resumable(src, dst, with_hash=need_hash)
+        if need_hash:
+            return copy_executor.copy_file_with_hash(src, dst)
+        return copy_executor.copy_file(src, dst)
+
+
+def _try(link_func, src: str, dst: str) -> Optional[int]:
+    """
+    link_func(src, 一時ファイル) で作成し、dst に置き換える
+    (既存の dst がリンクであっても、リンク先の内容は変えない)。
+
+    Returns:
+        int: 対応していないために作成できなかった場合はその errno。成功した場合はNone
+
+    Raises:
+        OSError: 対応していないこと以外の理由で失敗した場合。
+    """
+
+    tmp_path = dst + LINK_TMP_SUFFIX
+    _remove_quietly(tmp_path)
+    try:
+        link_func(src, tmp_path)
+    except OSError as e:
+        _remove_quietly(tmp_path)
+        if e.errno in _LINK_UNSUPPORTED:
+            return e.errno
+        raise
+    os.replace(tmp_path, dst)
+    return None
+
+
+def _reflink(src: str, dst: str):
+    """
+    src とデータを共有する複製を dst に作成する (Btrfs・XFS などの FICLONE 対応ファイルシステムのみ)。
+    """
+
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported")
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), _FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def _remove_quietly(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
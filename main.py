@@ -8,20 +8,33 @@
 # 動作環境は以下のとおり。
 # OS: Windows10/11
 # Python: 3.8以上
-# 必須コマンド: treeコマンド（Windows標準コマンド）
 #
 # 実行方法はREADME.md 参照
 #
 ##############################################################
 
+from __future__ import annotations
+
 import logging
 import sys
 import argparse
 import configparser
+import contextlib
+import time
 from pathlib import Path
+from typing import TYPE_CHECKING
 
+import config_cache
 import config_manager
-import file_processor
+import rule_engine
+import tree_report
+
+# 納品・監視・索引などの処理を行うモジュールは、使う関数の中で読み込む。
+# スクリプトから何度も呼ばれるため、--help やドライラン・索引の検索では
+# 使わないモジュール (プロセスプール、ZIP、プロファイルの集計など) の読み込みを省き、起動を速くする。
+if TYPE_CHECKING:
+    import metrics
+    import skip_audit
 
 # ロギング設定
 logging.basicConfig(
@@ -34,6 +47,16 @@ def main():
     コマンド引数を解析し、内容を表示する関数。
     """
 
+    # サブコマンド: 納品先をチェックサムファイルと照合する
+    if sys.argv[1:2] == ["verify"]:
+        verify_main(sys.argv[2:])
+        return
+
+    # サブコマンド: 2つの納品物 (マニフェストまたは納品先ルート) の差分を表示する
+    if sys.argv[1:2] == ["delta"]:
+        delta_main(sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(
         description="作業ディレクトリから納品対象ファイルを抽出し、ローカルにコピーまたはツリー形式で出力するツールです"
     )
@@ -47,8 +70,232 @@ def main():
         default="/Users/koni/Desktop/delivery_automation_tool/config.ini",
     )
 
+    parser.add_argument(
+        "--index",
+        dest="index_path",
+        help="Teamsフォルダの索引 (SQLite) のパス。指定すると索引を更新し、索引から納品対象を探す",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--reindex",
+        action="store_true",
+        help="索引を使う場合に、更新日時に関係なく全体を走査し直す",
+    )
+
+    parser.add_argument(
+        "--pattern",
+        help="索引からファイル名のパターン (ワイルドカード * ? 使用可) に合致するファイルを一覧表示する (コピーは行わない)",
+    )
+
+    parser.add_argument(
+        "-t",
+        "--tree_output",
+        dest="tree_output_path",
+        help="納品先フォルダのツリーの出力先ファイルパス。省略時はツリーを出力しない",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--tree_format",
+        choices=tree_report.TREE_FORMATS,
+        default="text",
+        help="ツリーの出力形式 (text: tree /F 形式, json)",
+    )
+
+    parser.add_argument(
+        "--tree_details",
+        action="store_true",
+        help="ツリーにファイルサイズとSHA-256 (hash_files有効時) を含める",
+    )
+
+    parser.add_argument(
+        "--dry_run",
+        "--dry-run",
+        dest="dry_run",
+        action="store_true",
+        help="コピー計画の作成のみ行い、コピーは行わない",
+    )
+
+    parser.add_argument(
+        "--plan_output",
+        dest="plan_output_path",
+        help="--dry_run で作成したコピー計画 (JSON Lines) の出力先ファイルパス",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--plan",
+        dest="plan_path",
+        help="保存済みのコピー計画を実行する (コピー元の走査は行わない)",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--metrics_json",
+        "--metrics-json",
+        dest="metrics_json_path",
+        help="件数・段階ごとの所要時間・コピー1件ごとの所要時間 (p50/p95) をJSONで出力するファイルパス",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--profile",
+        dest="profile_path",
+        help="cProfile で実行全体をプロファイルし、結果 (pstats形式) を出力するファイルパス",
+        type=Path,
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Teamsフォルダを監視し、変更のあった納品対象だけを納品先にコピーし続ける (Ctrl+Cで終了)",
+    )
+
+    parser.add_argument(
+        "--watch_interval",
+        "--watch-interval",
+        dest="watch_interval",
+        type=float,
+        default=config_manager.DEFAULT_POLL_INTERVAL_SECONDS,
+        help=f"監視モードでフォルダの変更を確認する間隔 (秒, 既定: {config_manager.DEFAULT_POLL_INTERVAL_SECONDS})",
+    )
+
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=config_manager.DEFAULT_DEBOUNCE_SECONDS,
+        help=f"監視モードで、最後の変更からコピーまでの待ち時間 (秒, 既定: {config_manager.DEFAULT_DEBOUNCE_SECONDS})",
+    )
+
+    parser.add_argument(
+        "--watch_polling",
+        "--watch-polling",
+        dest="watch_polling",
+        action="store_true",
+        help="監視モードで inotify を使わず、常にフォルダの更新日時を比較する (ネットワークドライブなど)",
+    )
+
+    parser.add_argument(
+        "--skip_audit",
+        "--skip-audit",
+        dest="skip_audit_path",
+        type=Path,
+        help="納品対象にならなかったファイルを理由とともに出力するファイルパス (gzip 圧縮の JSON Lines。例: skipped.jsonl.gz)",
+    )
+
+    parser.add_argument(
+        "--projects",
+        dest="projects",
+        help="複数のプロジェクトをまとめて納品する。設定ファイルのあるディレクトリ (直下の *.ini) または設定ファイルのパターン",
+    )
+
+    parser.add_argument(
+        "--project_workers",
+        "--project-workers",
+        dest="project_workers",
+        type=int,
+        default=config_manager.DEFAULT_PROJECT_WORKERS,
+        help=f"--projects で同時に実行するプロジェクト数 (既定: {config_manager.DEFAULT_PROJECT_WORKERS})",
+    )
+
+    parser.add_argument(
+        "--per_device",
+        "--per-device",
+        dest="per_device",
+        type=int,
+        default=config_manager.DEFAULT_PER_DEVICE,
+        help=f"--projects で同じドライブ・共有フォルダを同時に使うプロジェクト数の上限 (既定: {config_manager.DEFAULT_PER_DEVICE})",
+    )
+
+    parser.add_argument(
+        "--log_dir",
+        "--log-dir",
+        dest="log_dir",
+        type=Path,
+        default=Path("logs"),
+        help="--projects でプロジェクトごとのログを出力するディレクトリ (既定: logs)",
+    )
+
+    parser.add_argument(
+        "--projects_report",
+        "--projects-report",
+        dest="projects_report_path",
+        type=Path,
+        help="--projects の全プロジェクトの実行結果をJSONで出力するファイルパス",
+    )
+
+    parser.add_argument(
+        "--config_cache_dir",
+        "--config-cache-dir",
+        dest="config_cache_dir",
+        type=Path,
+        default=config_cache.DEFAULT_CACHE_DIR,
+        help=f"解析済みの設定と作成済みのマッチングルールを保存するディレクトリ (既定: {config_cache.DEFAULT_CACHE_DIR})",
+    )
+
+    parser.add_argument(
+        "--no_config_cache",
+        "--no-config-cache",
+        dest="config_cache_dir",
+        action="store_const",
+        const=None,
+        help="設定のキャッシュを使わず、毎回設定ファイルを解析する",
+    )
+
     args = parser.parse_args()
 
+    if args.pattern and not args.index_path:
+        logging.error("--pattern を使う場合は --index で索引のパスを指定してください。")
+        sys.exit(1)
+
+    if args.plan_output_path and not args.dry_run:
+        logging.error("--plan_output を使う場合は --dry_run を指定してください。")
+        sys.exit(1)
+
+    if args.plan_path and (args.dry_run or args.pattern or args.index_path):
+        logging.error(
+            "--plan は --dry_run、--pattern、--index と同時には指定できません。"
+        )
+        sys.exit(1)
+
+    if args.skip_audit_path and (args.plan_path or args.pattern or args.watch):
+        logging.error(
+            "--skip_audit は --plan、--pattern、--watch と同時には指定できません。"
+        )
+        sys.exit(1)
+
+    if args.watch and (
+        args.plan_path or args.dry_run or args.pattern or args.index_path
+    ):
+        logging.error(
+            "--watch は --plan、--dry_run、--pattern、--index と同時には指定できません。"
+        )
+        sys.exit(1)
+
+    if args.projects:
+        if (
+            args.plan_path
+            or args.dry_run
+            or args.pattern
+            or args.index_path
+            or args.watch
+            or args.skip_audit_path
+        ):
+            logging.error(
+                "--projects は --plan、--dry_run、--pattern、--index、--watch、--skip_audit と同時には指定できません。"
+            )
+            sys.exit(1)
+        if args.project_workers < 1 or args.per_device < 1:
+            logging.error(
+                "--project_workers と --per_device には1以上を指定してください。"
+            )
+            sys.exit(1)
+        exit_code = run_projects(args)
+        if exit_code != 0:
+            sys.exit(exit_code)
+        return
+
     if not args.config_file_path:
         logging.error("設定ファイルへのパスが指定されていません。")
         sys.exit(1)
@@ -56,7 +303,7 @@ def main():
     logging.info(f"iniファイル: {args.config_file_path}")
 
     try:
-        config = config_manager.load_config(args.config_file_path)
+        config, rules = config_cache.load(args.config_file_path, args.config_cache_dir)
 
     except FileNotFoundError as e:
         logging.error(e)
@@ -71,7 +318,429 @@ def main():
         logging.error(f"ファイルの読み込み中に予期せぬエラーが発生しました。:{e}")
         sys.exit(1)
 
-    file_processor.process_files(config)
+    if args.pattern:
+        query_index(config, rules, args)
+        return
+
+    if args.watch:
+        watch(config, rules, args)
+        return
+
+    import metrics
+
+    run_metrics = metrics.RunMetrics()
+    profiler = metrics.ThreadProfiler() if args.profile_path else None
+    try:
+        with open_skip_audit(args, rules) as audit, (
+            profiler.thread() if profiler else contextlib.nullcontext()
+        ):
+            results = run_delivery(config, rules, args, run_metrics, profiler, audit)
+    finally:
+        # 途中で終了した場合も、そこまでの計測値は出力する
+        write_run_reports(args, run_metrics, profiler)
+
+    if results is None:
+        return
+
+    exit_code = print_summary(results)
+    if exit_code != 0:
+        sys.exit(exit_code)
+
+
+def run_delivery(
+    config: dict,
+    rules: rule_engine.RuleEngine,
+    args,
+    run_metrics: metrics.RunMetrics,
+    profiler: metrics.ThreadProfiler = None,
+    audit: skip_audit.SkipAuditWriter = None,
+):
+    """
+    コマンド引数に応じて、計画の実行・ドライラン・通常のコピーのいずれかを行う。
+
+    Returns:
+        list[file_processor.JobResult]: ジョブごとの実行結果。ドライランの場合はNone
+    """
+
+    import file_processor
+
+    # 索引を使う場合だけ sqlite3 を読み込む
+    index_errors = (ValueError,)
+    if args.index_path:
+        import sqlite3
+
+        index_errors = (sqlite3.Error, ValueError)
+
+    if args.plan_path:
+        # 保存済みの計画を実行する (コピー元は走査しない)
+        try:
+            results = file_processor.replay_plan(config, args.plan_path, run_metrics)
+        except (OSError, ValueError, TypeError) as e:
+            logging.error(f"コピー計画を読み込めませんでした: {args.plan_path} ({e})")
+            sys.exit(1)
+    elif args.dry_run:
+        # コピー計画だけを作成する (走査のみで終わり、コピーは行わない)
+        try:
+            results = file_processor.plan_jobs(
+                config,
+                rules,
+                args.plan_output_path,
+                args.index_path,
+                args.reindex,
+                run_metrics,
+                audit,
+            )
+        except OSError as e:
+            logging.error(
+                f"コピー計画を出力できませんでした: {args.plan_output_path} ({e})"
+            )
+            sys.exit(1)
+        except index_errors as e:
+            logging.error(f"索引を利用できませんでした: {args.index_path} ({e})")
+            sys.exit(1)
+        print_plan_summary(results)
+        return None
+    else:
+        # 全ジョブを1回の実行で処理する (ジョブは同時に実行され、コピーの同時実行数は全体で共有)
+        try:
+            results = file_processor.process_jobs(
+                config,
+                rules,
+                args.index_path,
+                args.reindex,
+                run_metrics,
+                profiler,
+                audit,
+            )
+        except index_errors as e:
+            logging.error(f"索引を利用できませんでした: {args.index_path} ({e})")
+            sys.exit(1)
+
+    if args.tree_output_path:
+        with run_metrics.timer("tree_output"):
+            file_processor.generate_tree_output(
+                results, args.tree_output_path, args.tree_format, args.tree_details
+            )
+    return results
+
+
+def open_skip_audit(args, rules: rule_engine.RuleEngine):
+    """
+    --skip_audit で指定されたスキップ一覧の出力先を開く。
+    指定がない場合は、何もしない (None を返す) コンテキストマネージャを返す。
+    """
+
+    if not args.skip_audit_path:
+        return contextlib.nullcontext()
+    import skip_audit
+
+    try:
+        return skip_audit.SkipAuditWriter(args.skip_audit_path, rules)
+    except OSError as e:
+        logging.error(
+            f"スキップ一覧を出力できませんでした: {args.skip_audit_path} ({e})"
+        )
+        sys.exit(1)
+
+
+def write_run_reports(
+    args, run_metrics: metrics.RunMetrics, profiler: metrics.ThreadProfiler = None
+):
+    """
+    --metrics_json と --profile で指定されたファイルに計測結果を出力する。
+    出力に失敗しても終了コードには影響させない。
+    """
+
+    if args.metrics_json_path:
+        try:
+            run_metrics.write_json(args.metrics_json_path)
+            logging.info(f"計測結果の出力先: {args.metrics_json_path}")
+        except OSError as e:
+            logging.error(
+                f"計測結果を出力できませんでした: {args.metrics_json_path} ({e})"
+            )
+    if profiler is not None:
+        try:
+            profiler.dump(args.profile_path)
+            logging.info(f"プロファイルの出力先: {args.profile_path}")
+        except OSError as e:
+            logging.error(
+                f"プロファイルを出力できませんでした: {args.profile_path} ({e})"
+            )
+
+
+def run_projects(args) -> int:
+    """
+    --projects で指定された複数のプロジェクトを、プロセスを分けて並行して納品する。
+
+    Returns:
+        int: 終了コード。失敗したプロジェクトがある場合は1
+    """
+
+    import fanout
+
+    config_paths = fanout.find_config_files(args.projects)
+    if not config_paths:
+        logging.error(f"設定ファイルが見つかりません: {args.projects}")
+        return 1
+    logging.info(f"プロジェクト数: {len(config_paths)} (ログ: {args.log_dir})")
+
+    start = time.perf_counter()
+    results = fanout.run_projects(
+        config_paths, args.log_dir, args.project_workers, args.per_device
+    )
+    wall_seconds = time.perf_counter() - start
+
+    if args.projects_report_path:
+        try:
+            fanout.write_report(results, wall_seconds, args.projects_report_path)
+            logging.info(f"実行結果の出力先: {args.projects_report_path}")
+        except OSError as e:
+            logging.error(
+                f"実行結果を出力できませんでした: {args.projects_report_path} ({e})"
+            )
+    return fanout.print_report(results, wall_seconds)
+
+
+def watch(config: dict, rules: rule_engine.RuleEngine, args):
+    """
+    監視モード。変更を反映するたびに結果を表示し、ツリーを出力し直す。
+    """
+
+    import file_processor
+    import watcher
+
+    def on_batch(batch: list, latest: list):
+        print_summary(batch)
+        if args.tree_output_path:
+            file_processor.generate_tree_output(
+                latest, args.tree_output_path, args.tree_format, args.tree_details
+            )
+
+    try:
+        watcher.watch_jobs(
+            config,
+            rules,
+            interval=args.watch_interval,
+            debounce=args.debounce,
+            use_inotify=not args.watch_polling,
+            on_batch=on_batch,
+        )
+    except KeyboardInterrupt:
+        logging.info("--- フォルダの監視を終了しました ---")
+
+
+def query_index(config: dict, rules: rule_engine.RuleEngine, args):
+    """
+    索引を更新し、ファイル名のパターンに合致するファイルを一覧表示する。
+    """
+
+    import sqlite3
+
+    import file_index
+
+    try:
+        with file_index.FileIndex(args.index_path, rules.fold) as index:
+            rows = []
+            for job in config["jobs"]:
+                index.refresh(job["teams_root_path"], rules.phases, full=args.reindex)
+                rows.extend(index.query(args.pattern, job["teams_root_path"]))
+    except (sqlite3.Error, ValueError) as e:
+        logging.error(f"索引を利用できませんでした: {args.index_path} ({e})")
+        sys.exit(1)
+
+    for row in rows:
+        print(row.path)
+    logging.info(f"パターン {args.pattern} に合致したファイル: {len(rows)}件")
+
+
+def print_summary(results: list) -> int:
+    """
+    全ジョブの実行結果をまとめて標準出力に表示する。
+
+    Returns:
+        int: 終了コード。コピーに失敗したファイルがある、またはジョブが失敗した場合は1
+    """
+
+    import copy_executor
+
+    print("--- 実行結果 ---")
+    total = copy_executor.CopySummary()
+    exit_code = 0
+    for result in results:
+        name = f"[{result.name}] " if result.name else ""
+        if result.error is not None:
+            print(f"{name}失敗: {result.error} ({result.elapsed:.1f}秒)")
+            exit_code = 1
+            continue
+
+        summary = result.summary
+        print(
+            f"{name}コピー:{summary.copied}件 変更なし:{summary.skipped}件"
+            f" 失敗:{summary.failed}件 不要:{summary.stale}件 ({result.elapsed:.1f}秒)"
+        )
+        for field in (
+            "copied",
+            "skipped",
+            "failed",
+            "bytes_copied",
+            "stale",
+            "bytes_linked",
+            "seconds_saved",
+        ):
+            setattr(total, field, getattr(total, field) + getattr(summary, field))
+        if summary.failed:
+            exit_code = 1
+
+    if len(results) > 1:
+        print(
+            f"合計 コピー:{total.copied}件 変更なし:{total.skipped}件"
+            f" 失敗:{total.failed}件 不要:{total.stale}件"
+        )
+    if total.bytes_linked:
+        # link_mode・dedup によってコピーせずに済んだ分
+        print(
+            f"リンク・重複排除で書き込まなかった容量: {total.bytes_linked / 1024 / 1024:.1f}MB"
+            f" (推定 {total.seconds_saved:.1f}秒短縮)"
+        )
+    return exit_code
+
+
+def verify_main(argv: list):
+    """
+    verify サブコマンド。納品先のファイルを SHA256SUMS と照合し、結果と処理速度を表示する。
+
+    使い方:
+        python main.py verify <納品先ルートパス> [--workers N]
+    """
+
+    import checksums
+
+    parser = argparse.ArgumentParser(
+        prog="main.py verify",
+        description=f"納品先のファイルを{checksums.CHECKSUM_FILE_NAME}と照合します",
+    )
+    parser.add_argument("delivery_root", help="納品先ルートパス", type=Path)
+    parser.add_argument(
+        "--workers",
+        type=positive_int,
+        help="ハッシュ計算に使うプロセス数 (省略時: CPU数)",
+    )
+    args = parser.parse_args(argv)
+
+    def on_failure(rel_path: str, reason: str):
+        print(f"NG: {rel_path} ({reason})")
+
+    try:
+        summary = checksums.verify_delivery(
+            args.delivery_root, args.workers, on_failure
+        )
+    except (OSError, ValueError) as e:
+        logging.error(
+            f"{checksums.CHECKSUM_FILE_NAME}を読み込めませんでした: {args.delivery_root} ({e})"
+        )
+        sys.exit(1)
+
+    print("--- 検証結果 ---")
+    print(
+        f"一致:{summary.ok}件 不一致:{len(summary.mismatched)}件"
+        f" 読み込み失敗:{len(summary.missing)}件"
+    )
+    print(
+        f"{summary.bytes_read / 1024 / 1024:.1f}MB / {summary.elapsed:.1f}秒"
+        f" ({summary.mb_per_sec:.1f}MB/s)"
+    )
+    if summary.mismatched or summary.missing:
+        sys.exit(1)
+
+
+def positive_int(value: str) -> int:
+    """1以上の整数のコマンド引数 (argparse の type に指定する)"""
+
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"整数を指定してください: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"1以上を指定してください: {value}")
+    return number
+
+
+def delta_main(argv: list):
+    """
+    delta サブコマンド。前回と今回の納品物を比較し、追加・削除・変更・名前変更のあったファイルを表示する。
+
+    使い方:
+        python main.py delta <古い納品物> <新しい納品物> [--hash] [--json 出力先.json]
+
+    納品物には、マニフェスト (.delivery_manifest*.jsonl) または納品先ルートのディレクトリを指定する。
+    """
+
+    import delta
+
+    parser = argparse.ArgumentParser(
+        prog="main.py delta",
+        description="2つの納品物 (マニフェストまたは納品先ルート) の差分を表示します",
+    )
+    parser.add_argument("old", help="古い納品物 (マニフェストまたは納品先ルートパス)")
+    parser.add_argument("new", help="新しい納品物 (マニフェストまたは納品先ルートパス)")
+    parser.add_argument(
+        "--hash",
+        dest="check_hash",
+        action="store_true",
+        help="サイズが同じファイルを、更新日時ではなく内容のSHA-256で比較する",
+    )
+    parser.add_argument(
+        "--no_renames",
+        "--no-renames",
+        dest="detect_renames",
+        action="store_false",
+        help="名前の変更を検出しない (削除と追加として表示する)",
+    )
+    parser.add_argument(
+        "--json",
+        dest="json_path",
+        type=Path,
+        help="差分をJSONで出力するファイルパス",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        result = delta.compare(
+            delta.read_snapshot(args.old),
+            delta.read_snapshot(args.new),
+            args.check_hash,
+            args.detect_renames,
+        )
+    except (OSError, ValueError, TypeError) as e:
+        logging.error(f"納品物を比較できませんでした: {e}")
+        sys.exit(1)
+
+    print("--- 差分 ---")
+    delta.write_text(result, sys.stdout)
+    logging.info(f"比較の所要時間: {result.elapsed:.1f}秒")
+    if args.json_path:
+        try:
+            delta.write_json(result, args.json_path, args.old, args.new)
+            logging.info(f"差分の出力先: {args.json_path}")
+        except OSError as e:
+            logging.error(f"差分を出力できませんでした: {args.json_path} ({e})")
+            sys.exit(1)
+
+
+def print_plan_summary(results: list):
+    """
+    ドライランで作成したコピー計画の件数を標準出力に表示する。
+    """
+
+    print("--- コピー計画 (ドライラン) ---")
+    for result in results:
+        name = f"[{result.name}] " if result.name else ""
+        summary = result.summary
+        print(
+            f"{name}コピー予定:{summary.copied}件 変更なし:{summary.skipped}件"
+            f" 不要:{summary.stale}件 ({result.elapsed:.1f}秒)"
+        )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+from typing import Dict, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 納品先ルート (delivery_root_path) に置くマニフェストのファイル名
+# ([Job:<ジョブ名>] で実行した場合は ".delivery_manifest.<ジョブ名>.jsonl")
+MANIFEST_FILE_NAME = ".delivery_manifest.jsonl"
+MANIFEST_VERSION = 1
+
+
+class ManifestEntry(NamedTuple):
+    """
+    納品済みの1ファイル分の記録。
+
+    Attributes:
+        path (str): 納品先ルートからの相対パス ("/" 区切り。例: "030.調査/成果物/a.xlsx")
+        src (str): コピー元ファイルのパス
+        size (int): コピーした時点のコピー元のサイズ
+        mtime_ns (int): コピーした時点のコピー元の更新日時 (ナノ秒)
+        sha256 (str): 内容のSHA-256 (hash_files有効時のみ。無効時はNone)
+    """
+
+    path: str
+    src: str
+    size: int
+    mtime_ns: int
+    sha256: Optional[str] = None
+
+
+def path_sort_key(path: str) -> tuple:
+    """
+    マニフェスト内の並び順。パスを "/" で区切った要素の順で比較する
+    (フォルダを深さ優先で名前順にたどった順序と一致する)。
+    """
+
+    return tuple(path.split("/"))
+
+
+class Manifest:
+    """
+    納品先ルートに保存する、納品済みファイルの一覧。
+
+    再実行時はコピー元のサイズと更新日時をこの記録と比べ、新規または変更のあった
+    ファイルだけをコピーする。納品先のファイルは一切参照しない (stat も行わない) ため、
+    納品先のファイルを手作業で削除・変更した場合は、マニフェストを削除して再実行すること。
+
+    ファイル形式は JSON Lines。1行目がヘッダ、2行目以降が1ファイル1行で、
+    path_sort_key の順に並べて保存する。
+    """
+
+    def __init__(self, manifest_path, entries: Dict[str, ManifestEntry] = None):
+        self.manifest_path = manifest_path
+        self.entries = entries if entries is not None else {}
+
+    @classmethod
+    def for_delivery_root(cls, delivery_root, job_name: str = None) -> "Manifest":
+        """
+        納品先ルートのマニフェストを読み込む。存在しなければ空のマニフェストを返す。
+
+        複数のジョブが同じ納品先ルートに納品する場合でも互いの記録を
+        「コピー元から消えたファイル」と誤認しないよう、マニフェストはジョブごとに分ける。
+        """
+
+        return cls.load(os.path.join(delivery_root, manifest_file_name(job_name)))
+
+    @classmethod
+    def load(cls, manifest_path) -> "Manifest":
+        """
+        マニフェストを読み込む。存在しない、または壊れている場合は空として扱う
+        (その場合は全ファイルを再コピーすることになる)。
+        """
+
+        try:
+            entries = {entry.path: entry for entry in read_entries(manifest_path)}
+        except FileNotFoundError:
+            entries = {}
+        except (OSError, ValueError, TypeError) as e:
+            logging.warning(
+                f"マニフェストを読み込めないため、全ファイルを再コピーします: {manifest_path} ({e})"
+            )
+            entries = {}
+        return cls(manifest_path, entries)
+
+    def is_unchanged(self, path: str, src: str, size: int, mtime_ns: int) -> bool:
+        """前回納品時からコピー元が変わっていなければTrue"""
+
+        entry = self.entries.get(path)
+        return (
+            entry is not None
+            and entry.src == src
+            and entry.size == size
+            and entry.mtime_ns == mtime_ns
+        )
+
+    def update(self, entry: ManifestEntry):
+        self.entries[entry.path] = entry
+
+    def remove(self, path: str):
+        self.entries.pop(path, None)
+
+    def save(self):
+        """
+        マニフェストを保存する。書き込み途中で中断しても壊れないよう、
+        一時ファイルに書いてから置き換える。
+        """
+
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"manifest_version": MANIFEST_VERSION}) + "\n")
+            for path in sorted(self.entries, key=path_sort_key):
+                f.write(
+                    json.dumps(self.entries[path]._asdict(), ensure_ascii=False) + "\n"
+                )
+        os.replace(tmp_path, self.manifest_path)
+
+
+def manifest_file_name(job_name: str = None) -> str:
+    """ジョブに対応するマニフェストのファイル名"""
+
+    if job_name is None:
+        return MANIFEST_FILE_NAME
+    return f".delivery_manifest.{job_name}.jsonl"
+
+
+def read_entries(manifest_path) -> Iterator[ManifestEntry]:
+    """
+    マニフェストのエントリを先頭から順に返す (全体をメモリに載せずに読める)。
+
+    Raises:
+        FileNotFoundError: マニフェストが存在しない場合。
+        ValueError: 形式が不正な場合。
+    """
+
+    for line in read_lines(manifest_path):
+        yield ManifestEntry(**json.loads(line))
+
+
+def read_lines(manifest_path) -> Iterator[str]:
+    """
+    マニフェストのエントリの行を、JSONとして解釈せずに先頭から順に返す。
+    同じ内容の行を比べるだけで済む場合 (delta) に、解釈の手間を省くために使う。
+
+    Raises:
+        FileNotFoundError: マニフェストが存在しない場合。
+        ValueError: ヘッダの形式が不正な場合。
+    """
+
+    with open(manifest_path, encoding="utf-8") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("manifest_version") != MANIFEST_VERSION:
+            raise ValueError(f"未対応のマニフェスト形式です: {header}")
+        for line in f:
+            if line.strip():
+                yield line
@@ -0,0 +1,160 @@
+import collections
+import contextlib
+import json
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Iterable, List
+
+# cProfile は --profile を指定した場合にしか使わないため、ThreadProfiler.thread の中で読み込む
+if TYPE_CHECKING:
+    import cProfile
+
+logger = logging.getLogger(__name__)
+
+
+class RunMetrics:
+    """
+    1回の実行の計測値 (件数・段階ごとの所要時間・コピー1件ごとの所要時間) を集める。
+
+    複数ジョブのスレッドから同時に加算できる。加算のたびにロックを取るため、
+    ファイル1件ごとの値は呼び出し側でまとめてから merge() で加えること。
+
+    段階ごとの所要時間は、その段階の処理に費やした時間の合計である。
+    走査とコピーのように並行して進む段階や、複数のスレッドで行われる段階
+    (copy はコピー用スレッドの合計) があるため、合計は全体の経過時間と一致しない。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.counters = collections.Counter()
+        self.stage_seconds = collections.Counter()
+        self.matched_by_phase = collections.Counter()
+        self.matched_by_rule = collections.Counter()
+        self.copy_latencies: List[float] = []
+
+    def add(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] += value
+
+    def merge(
+        self,
+        counters: Dict[str, int] = None,
+        stage_seconds: Dict[str, float] = None,
+        matched_by_phase: Dict[str, int] = None,
+        matched_by_rule: Dict[str, int] = None,
+        copy_latencies: Iterable[float] = (),
+    ):
+        """呼び出し側でまとめた計測値を加える"""
+
+        with self._lock:
+            self.counters.update(counters or {})
+            self.stage_seconds.update(stage_seconds or {})
+            self.matched_by_phase.update(matched_by_phase or {})
+            self.matched_by_rule.update(matched_by_rule or {})
+            self.copy_latencies.extend(copy_latencies)
+
+    @contextlib.contextmanager
+    def timer(self, stage: str):
+        """with ブロックの所要時間を段階 stage の時間に加える"""
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stage_seconds[stage] += elapsed
+
+    def to_dict(self) -> dict:
+        """JSONに出力できる形に変換する"""
+
+        with self._lock:
+            elapsed = time.perf_counter() - self._start
+            latencies = sorted(self.copy_latencies)
+            bytes_copied = self.counters["bytes_copied"]
+            return {
+                "elapsed_seconds": elapsed,
+                "counters": dict(sorted(self.counters.items())),
+                "matched_by_phase": dict(sorted(self.matched_by_phase.items())),
+                "matched_by_rule": dict(sorted(self.matched_by_rule.items())),
+                "stage_seconds": dict(sorted(self.stage_seconds.items())),
+                "copy_latency_seconds": {
+                    "count": len(latencies),
+                    "p50": percentile(latencies, 50),
+                    "p95": percentile(latencies, 95),
+                    "max": latencies[-1] if latencies else None,
+                },
+                "copy_mb_per_sec": (
+                    bytes_copied / 1024 / 1024 / elapsed if elapsed > 0 else None
+                ),
+            }
+
+    def write_json(self, output_file_path):
+        with open(output_file_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            f.write("\n")
+
+
+def percentile(sorted_values: List[float], p: float):
+    """
+    昇順に並んだ値の p パーセンタイル (最近傍順位法)。値がなければNone。
+    """
+
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * p // 100))  # 切り上げ
+    return sorted_values[int(rank) - 1]
+
+
+class ThreadProfiler:
+    """
+    cProfile で実行全体をプロファイルする。
+
+    cProfile は有効にしたスレッドしか計測しないため、ジョブを実行するスレッドごとに
+    thread() で計測し、最後にまとめて出力する (コピー用スレッドは計測しない。
+    コピーの所要時間は RunMetrics の copy_latency_seconds を参照)。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._profiles: List["cProfile.Profile"] = []
+
+    @contextlib.contextmanager
+    def thread(self):
+        """with ブロックの間、呼び出したスレッドを計測する"""
+
+        # cProfile は --profile を指定した場合にしか使わないため、ここで読み込む
+        import cProfile
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12以降は1つのプロファイラで全スレッドを計測するため、
+            # 他のスレッドで計測中であれば二重に有効にする必要はない
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self._profiles.append(profile)
+
+    def dump(self, output_file_path, top: int = 20):
+        """
+        計測結果を pstats 形式で保存し、累積時間の上位を標準出力に表示する。
+        """
+
+        # pstats は --profile を指定した場合にしか使わず、読み込みに時間がかかるため、ここで読み込む
+        import pstats
+
+        with self._lock:
+            profiles = list(self._profiles)
+        if not profiles:
+            return
+        stats = pstats.Stats(*profiles)
+        stats.dump_stats(str(output_file_path))
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(top)
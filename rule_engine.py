@@ -0,0 +1,248 @@
+import logging
+import re
+import unicodedata
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Tuple
+
+import config_manager
+import walker
+
+logger = logging.getLogger(__name__)
+
+# ワイルドカードとして扱う文字
+WILDCARD_CHARS = ("*", "?")
+
+
+def fold_name(name: str) -> str:
+    """
+    照合用の正規化 (NFC + 大文字小文字の同一視)。RuleEngine の既定の正規化関数。
+    """
+
+    if name.isascii():
+        return name.casefold()
+    folded = walker.normalize_nfc(name).casefold()
+    # casefold で分解された形になる文字がまれにあるため、もう一度そろえる
+    return walker.normalize_nfc(folded)
+
+
+def fold_name_width(name: str) -> str:
+    """
+    照合用の正規化 (NFKC + 大文字小文字の同一視)。
+    fold_name に加えて全角・半角の違い (例: "ＡＢＣ" と "ABC"、"ｶﾞ" と "ガ") も同一視する。
+    """
+
+    if name.isascii():
+        return name.casefold()
+    folded = unicodedata.normalize("NFKC", name).casefold()
+    return unicodedata.normalize("NFKC", folded)
+
+
+def name_fold(fold_width: bool = False) -> Callable[[str], str]:
+    """設定 (fold_width) に対応する照合用の正規化関数"""
+
+    return fold_name_width if fold_width else fold_name
+
+
+class Rule(NamedTuple):
+    """
+    1件のマッチングルール。
+
+    Attributes:
+        pattern (str): 設定ファイルに記述されたパターン (例: "調査検討書_", "*.py")
+        phase (str): コピー先のフェーズフォルダ名 (例: "030.調査")
+        is_artifact (bool): Trueなら「成果物」フォルダ配下のファイルが対象
+        index (int): 設定ファイル上の記述順
+    """
+
+    pattern: str
+    phase: str
+    is_artifact: bool
+    index: int
+
+
+class _CompiledRuleSet:
+    """
+    1つの (フェーズ, 成果物か) に属するルールをまとめてコンパイルしたもの。
+
+    - ワイルドカードを含まないパターン (および末尾が * のみのパターン) は前方一致ルールとして
+      プレフィックス木 (trie) にまとめ、木の形そのままの正規表現に変換する。
+      分岐の先頭文字はすべて異なるため、照合はファイル名の長さ分だけで済み、ルール数に依存しない。
+    - それ以外のワイルドカードパターン (例: "*.py") は、名前付きグループの選択肢として
+      同じ正規表現に連結する。
+    """
+
+    def __init__(self, rules: Iterable[Rule], fold: Callable[[str], str]):
+        self._prefix_rules = {}  # 正規化済みプレフィックス -> Rule
+        self._glob_rules = {}  # 名前付きグループ名 -> Rule
+
+        glob_parts = []
+        for rule in rules:
+            folded = fold(rule.pattern)
+            prefix = _as_prefix(folded)
+            if prefix is not None:
+                # 同じプレフィックスが複数ある場合は先に記述されたものを優先
+                self._prefix_rules.setdefault(prefix, rule)
+            else:
+                group = f"g{len(self._glob_rules)}"
+                self._glob_rules[group] = rule
+                glob_parts.append(f"(?P<{group}>{_glob_to_regex(folded)})")
+
+        alternatives = []
+        if self._prefix_rules:
+            alternatives.append(f"(?P<prefix>{_trie_to_regex(self._prefix_rules)})")
+        alternatives.extend(glob_parts)
+
+        self._regex = (
+            re.compile("|".join(alternatives), re.DOTALL) if alternatives else None
+        )
+
+    def match(self, folded_name: str) -> Optional[Rule]:
+        if self._regex is None:
+            return None
+        m = self._regex.match(folded_name)
+        if m is None:
+            return None
+        if m.lastgroup == "prefix":
+            return self._prefix_rules[m.group("prefix")]
+        return self._glob_rules[m.lastgroup]
+
+
+class RuleEngine:
+    """
+    設定ファイルの [Mappings] から作成した、コンパイル済みのマッチングルール。
+
+    起動時に1回だけ作成し、ファイルごとの照合では正規化済みのファイル名を
+    (フェーズ, 成果物か) ごとの正規表現1つに通すだけにする。
+    ルールのパターンは作成時に正規化 (NFC と大文字小文字の同一視) しておく。
+    フェーズ名は NFC にそろえる (walker もフェーズフォルダ名を NFC にして返す)。
+    """
+
+    def __init__(
+        self,
+        mappings: Iterable[Tuple[str, str, bool]],
+        fold: Callable[[str], str] = fold_name,
+    ):
+        """
+        Args:
+            mappings (Iterable[Tuple[str, str, bool]]): (パターン, フェーズ名, 成果物か) の並び。
+                config_manager.load_config の戻り値の "mappings" をそのまま渡せる
+            fold (Callable[[str], str]): ファイル名とパターンに共通で適用する正規化関数
+        """
+
+        self.fold = fold
+        self.rules = tuple(
+            Rule(pattern, walker.normalize_nfc(phase), is_artifact, index)
+            for index, (pattern, phase, is_artifact) in enumerate(mappings)
+        )
+
+        grouped: Dict[Tuple[str, bool], list] = {}
+        for rule in self.rules:
+            grouped.setdefault((rule.phase, rule.is_artifact), []).append(rule)
+
+        self._rule_sets = {
+            key: _CompiledRuleSet(rules, fold) for key, rules in grouped.items()
+        }
+
+        # 走査対象のフェーズフォルダ名 (成果物のルールしかないフェーズも含む)
+        self.phases = frozenset(rule.phase for rule in self.rules)
+
+    @classmethod
+    def from_config(cls, config: dict) -> "RuleEngine":
+        """
+        設定 (config_manager.load_config の戻り値) の "mappings" と "fold_width" から作成する。
+        "mappings" がなければ既定のマッピングを使う。
+        """
+
+        return cls(
+            config.get("mappings", config_manager.DEFAULT_MAPPINGS),
+            name_fold(config.get("fold_width", False)),
+        )
+
+    def match(
+        self,
+        phase: str,
+        is_artifact: bool,
+        file_name: str,
+        folded_name: Optional[str] = None,
+    ) -> Optional[Rule]:
+        """
+        ファイル名に合致するルールを返す。合致しない場合はNone。
+
+        Args:
+            phase (str): ファイルが属するフェーズフォルダ名
+            is_artifact (bool): 「成果物」フォルダ配下のファイルか
+            file_name (str): ファイル名 (正規化前)
+            folded_name (str): 正規化済みのファイル名 (self.fold(file_name))。
+                走査時に計算済みの場合に渡すと、正規化を省略する
+        """
+
+        rule_set = self._rule_sets.get((phase, is_artifact))
+        if rule_set is None:
+            return None
+        if folded_name is None:
+            folded_name = self.fold(file_name)
+        return rule_set.match(folded_name)
+
+
+def has_wildcard(pattern: str) -> bool:
+    """パターンにワイルドカード文字が含まれるか"""
+
+    return any(c in pattern for c in WILDCARD_CHARS)
+
+
+def _as_prefix(pattern: str) -> Optional[str]:
+    """
+    前方一致として扱えるパターンならプレフィックス文字列を返す。
+    "調査検討書_" や "調査検討書_*" は前方一致、"*.py" などはNone。
+    """
+
+    pattern = pattern.rstrip("*")
+    return None if has_wildcard(pattern) else pattern
+
+
+def _glob_to_regex(pattern: str) -> str:
+    """
+    ワイルドカードパターンを、ファイル名全体に一致する正規表現に変換する。
+    "*" は任意の文字列、"?" は任意の1文字。それ以外の文字はそのまま比較する。
+    """
+
+    parts = []
+    for c in pattern:
+        if c == "*":
+            parts.append(".*")
+        elif c == "?":
+            parts.append(".")
+        else:
+            parts.append(re.escape(c))
+    return "".join(parts) + r"\Z"
+
+
+def _trie_to_regex(prefixes: Iterable[str]) -> str:
+    """
+    プレフィックスの集合をプレフィックス木にし、木の形の正規表現に変換する。
+    例: {"ab", "abc", "ad"} -> "a(?:b(?:c)?|d)"
+
+    各分岐の先頭文字は互いに異なるため後戻りは起こらず、
+    終端を省略可能 (?) にしているので、常に最長のプレフィックスに一致する。
+    """
+
+    END = ""  # 終端を表すキー (1文字のキーとは衝突しない)
+    trie: dict = {}
+    for prefix in prefixes:
+        node = trie
+        for c in prefix:
+            node = node.setdefault(c, {})
+        node[END] = True
+
+    def build(node: dict) -> str:
+        branches = [
+            re.escape(c) + build(child) for c, child in sorted(node.items()) if c != END
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if END in node:
+            # ここで終わるプレフィックスもあるので、以降は省略可能
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
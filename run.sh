@@ -1,16 +1,6 @@
 # !/bin/sh
 
+# config.ini の [Job:*] (マイグレ, サンプル2) を1回の実行でまとめて処理し、
+# 納品先フォルダのツリーも合わせて出力する (外部の tree コマンドは使わない)
 echo "#### コピー開始 ####"
-python main.py
-
-echo "#### config.ini修正 ####"
-sed -i '' 's|/Users/koni/Desktop/walk_base_sample/マイグレ|/Users/koni/Desktop/walk_base_sample/サンプル2|g' config.ini
-cat ./config.ini
-echo "#### コピー開始 ####"
-python main.py
-
-sed -i '' 's|/Users/koni/Desktop/walk_base_sample/サンプル2|/Users/koni/Desktop/walk_base_sample/マイグレ|g' config.ini
-
-echo "#### ツリー出力 ####"
-cd /Users/koni/Desktop/copy_teams
-tree > tree.txt
\ No newline at end of file
+python main.py -t /Users/koni/Desktop/copy_teams/tree.txt
@@ -0,0 +1,224 @@
+import gzip
+import json
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import Iterator, List, Optional
+
+import rule_engine
+import walker
+
+logger = logging.getLogger(__name__)
+
+# スキップの理由
+# どのルールにも合致しない
+REASON_NO_MATCH = "no_match"
+# 別のフェーズのルールに合致する (置き場所のフェーズ違い)
+REASON_WRONG_PHASE = "wrong_phase"
+# 成果物フォルダの外にある (または、フェーズ直下のルールに合致するが成果物フォルダ内にある)
+REASON_OUTSIDE_ARTIFACT = "outside_artifact"
+# 成果物のフラット化で同名のファイルが先に納品された
+REASON_DUPLICATE_NAME = "duplicate_name"
+
+# 惜しい候補の種類
+# パターンがファイル名の途中に含まれる (先頭ではない)
+NEAR_MISS_CONTAINS = "contains"
+# 全角・半角などの違いを無視すれば合致する
+NEAR_MISS_CASE_WIDTH = "case_width"
+
+
+class SkipAuditWriter:
+    """
+    納品対象にならなかったファイルを、理由とともに gzip 圧縮の JSON Lines に書き出す。
+
+    1ファイルごとにすぐ書き出すため、Teamsフォルダの大きさに関係なくメモリ使用量は一定。
+    複数のジョブ (スレッド) から同時に書き込める。
+
+    各行は次のキーを持つ。
+      - job: ジョブ名 (なければ null)
+      - path: スキップしたファイルのパス
+      - phase: ファイルがあったフェーズフォルダ名
+      - in_artifact: 成果物フォルダ配下か
+      - reason: REASON_* のいずれか
+      - rule: 合致した (置き場所が違う) ルール。{"pattern", "phase", "is_artifact"}。なければ null
+      - near_misses: 惜しい候補のリスト。{"kind", "pattern", "phase", "is_artifact"}
+    """
+
+    def __init__(self, output_path, rules: rule_engine.RuleEngine):
+        """
+        Args:
+            output_path: 出力先ファイルパス (例: "skipped.jsonl.gz")
+            rules (rule_engine.RuleEngine): 納品に使うマッチングルール
+        """
+
+        self.output_path = output_path
+        self.rules = rules
+        self.counts = Counter()
+        self._lock = threading.Lock()
+        self._file = gzip.open(output_path, "wt", encoding="utf-8")
+
+        # 全角・半角の違いを無視して照合するルール
+        self._wide_rules = rule_engine.RuleEngine(
+            [(rule.pattern, rule.phase, rule.is_artifact) for rule in rules.rules],
+            fold=rule_engine.fold_name_width,
+        )
+        self._locations = sorted(
+            {(rule.phase, rule.is_artifact) for rule in rules.rules}
+        )
+        # ファイル名の途中に含まれるかを調べる前方一致パターン (長いものから照合する)
+        self._prefix_rules = {}
+        for rule in rules.rules:
+            prefix = rule_engine.fold_name_width(rule.pattern).rstrip("*")
+            if prefix and not rule_engine.has_wildcard(prefix):
+                self._prefix_rules.setdefault(prefix, rule)
+        self._contains_regex = (
+            re.compile(
+                "|".join(
+                    re.escape(p)
+                    for p in sorted(self._prefix_rules, key=len, reverse=True)
+                )
+            )
+            if self._prefix_rules
+            else None
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+        if self.counts:
+            detail = " ".join(
+                f"{reason}:{n}件" for reason, n in sorted(self.counts.items())
+            )
+            logging.info(f"スキップしたファイル: {detail} (出力先: {self.output_path})")
+
+    def unmatched(self, job_name: Optional[str], record: walker.WalkRecord):
+        """
+        フェーズ直下・成果物配下にあるが、どのルールにも合致しなかったファイルを記録する。
+        """
+
+        name = record.entry.name
+        reason = REASON_NO_MATCH
+        matched = None
+        for phase, is_artifact in self._locations:
+            if (phase, is_artifact) == (record.phase, record.is_artifact):
+                continue
+            rule = self.rules.match(phase, is_artifact, name)
+            if rule is None:
+                continue
+            if phase != record.phase:
+                reason, matched = REASON_WRONG_PHASE, rule
+                break
+            if matched is None:
+                reason, matched = REASON_OUTSIDE_ARTIFACT, rule
+        self._write(
+            job_name,
+            record.entry.path,
+            record.phase,
+            record.is_artifact,
+            reason,
+            matched,
+        )
+
+    def outside_artifact(self, job_name: Optional[str], task: walker.DirTask, entry):
+        """
+        フェーズフォルダ配下のうち、成果物フォルダの外のサブフォルダにあるファイルを記録する
+        (walker.walk_phase_tree の on_skip に渡す)。
+        成果物のルールを優先し、なければフェーズ直下のルールに合致するかを記録する。
+        """
+
+        rule = self.rules.match(task.phase, True, entry.name)
+        if rule is None:
+            rule = self.rules.match(task.phase, False, entry.name)
+        self._write(
+            job_name, entry.path, task.phase, False, REASON_OUTSIDE_ARTIFACT, rule
+        )
+
+    def duplicate_name(self, job_name: Optional[str], record: walker.WalkRecord, rule):
+        """成果物のフラット化で同名のファイルが先に納品されたファイルを記録する"""
+
+        self._write(
+            job_name,
+            record.entry.path,
+            record.phase,
+            record.is_artifact,
+            REASON_DUPLICATE_NAME,
+            rule,
+        )
+
+    def near_misses(
+        self, name: str, rule: Optional[rule_engine.Rule] = None
+    ) -> List[dict]:
+        """
+        ファイル名がルールに惜しくも合致しない候補を返す。
+
+        Args:
+            name (str): ファイル名
+            rule (rule_engine.Rule): 既に合致しているルール (あれば候補は探さない)
+        """
+
+        if rule is not None:
+            return []
+        folded = rule_engine.fold_name_width(name)
+        for phase, is_artifact in self._locations:
+            wide_rule = self._wide_rules.match(phase, is_artifact, name)
+            # 通常の照合でも合致する場合は、全角・半角の違いによるものではない
+            if (
+                wide_rule is not None
+                and self.rules.match(phase, is_artifact, name) is None
+            ):
+                return [_rule_dict(wide_rule, NEAR_MISS_CASE_WIDTH)]
+        if self._contains_regex is not None:
+            m = self._contains_regex.search(folded, 1)
+            if m is not None:
+                return [_rule_dict(self._prefix_rules[m.group(0)], NEAR_MISS_CONTAINS)]
+        return []
+
+    def _write(
+        self,
+        job_name: Optional[str],
+        path: str,
+        phase: str,
+        in_artifact: bool,
+        reason: str,
+        rule: Optional[rule_engine.Rule],
+    ):
+        line = json.dumps(
+            {
+                "job": job_name,
+                "path": path,
+                "phase": phase,
+                "in_artifact": in_artifact,
+                "reason": reason,
+                "rule": _rule_dict(rule) if rule is not None else None,
+                "near_misses": self.near_misses(os.path.basename(path), rule),
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            self.counts[reason] += 1
+            self._file.write(line + "\n")
+
+
+def read_audit(path) -> Iterator[dict]:
+    """書き出したスキップ一覧を1行ずつ読み込む"""
+
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def _rule_dict(rule: rule_engine.Rule, kind: str = None) -> dict:
+    d = {"pattern": rule.pattern, "phase": rule.phase, "is_artifact": rule.is_artifact}
+    if kind is not None:
+        d = dict(kind=kind, **d)
+    return d
@@ -0,0 +1,107 @@
+###############################################################
+#
+# checksums のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import hashlib
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import checksums
+import main
+from manifest import ManifestEntry
+
+
+class TestChecksums(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        (self.test_dir / "030.調査" / "成果物").mkdir(parents=True)
+        self.files = {
+            "030.調査/調査検討書_A.xlsx": b"top",
+            "030.調査/成果物/レビュー記録表_調査.xlsx": b"review",
+        }
+        entries = []
+        for rel_path, data in self.files.items():
+            (self.test_dir / rel_path).write_bytes(data)
+            entries.append(
+                ManifestEntry(
+                    rel_path, "/src", len(data), 0, hashlib.sha256(data).hexdigest()
+                )
+            )
+        # SHA-256の記録がないファイルは書き出さない
+        entries.append(ManifestEntry("040.設計/ハッシュなし.xlsx", "/src", 0, 0))
+        self.count = checksums.write_checksum_file(self.test_dir, entries)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_write_and_read(self):
+        """
+        sha256sum と同じ形式で、パスの順に書き出されることを確認
+        """
+        self.assertEqual(self.count, 2)
+        lines = (
+            (self.test_dir / checksums.CHECKSUM_FILE_NAME)
+            .read_text(encoding="utf-8")
+            .splitlines()
+        )
+        self.assertEqual(
+            lines[0],
+            hashlib.sha256(b"review").hexdigest()
+            + "  030.調査/成果物/レビュー記録表_調査.xlsx",
+        )
+        self.assertEqual(
+            [
+                rel_path
+                for _, rel_path in checksums.read_checksum_file(
+                    self.test_dir / checksums.CHECKSUM_FILE_NAME
+                )
+            ],
+            ["030.調査/成果物/レビュー記録表_調査.xlsx", "030.調査/調査検討書_A.xlsx"],
+        )
+
+    def test_verify_delivery(self):
+        """
+        内容の変更と削除が検出されることを確認
+        """
+        summary = checksums.verify_delivery(self.test_dir, workers=2)
+        self.assertEqual(summary.ok, 2)
+        self.assertEqual(summary.bytes_read, 9)
+
+        (self.test_dir / "030.調査" / "調査検討書_A.xlsx").write_bytes(b"changed")
+        (self.test_dir / "030.調査" / "成果物" / "レビュー記録表_調査.xlsx").unlink()
+        failures = []
+        summary = checksums.verify_delivery(
+            self.test_dir, workers=2, on_failure=lambda *args: failures.append(args)
+        )
+
+        self.assertEqual(summary.ok, 0)
+        self.assertEqual(summary.mismatched, ["030.調査/調査検討書_A.xlsx"])
+        self.assertEqual(summary.missing, ["030.調査/成果物/レビュー記録表_調査.xlsx"])
+        self.assertEqual(len(failures), 2)
+
+    def test_verify_rejects_non_positive_workers(self):
+        """
+        verify サブコマンドの --workers に1未満を指定すると、引数の誤りとして終了することを確認
+        """
+        for workers in ("0", "-1", "x"):
+            with self.subTest(workers=workers), patch(
+                "sys.stderr", new_callable=io.StringIO
+            ) as stderr, patch.object(checksums, "verify_delivery") as verify:
+                with self.assertRaises(SystemExit) as cm:
+                    main.verify_main([str(self.test_dir), "--workers", workers])
+                self.assertEqual(cm.exception.code, 2)
+                self.assertIn("--workers", stderr.getvalue())
+                verify.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+###############################################################
+#
+# config_cache (設定とマッチングルールのキャッシュ) と起動時間のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import config_cache
+import config_manager
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# --help・ドライラン・通常のコピー (索引・リンク・ZIP・ハッシュ・プロファイルなし) では
+# 読み込まないモジュール
+LAZY_MODULES = (
+    "multiprocessing",
+    "zipfile",
+    "gzip",
+    "sqlite3",
+    "cProfile",
+    "pstats",
+    "archive_writer",
+    "checksums",
+    "fanout",
+    "file_index",
+    "link_copy",
+    "skip_audit",
+    "watcher",
+)
+
+# main.py を実行し、終了時に読み込まれていたモジュールを標準エラー出力の最終行に出す
+_RUN_MAIN = """
+import json, runpy, sys
+sys.argv = ["main.py"] + sys.argv[1:]
+try:
+    runpy.run_path("main.py", run_name="__main__")
+except SystemExit:
+    pass
+sys.stderr.write("\\n" + json.dumps(sorted(sys.modules)) + "\\n")
+"""
+
+
+class TestConfigCache(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache_dir = self.test_dir / "cache"
+        self.src = self.test_dir / "teams"
+        (self.src / "030.調査").mkdir(parents=True)
+        (self.src / "030.調査" / "調査検討書_A.xlsx").write_text("A", encoding="utf-8")
+        self.config_path = self.test_dir / "config.ini"
+        self._write_config("調査検討書_ = 030.調査\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write_config(self, mappings: str):
+        self.config_path.write_text(
+            f"[General]\n"
+            f"teams_root_path = {self.src}\n"
+            f"delivery_root_path = {self.test_dir / 'delivery'}\n"
+            f"[Mappings]\n{mappings}",
+            encoding="utf-8",
+        )
+
+    def _load(self):
+        with patch.object(
+            config_manager, "load_config", wraps=config_manager.load_config
+        ) as load_config:
+            config, rules = config_cache.load(self.config_path, self.cache_dir)
+        return config, rules, load_config.called
+
+    def test_cache_is_used_until_config_changes(self):
+        """
+        2回目以降はキャッシュから読み込まれ、設定ファイルの内容が変わると (更新日時が同じでも) 読み込み直されることを確認
+        """
+        config, rules, parsed = self._load()
+        self.assertTrue(parsed)
+        self.assertEqual(config["mappings"], [("調査検討書_", "030.調査", False)])
+
+        cached_config, cached_rules, parsed = self._load()
+        self.assertFalse(parsed)
+        self.assertEqual(cached_config, config)
+        self.assertEqual(
+            cached_rules.match("030.調査", False, "調査検討書_B.xlsx").pattern,
+            "調査検討書_",
+        )
+
+        # 更新日時を戻しても、内容のハッシュが変わるので読み込み直す
+        stat = self.config_path.stat()
+        self._write_config("機能設計書_ = 030.調査\n")
+        os.utime(self.config_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        config, rules, parsed = self._load()
+        self.assertTrue(parsed)
+        self.assertIsNone(rules.match("030.調査", False, "調査検討書_B.xlsx"))
+        self.assertIsNotNone(rules.match("030.調査", False, "機能設計書_B.xlsx"))
+
+        # 壊れたキャッシュは使わずに作り直す
+        for cache_file in self.cache_dir.iterdir():
+            cache_file.write_bytes(b"broken")
+        with self.assertLogs(level="WARNING"):
+            _, _, parsed = self._load()
+        self.assertTrue(parsed)
+        self.assertFalse(self._load()[2])
+
+        # 設定の誤りはキャッシュを使う場合も同じ例外になる
+        self._write_config("調査検討書_ = 030.調査/成果物/その他\n")
+        with self.assertRaises(ValueError):
+            config_cache.load(self.config_path, self.cache_dir)
+
+    def _run_main(self, *args) -> dict:
+        completed = subprocess.run(
+            [sys.executable, "-c", _RUN_MAIN, *args],
+            cwd=REPO_ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            encoding="utf-8",
+        )
+        result = {"modules": json.loads(completed.stderr.strip().splitlines()[-1])}
+        result["stdout"] = completed.stdout
+        result["stderr"] = completed.stderr
+        return result
+
+    def _assert_not_loaded(self, result: dict, modules: tuple):
+        loaded = [module for module in modules if module in result["modules"]]
+        self.assertEqual(loaded, [], result["stderr"])
+
+    def test_cold_start(self):
+        """
+        --help・ドライラン・通常のコピーで、使わないモジュールを読み込んでいないことを確認
+        """
+        result = self._run_main("--help")
+        self.assertIn("--config_cache_dir", result["stdout"])
+        self._assert_not_loaded(
+            result, LAZY_MODULES + ("file_processor", "copy_executor")
+        )
+
+        args = ("-i", str(self.config_path), "--config_cache_dir", str(self.cache_dir))
+        first = self._run_main(*args, "--dry_run")
+        self.assertIn("コピー予定:1件", first["stdout"])
+        second = self._run_main(*args, "--dry_run")
+        self.assertIn("キャッシュから読み込みます", second["stderr"])
+        self.assertIn("コピー予定:1件", second["stdout"])
+        self._assert_not_loaded(second, LAZY_MODULES)
+
+        copied = self._run_main(*args)
+        self.assertIn("コピー:1件", copied["stdout"])
+        self._assert_not_loaded(copied, LAZY_MODULES)
+
+        # 索引を使う場合は sqlite3 と file_index を読み込む
+        indexed = self._run_main(
+            *args, "--dry_run", "--index", str(self.test_dir / "index.sqlite3")
+        )
+        self.assertIn("変更なし:1件", indexed["stdout"])
+        self.assertIn("file_index", indexed["modules"])
+
+
+if __name__ == "__main__":
+    unittest.main()
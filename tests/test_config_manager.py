@@ -0,0 +1,120 @@
+###############################################################
+#
+# config_manager.load_config のテスト ([Job:*] セクション)
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import config_manager
+
+
+class TestLoadJobs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.config_path = self.test_dir / "config.ini"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _load(self, text: str) -> dict:
+        self.config_path.write_text(text, encoding="utf-8")
+        return config_manager.load_config(self.config_path)
+
+    def test_single_job_from_general(self):
+        """
+        [Job:*]がない場合は[General]のパスで1ジョブになることを確認
+        """
+        config = self._load(
+            "[General]\nteams_root_path = /teams\ndelivery_root_path = /delivery\n"
+        )
+        self.assertEqual(
+            config["jobs"],
+            [
+                {
+                    "name": None,
+                    "teams_root_path": Path("/teams"),
+                    "delivery_root_path": Path("/delivery"),
+                }
+            ],
+        )
+        self.assertEqual(config["teams_root_path"], Path("/teams"))
+
+    def test_jobs_inherit_general_paths(self):
+        """
+        各ジョブで省略したパスは[General]の値を使うことを確認
+        """
+        config = self._load(
+            "[General]\ndelivery_root_path = /delivery\ncopy_workers = 8\n"
+            "[Job:マイグレ]\nteams_root_path = /teams/マイグレ\n"
+            "[Job:サンプル2]\nteams_root_path = /teams/サンプル2\n"
+            "delivery_root_path = /delivery2\n"
+        )
+        self.assertEqual(
+            [
+                (j["name"], j["teams_root_path"], j["delivery_root_path"])
+                for j in config["jobs"]
+            ],
+            [
+                ("マイグレ", Path("/teams/マイグレ"), Path("/delivery")),
+                ("サンプル2", Path("/teams/サンプル2"), Path("/delivery2")),
+            ],
+        )
+        self.assertEqual(config["copy_workers"], 8)
+
+    def test_job_missing_path(self):
+        """
+        ジョブにも[General]にもパスがない場合はエラーになることを確認
+        """
+        with self.assertRaisesRegex(
+            ValueError, r"\[Job:A\]セクションの必須項目'teams_root_path'"
+        ):
+            self._load("[General]\ndelivery_root_path = /delivery\n[Job:A]\n")
+
+    def test_general_missing_path_without_jobs(self):
+        with self.assertRaisesRegex(
+            ValueError, r"\[General\]セクションの必須項目'teams_root_path'"
+        ):
+            self._load("[General]\ndelivery_root_path = /delivery\n")
+
+    def test_invalid_job_name(self):
+        with self.assertRaisesRegex(ValueError, "ジョブ名が不正です"):
+            self._load(
+                "[General]\n[Job:a/b]\nteams_root_path = /t\ndelivery_root_path = /d\n"
+            )
+
+    def test_invalid_option_value(self):
+        with self.assertRaisesRegex(ValueError, "'stale_files'の値が不正です"):
+            self._load(
+                "[General]\nteams_root_path = /t\ndelivery_root_path = /d\nstale_files = remove\n"
+            )
+
+    def test_compression_section(self):
+        """
+        [Compression]の拡張子は小文字にそろえ、"*" を省略した場合は既定値を使うことを確認
+        """
+        base = "[General]\nteams_root_path = /t\ndelivery_root_path = /d\n"
+        config = self._load(base)
+        self.assertEqual(config["delivery_format"], "folder")
+        self.assertEqual(config["compression"], config_manager.DEFAULT_COMPRESSION)
+
+        config = self._load(
+            base + "delivery_format = zip\n[Compression]\n.XLSX = 0\n.txt = 9\n"
+        )
+        self.assertEqual(config["delivery_format"], "zip")
+        self.assertEqual(config["compression"], {".xlsx": 0, ".txt": 9, "*": 6})
+
+        with self.assertRaisesRegex(ValueError, "'.txt'の圧縮レベルが不正です"):
+            self._load(base + "[Compression]\n.txt = 10\n")
+        with self.assertRaisesRegex(ValueError, "拡張子'txt'が不正です"):
+            self._load(base + "[Compression]\ntxt = 1\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
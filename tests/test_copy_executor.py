@@ -0,0 +1,373 @@
+###############################################################
+#
+# copy_executor.CopyExecutor のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import errno
+import hashlib
+import io
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import copy_executor
+from copy_executor import CopyExecutor, CopyTask
+
+
+class TestCopyExecutor(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src_dir = self.test_dir / "src"
+        self.dst_dir = self.test_dir / "dst"
+        self.src_dir.mkdir()
+        self.dst_dir.mkdir()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _make_tasks(self, count: int) -> list:
+        tasks = []
+        for i in range(count):
+            src = self.src_dir / f"file_{i}.txt"
+            src.write_text(str(i))
+            tasks.append(CopyTask(str(src), str(self.dst_dir / src.name), 10))
+        return tasks
+
+    def test_results_are_reported_in_submit_order(self):
+        """
+        完了順が前後しても、結果がsubmit順に報告されることを確認
+        """
+        tasks = self._make_tasks(30)
+
+        def slow_copy(src, dst):
+            time.sleep(random.random() * 0.01)
+            return copy_executor.copy_file(src, dst)
+
+        reported = []
+        with CopyExecutor(
+            max_workers=8, copy_func=slow_copy, on_result=reported.append
+        ) as executor:
+            for task in tasks:
+                executor.submit(task)
+
+        self.assertEqual([r.task for r in reported], tasks)
+        self.assertEqual(executor.summary.copied, 30)
+        self.assertEqual(executor.summary.bytes_copied, 300)
+        self.assertTrue((self.dst_dir / "file_29.txt").is_file())
+
+    def test_failure_does_not_stop_other_copies(self):
+        """
+        1ファイルのコピーに失敗しても他のファイルのコピーが続くことを確認 (設計書5.2)
+        """
+        tasks = self._make_tasks(5)
+        tasks[2] = CopyTask(
+            str(self.src_dir / "存在しない.txt"), str(self.dst_dir / "x"), 0
+        )
+
+        reported = []
+        with CopyExecutor(max_workers=2, on_result=reported.append) as executor:
+            for task in tasks:
+                executor.submit(task)
+
+        statuses = [r.status for r in reported]
+        self.assertEqual(statuses.count(copy_executor.STATUS_FAILED), 1)
+        self.assertIsInstance(reported[2].error, OSError)
+        self.assertEqual(executor.summary.copied, 4)
+        self.assertEqual(executor.summary.failed, 1)
+
+    def test_existing_destination_is_overwritten(self):
+        """
+        コピー先に同名のファイルがある場合は上書きされることを確認 (設計書4.1)
+        """
+        tasks = self._make_tasks(1)
+        Path(tasks[0].dst).write_text("既存")
+
+        with CopyExecutor(on_result=lambda r: None) as executor:
+            executor.submit(tasks[0])
+
+        self.assertEqual(executor.summary.copied, 1)
+        self.assertEqual(Path(tasks[0].dst).read_text(), "0")
+
+    def test_skip_is_reported_in_order(self):
+        """
+        skip() したファイルもコピーせずに submit 順で報告されることを確認
+        """
+        tasks = self._make_tasks(3)
+
+        reported = []
+        with CopyExecutor(on_result=reported.append) as executor:
+            executor.submit(tasks[0])
+            executor.skip(tasks[1])
+            executor.submit(tasks[2])
+
+        self.assertEqual([r.task for r in reported], tasks)
+        self.assertEqual(reported[1].status, copy_executor.STATUS_SKIPPED)
+        self.assertFalse(Path(tasks[1].dst).exists())
+        self.assertEqual(executor.summary.skipped, 1)
+
+    def test_inflight_bytes_are_bounded(self):
+        """
+        コピー中の合計バイト数が上限を超えないことを確認
+        """
+        tasks = self._make_tasks(20)
+        lock = threading.Lock()
+        inflight = [0, 0]  # 現在値, 最大値
+
+        def tracking_copy(src, dst):
+            with lock:
+                inflight[0] += 10
+                inflight[1] = max(inflight[1], inflight[0])
+            time.sleep(0.005)
+            with lock:
+                inflight[0] -= 10
+            return None
+
+        with CopyExecutor(
+            max_workers=8,
+            max_inflight_bytes=30,
+            copy_func=tracking_copy,
+            on_result=lambda r: None,
+        ) as executor:
+            for task in tasks:
+                executor.submit(task)
+
+        self.assertLessEqual(inflight[1], 30)
+        self.assertEqual(executor.summary.copied, 20)
+
+    def test_serial_executor_on_shared_pool(self):
+        """
+        serial の場合、共有プールのスレッドで submit 順に1件ずつコピーされることを確認
+        """
+        tasks = self._make_tasks(10)
+        lock = threading.Lock()
+        running = [0, 0]  # 現在値, 最大値
+        order = []
+        threads = set()
+
+        def tracking_copy(src, dst):
+            with lock:
+                running[0] += 1
+                running[1] = max(running[1], running[0])
+            order.append(src)
+            threads.add(threading.current_thread().name)
+            time.sleep(random.random() * 0.005)
+            with lock:
+                running[0] -= 1
+            return None
+
+        with copy_executor.CopyPool(max_workers=4) as pool:
+            with CopyExecutor(
+                copy_func=tracking_copy,
+                on_result=lambda r: None,
+                pool=pool,
+                serial=True,
+            ) as executor:
+                for task in tasks:
+                    executor.submit(task)
+            self.assertTrue(threads <= {t.name for t in pool.threads._threads})
+
+        self.assertEqual(running[1], 1)
+        self.assertEqual(order, [task.src for task in tasks])
+        self.assertEqual(executor.summary.copied, 10)
+
+    def test_copy_with_hash_in_one_pass(self):
+        """
+        バッファより大きいファイルでも、コピー内容とSHA-256と更新日時が正しいことを確認
+        """
+        data = os.urandom(copy_executor.COPY_BUFFER_SIZE * 2 + 123)
+        src = self.src_dir / "large.bin"
+        src.write_bytes(data)
+        os.utime(src, (1_600_000_000, 1_600_000_000))
+        dst = self.dst_dir / "large.bin"
+
+        digest = copy_executor.copy_file_with_hash(str(src), str(dst))
+
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        self.assertEqual(dst.read_bytes(), data)
+        self.assertEqual(dst.stat().st_mtime, 1_600_000_000)
+        self.assertEqual(copy_executor.sha256_file(str(dst)), digest)
+
+    def _interrupted_copy(self, src: Path, dst: Path, chunks_before_failure: int):
+        """チェックポイントを chunks_before_failure 回記録した後に失敗するコピー"""
+
+        write_checkpoint = copy_executor._write_checkpoint
+        calls = []
+
+        def failing_checkpoint(*args):
+            if len(calls) == chunks_before_failure:
+                raise OSError("中断")
+            calls.append(args)
+            write_checkpoint(*args)
+
+        with patch("copy_executor._write_checkpoint", failing_checkpoint):
+            with self.assertRaises(OSError):
+                copy_executor.copy_file_resumable(str(src), str(dst))
+
+    @patch("copy_executor.RESUMABLE_CHUNK_SIZE", 1024)
+    @patch("copy_executor.RESUME_VERIFY_BYTES", 256)
+    def test_resumable_copy_continues_from_checkpoint(self):
+        """
+        中断したコピーが続きから再開され、既存のコピー先は完了まで置き換わらないことを確認
+        """
+        data = os.urandom(1024 * 5 + 7)
+        src = self.src_dir / "video.mp4"
+        src.write_bytes(data)
+        dst = self.dst_dir / "video.mp4"
+        dst.write_bytes(b"old")
+
+        self._interrupted_copy(src, dst, 3)
+        self.assertEqual(dst.read_bytes(), b"old")
+        part = Path(str(dst) + copy_executor.PART_SUFFIX)
+        self.assertEqual(part.read_bytes()[: 1024 * 3], data[: 1024 * 3])
+
+        # 再開後は、チェックポイントの位置からコピーする
+        offsets = []
+        copy_range = copy_executor._copy_range
+
+        def recording_copy_range(fsrc, fdst, offset, count, digest):
+            offsets.append(offset)
+            return copy_range(fsrc, fdst, offset, count, digest)
+
+        with patch("sys.stdout", new_callable=io.StringIO), patch(
+            "copy_executor._copy_range", recording_copy_range
+        ):
+            digest = copy_executor.copy_file_resumable(
+                str(src), str(dst), with_hash=True
+            )
+
+        self.assertEqual(offsets, [1024 * 3, 1024 * 4, 1024 * 5])
+        self.assertEqual(dst.read_bytes(), data)
+        self.assertEqual(digest, hashlib.sha256(data).hexdigest())
+        self.assertFalse(part.exists())
+        self.assertFalse(Path(str(dst) + copy_executor.CHECKPOINT_SUFFIX).exists())
+
+    @patch("copy_executor.RESUMABLE_CHUNK_SIZE", 1024)
+    def test_resumable_copy_restarts_when_source_changed(self):
+        """
+        中断後にコピー元が更新された場合や、書き込み済みの部分が一致しない場合は最初からコピーし直すことを確認
+        """
+        src = self.src_dir / "result.xlsx"
+        src.write_bytes(os.urandom(4096))
+        dst = self.dst_dir / "result.xlsx"
+        self._interrupted_copy(src, dst, 2)
+
+        data = os.urandom(4096)
+        src.write_bytes(data)
+        st = src.stat()
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        copy_executor.copy_file_resumable(str(src), str(dst))
+        self.assertEqual(dst.read_bytes(), data)
+
+        # 書き込み済みの部分が壊れている場合
+        self._interrupted_copy(src, dst, 2)
+        part = Path(str(dst) + copy_executor.PART_SUFFIX)
+        part.write_bytes(b"\0" * 2048)
+        with patch("copy_executor._kernel_copy", None), patch(
+            "sys.stdout", new_callable=io.StringIO
+        ):
+            copy_executor.copy_file_resumable(str(src), str(dst))
+        self.assertEqual(dst.read_bytes(), data)
+
+    @patch("copy_executor.RESUMABLE_CHUNK_SIZE", 1024)
+    def test_resumable_copy_ignores_malformed_checkpoint(self):
+        """
+        進捗の記録が JSON のオブジェクトでない場合や offset が整数でない場合は、
+        記録と .part を削除して最初からコピーすることを確認
+        """
+        data = os.urandom(4096)
+        src = self.src_dir / "result.xlsx"
+        src.write_bytes(data)
+        dst = self.dst_dir / "result.xlsx"
+        part = Path(str(dst) + copy_executor.PART_SUFFIX)
+        checkpoint = Path(str(dst) + copy_executor.CHECKPOINT_SUFFIX)
+        st = src.stat()
+
+        for content in (
+            "[1]",
+            '"text"',
+            '{"version": 1, "size": %d, "mtime_ns": %d, "offset": "1024"}'
+            % (st.st_size, st.st_mtime_ns),
+        ):
+            dst.unlink(missing_ok=True)
+            part.write_bytes(data[:2048])
+            checkpoint.write_text(content, encoding="utf-8")
+            with self.assertLogs(level="WARNING"):
+                offset = copy_executor._resume_offset(
+                    io.BytesIO(data), st, str(part), str(checkpoint)
+                )
+            self.assertEqual(offset, 0)
+            self.assertFalse(part.exists())
+            self.assertFalse(checkpoint.exists())
+
+            # コピー全体としても失敗せずに最初からコピーする
+            part.write_bytes(data[:2048])
+            checkpoint.write_text(content, encoding="utf-8")
+            with patch("sys.stdout", new_callable=io.StringIO):
+                copy_executor.copy_file_resumable(str(src), str(dst))
+            self.assertEqual(dst.read_bytes(), data)
+            self.assertFalse(checkpoint.exists())
+
+    @patch("copy_executor.RESUMABLE_CHUNK_SIZE", 1024)
+    def test_kernel_copy_fallback_is_per_device(self):
+        """
+        カーネル内でのコピーに失敗したデバイスの組み合わせだけが通常の読み書きに切り替わることを確認
+        """
+        calls = []
+
+        def unsupported_copy(src_fd, dst_fd, offset, count):
+            calls.append(offset)
+            raise OSError(errno.EXDEV, "cross-device")
+
+        data = os.urandom(4096)
+        src = self.src_dir / "result.xlsx"
+        src.write_bytes(data)
+        with patch("copy_executor._kernel_copy", unsupported_copy), patch(
+            "copy_executor._kernel_copy_fallbacks", {}
+        ) as fallbacks:
+            for name in ("a.xlsx", "b.xlsx"):
+                copy_executor.copy_file_resumable(str(src), str(self.dst_dir / name))
+                self.assertEqual((self.dst_dir / name).read_bytes(), data)
+
+            # 失敗したのは最初の1回だけで、以降はこの組み合わせでは試さない
+            self.assertEqual(calls, [0])
+            devices = (src.stat().st_dev, self.dst_dir.stat().st_dev)
+            self.assertEqual(fallbacks, {devices: None})
+            # 他のデバイスの組み合わせでは引き続き使う
+            self.assertIs(copy_executor._device_kernel_copy((-1, -1)), unsupported_copy)
+
+    def test_large_files_use_large_copy_func(self):
+        """
+        しきい値以上のファイルだけが large_copy_func でコピーされることを確認
+        """
+        tasks = self._make_tasks(2)
+        tasks[1] = tasks[1]._replace(size=100)
+        used = []
+
+        def large_copy(src, dst):
+            used.append(os.path.basename(src))
+            return copy_executor.copy_file(src, dst)
+
+        with CopyExecutor(
+            on_result=lambda result: None,
+            large_copy_func=large_copy,
+            large_file_threshold=50,
+        ) as executor:
+            for task in tasks:
+                executor.submit(task)
+
+        self.assertEqual(used, ["file_1.txt"])
+        self.assertEqual(executor.summary.copied, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+###############################################################
+#
+# copy_plan のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import unittest
+
+import copy_plan
+from copy_plan import PlanJob, PlanOp
+
+
+class TestCopyPlan(unittest.TestCase):
+    def _plan_text(self) -> str:
+        f = io.StringIO()
+        copy_plan.write_job(f, PlanJob("A", "/teams/a", "/out"))
+        counts = copy_plan.write_ops(
+            f,
+            [
+                PlanOp("copy", "030.調査/調査検討書_A.xlsx", "/teams/a/x", 5, 1),
+                PlanOp("skip", "030.調査/成果物/記録.xlsx", "/teams/a/y", 6, 2),
+            ],
+        )
+        self.assertEqual(counts, {"copy": 1, "skip": 1, "stale": 0})
+        copy_plan.write_job(f, PlanJob(None, "/teams/b", "/out"))
+        copy_plan.write_ops(
+            f, [PlanOp("stale", "040.設計/旧.xlsx", "/teams/b/z", 0, 0)]
+        )
+        return f.getvalue()
+
+    def test_roundtrip_by_job(self):
+        """
+        ジョブごとに書き出した計画が、そのままの内容で読み込めることを確認
+        """
+        jobs = [
+            (job, list(ops))
+            for job, ops in copy_plan.read_plan(io.StringIO(self._plan_text()))
+        ]
+
+        self.assertEqual(
+            [job for job, _ in jobs],
+            [PlanJob("A", "/teams/a", "/out"), PlanJob(None, "/teams/b", "/out")],
+        )
+        self.assertEqual([len(ops) for _, ops in jobs], [2, 1])
+        self.assertTrue(jobs[0][1][0].is_top_level)
+        self.assertFalse(jobs[0][1][1].is_top_level)
+
+    def test_unread_ops_are_skipped(self):
+        """
+        ジョブの操作を読み残しても、次のジョブの見出しから読めることを確認
+        """
+        names = [
+            job.name for job, _ in copy_plan.read_plan(io.StringIO(self._plan_text()))
+        ]
+        self.assertEqual(names, ["A", None])
+
+    def test_invalid_header(self):
+        with self.assertRaises(ValueError):
+            list(copy_plan.read_plan(io.StringIO('{"plan_version": 99, "job": {}}\n')))
+
+
+if __name__ == "__main__":
+    unittest.main()
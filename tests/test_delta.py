@@ -0,0 +1,160 @@
+###############################################################
+#
+# delta (納品物の差分) のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import delta
+import manifest
+
+
+class TestDelta(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.old = self.test_dir / "2026Q1"
+        self.new = self.test_dir / "2026Q2"
+        self._write(self.old, "030.調査/調査検討書_A.xlsx", "A")
+        self._write(self.old, "030.調査/調査検討書_B.xlsx", "B", mtime=1)
+        self._write(self.old, "030.調査/成果物/レビュー記録表_調査_1.xlsx", "review")
+        self._write(self.old, "040.設計/機能設計書_old.xlsx", "design")
+        self._write(self.old, "040.設計/機能設計書_削除.xlsx", "gone")
+        self._write(self.new, "030.調査/調査検討書_A.xlsx", "A")
+        self._write(self.new, "030.調査/調査検討書_B.xlsx", "B", mtime=2)
+        self._write(self.new, "030.調査/成果物/レビュー記録表_調査_1.xlsx", "review2")
+        self._write(self.new, "040.設計/機能設計書_new.xlsx", "design")
+        self._write(self.new, "040.設計/成果物/レビュー記録表_設計_1.xlsx", "added")
+        # 納品物として扱わないファイル
+        self._write(self.new, manifest.MANIFEST_FILE_NAME, "{}")
+        self._write(self.new, "SHA256SUMS", "")
+        self._write(self.new, "040.設計/大きな資料.pdf.part", "partial")
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, root: Path, rel_path: str, text: str, mtime: int = 0):
+        path = root / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        os.utime(path, ns=(0, 1_700_000_000_000_000_000 + mtime))
+
+    def _save_manifest(self, root: Path, with_hash: bool) -> Path:
+        # 納品先ルートを走査した結果を、納品時と同じ形式のマニフェストとして保存する
+        snapshot = delta.read_snapshot(root)
+        entries = {}
+        for entry in snapshot:
+            sha256 = None
+            if with_hash:
+                sha256 = delta._digest(entry, {})
+            entries[entry.path] = manifest.ManifestEntry(
+                entry.path, entry.file_path, entry.size, entry.mtime_ns, sha256
+            )
+        path = self.test_dir / f"{root.name}.jsonl"
+        manifest.Manifest(path, entries).save()
+        return path
+
+    def _kinds(self, result: delta.DeltaResult) -> dict:
+        return {
+            "added": [e.path for e in result.added],
+            "removed": [e.path for e in result.removed],
+            "modified": [n.path for _, n in result.modified],
+            "renamed": [(o.path, n.path) for o, n in result.renamed],
+            "unchanged": result.unchanged,
+        }
+
+    def test_compare_delivery_roots(self):
+        """
+        納品先ルート同士を比較し、追加・削除・変更・名前変更が検出されることを確認
+        """
+        result = delta.compare(
+            delta.read_snapshot(self.old), delta.read_snapshot(self.new)
+        )
+        self.assertEqual(
+            self._kinds(result),
+            {
+                "added": ["040.設計/成果物/レビュー記録表_設計_1.xlsx"],
+                "removed": ["040.設計/機能設計書_削除.xlsx"],
+                "modified": [
+                    "030.調査/成果物/レビュー記録表_調査_1.xlsx",
+                    "030.調査/調査検討書_B.xlsx",
+                ],
+                "renamed": [
+                    ("040.設計/機能設計書_old.xlsx", "040.設計/機能設計書_new.xlsx")
+                ],
+                "unchanged": 1,
+            },
+        )
+
+        # 内容で比較すると、更新日時だけが変わったファイルは変更なし
+        result = delta.compare(
+            delta.read_snapshot(self.old), delta.read_snapshot(self.new), True
+        )
+        self.assertEqual(
+            [n.path for _, n in result.modified],
+            ["030.調査/成果物/レビュー記録表_調査_1.xlsx"],
+        )
+        self.assertEqual(result.unchanged, 2)
+
+        out = io.StringIO()
+        delta.write_text(result, out)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "M 030.調査/成果物/レビュー記録表_調査_1.xlsx",
+                "A 040.設計/成果物/レビュー記録表_設計_1.xlsx",
+                "R 040.設計/機能設計書_old.xlsx -> 040.設計/機能設計書_new.xlsx",
+                "D 040.設計/機能設計書_削除.xlsx",
+                "追加:1件 削除:1件 変更:1件 名前変更:1件 変更なし:2件",
+            ],
+        )
+
+    def test_compare_manifest_with_delivery_root(self):
+        """
+        マニフェストと納品先ルートを比較でき、JSONで出力できることを確認
+        """
+        old_manifest = self._save_manifest(self.old, with_hash=True)
+        result = delta.compare(
+            delta.read_snapshot(old_manifest), delta.read_snapshot(self.new)
+        )
+        self.assertEqual(len(result.renamed), 1)
+        self.assertEqual(len(result.modified), 2)
+
+        # マニフェストにハッシュがない場合、名前の変更は検出できない
+        old_manifest = self._save_manifest(self.old, with_hash=False)
+        new_manifest = self._save_manifest(self.new, with_hash=False)
+        result = delta.compare(
+            delta.read_snapshot(old_manifest), delta.read_snapshot(new_manifest)
+        )
+        self.assertEqual(result.renamed, [])
+        self.assertEqual(len(result.added), 2)
+
+        json_path = self.test_dir / "delta.json"
+        delta.write_json(result, json_path, str(old_manifest), str(new_manifest))
+        report = json.loads(json_path.read_text(encoding="utf-8"))
+        self.assertEqual(
+            report["summary"],
+            {"added": 2, "removed": 2, "modified": 2, "renamed": 0, "unchanged": 1},
+        )
+        self.assertEqual(report["removed"][0]["path"], "040.設計/機能設計書_old.xlsx")
+
+    def test_unsorted_input_is_rejected(self):
+        """
+        相対パスの順に並んでいない入力はエラーになることを確認
+        """
+        entries = [delta.SnapshotEntry("b", 1, 0), delta.SnapshotEntry("a", 1, 0)]
+        with self.assertRaises(ValueError):
+            delta.compare(entries, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
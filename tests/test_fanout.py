@@ -0,0 +1,128 @@
+###############################################################
+#
+# fanout (複数プロジェクトの並行納品) のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import fanout
+
+
+class TestFanout(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.config_dir = self.test_dir / "projects"
+        self.config_dir.mkdir()
+        self.log_dir = self.test_dir / "logs"
+        for name in ("A", "B"):
+            src = self.test_dir / "teams" / name
+            (src / "030.調査").mkdir(parents=True)
+            (src / "030.調査" / f"調査検討書_{name}.xlsx").write_text(
+                name, encoding="utf-8"
+            )
+            self._write_config(
+                name,
+                f"[General]\n"
+                f"teams_root_path = {src}\n"
+                f"delivery_root_path = {self.test_dir / 'delivery' / name}\n",
+            )
+        self._stdout_patcher = patch("sys.stdout", new_callable=io.StringIO)
+        self.mock_stdout = self._stdout_patcher.start()
+
+    def tearDown(self):
+        self._stdout_patcher.stop()
+        shutil.rmtree(self.test_dir)
+
+    def _write_config(self, name: str, text: str) -> Path:
+        path = self.config_dir / f"{name}.ini"
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def test_projects_on_same_device_run_one_at_a_time(self):
+        """
+        各プロジェクトが納品され、ログが分かれ、同じデバイスのプロジェクトは重ならずに実行されることを確認
+        """
+        config_paths = fanout.find_config_files(self.config_dir)
+        self.assertEqual([p.name for p in config_paths], ["A.ini", "B.ini"])
+
+        results = fanout.run_projects(config_paths, self.log_dir, 2, 1)
+
+        self.assertEqual([r.name for r in results], ["A", "B"])
+        for name, result in zip(("A", "B"), results):
+            self.assertFalse(result.failed)
+            self.assertEqual(result.jobs[0].summary.copied, 1)
+            self.assertTrue(
+                (
+                    self.test_dir
+                    / "delivery"
+                    / name
+                    / "030.調査"
+                    / f"調査検討書_{name}.xlsx"
+                ).is_file()
+            )
+            log = Path(result.log_path).read_text(encoding="utf-8")
+            self.assertIn(f"iniファイル: {config_paths[0].parent / name}.ini", log)
+            self.assertIn(f"調査検討書_{name}.xlsx", log)
+            self.assertNotIn(f"調査検討書_{'B' if name == 'A' else 'A'}.xlsx", log)
+
+        # すべて同じデバイス (一時ディレクトリ) のため、2つ目は1つ目の終了後に始まる
+        first, second = sorted(results, key=lambda r: r.started_at)
+        self.assertGreaterEqual(second.started_at, first.started_at + first.elapsed)
+
+        self.assertEqual(fanout.print_report(results, 1.0), 0)
+        self.assertIn("合計 2プロジェクト コピー:2件", self.mock_stdout.getvalue())
+
+    def test_invalid_config_is_reported_as_failure(self):
+        """
+        読み込めない設定ファイルは失敗として報告され、他のプロジェクトは納品されることを確認
+        """
+        self._write_config("C", "[General]\nteams_root_path = /nonexistent\n")
+        config_paths = fanout.find_config_files(str(self.config_dir / "*.ini"))
+
+        results = fanout.run_projects(config_paths, self.log_dir, 2, 2)
+
+        self.assertEqual([r.failed for r in results], [False, False, True])
+        self.assertIsNotNone(results[2].error)
+        self.assertEqual(fanout.print_report(results, 1.0), 1)
+
+        report_path = self.test_dir / "report.json"
+        fanout.write_report(results, 1.0, report_path)
+        report = json.loads(report_path.read_text(encoding="utf-8"))
+        self.assertEqual(
+            [p["status"] for p in report["projects"]], ["ok", "ok", "failed"]
+        )
+        self.assertEqual(report["projects"][0]["copied"], 1)
+
+    def test_project_names_are_unique(self):
+        """
+        設定ファイル名が重複する場合に、重複しなくなるまで親フォルダ名や連番を付けることを確認
+        """
+        base = self.test_dir / "p"
+        paths = [
+            base / "a" / "x.ini",
+            base / "c" / "a" / "x.ini",
+            base / "b" / "y.ini",
+            base / "z.ini",
+            base / "z.ini",
+        ]
+        self.assertEqual(
+            fanout._project_names(paths),
+            ["p_a_x", "c_a_x", "y", "z", "z_2"],
+        )
+
+        with self.assertRaises(ValueError):
+            fanout.run_projects(paths, self.log_dir, 2, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,156 @@
+###############################################################
+#
+# file_index.FileIndex のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import walker
+from file_index import FileIndex
+from rule_engine import fold_name_width
+
+PHASES = {"030.調査", "040.設計"}
+
+
+class TestFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+
+        (self.src / "030.調査" / "成果物" / "内部").mkdir(parents=True)
+        (self.src / "030.調査" / "作業中").mkdir()
+        (self.src / "アーカイブ").mkdir()
+        (self.src / "030.調査" / "調査検討書_A.xlsx").write_text("a")
+        (self.src / "030.調査" / "成果物" / "内部" / "レビュー記録表_調査.xlsx").touch()
+        (self.src / "030.調査" / "作業中" / "下書き.xlsx").touch()
+        (self.src / "アーカイブ" / "調査検討書_旧.xlsx").touch()
+
+        self.index = FileIndex(self.test_dir / "index.sqlite3")
+
+    def tearDown(self):
+        self.index.close()
+        shutil.rmtree(self.test_dir)
+
+    def _touch_dir(self, path: Path):
+        """ディレクトリの更新日時を確実に変える (ファイルシステムの時刻精度に依存しないため)"""
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def _indexed(self) -> list:
+        return sorted(
+            (r.phase, r.is_artifact, r.entry.name) for r in self.index.records(self.src)
+        )
+
+    def test_records_match_walker(self):
+        """
+        索引の内容が walker.walk_phase_tree の結果と一致することを確認
+        """
+        stats = self.index.refresh(self.src, PHASES)
+        self.assertTrue(stats.full_scan)
+
+        walked = sorted(
+            (r.phase, r.is_artifact, r.entry.name)
+            for r in walker.walk_phase_tree(self.src, PHASES)
+        )
+        self.assertEqual(self._indexed(), walked)
+
+        record = next(self.index.records(self.src))
+        self.assertEqual(
+            record.entry.stat().st_size, Path(record.entry.path).stat().st_size
+        )
+
+    def test_revalidate_rescans_only_changed_dirs(self):
+        """
+        2回目以降は更新日時が変わったディレクトリだけが読み直されることを確認
+        """
+        self.index.refresh(self.src, PHASES)
+
+        stats = self.index.refresh(self.src, PHASES)
+        self.assertFalse(stats.full_scan)
+        self.assertEqual(stats.dirs_rescanned, 0)
+
+        # ファイル追加
+        artifact_dir = self.src / "030.調査" / "成果物"
+        (artifact_dir / "030_レビューチェックリスト_1.xlsx").touch()
+        self._touch_dir(artifact_dir)
+        # 新しいフェーズフォルダ
+        (self.src / "040.設計" / "成果物").mkdir(parents=True)
+        (self.src / "040.設計" / "成果物" / "レビュー記録表_設計.xlsx").touch()
+        self._touch_dir(self.src)
+
+        stats = self.index.refresh(self.src, PHASES)
+        # ルート, 030.調査/成果物, 新規の 040.設計 と 040.設計/成果物
+        self.assertEqual(stats.dirs_rescanned, 4)
+        self.assertIn(
+            ("030.調査", True, "030_レビューチェックリスト_1.xlsx"), self._indexed()
+        )
+        self.assertIn(("040.設計", True, "レビュー記録表_設計.xlsx"), self._indexed())
+
+    def test_removed_directory_is_dropped(self):
+        """
+        削除されたディレクトリ配下の記録が消えることを確認
+        """
+        self.index.refresh(self.src, PHASES)
+
+        shutil.rmtree(self.src / "030.調査" / "成果物")
+        self._touch_dir(self.src / "030.調査")
+        self.index.refresh(self.src, PHASES)
+
+        self.assertEqual(self._indexed(), [("030.調査", False, "調査検討書_A.xlsx")])
+
+    def test_query_pattern(self):
+        """
+        ワイルドカードパターンで大文字小文字を区別せずに検索できることを確認
+        """
+        (self.src / "030.調査" / "成果物" / "Review_[1].XLSX").touch()
+        self.index.refresh(self.src, PHASES)
+
+        rows = self.index.query("レビュー記録表_*")
+        self.assertEqual([r.name for r in rows], ["レビュー記録表_調査.xlsx"])
+        self.assertEqual(
+            [r.name for r in self.index.query("review_[1].xlsx")], ["Review_[1].XLSX"]
+        )
+        self.assertEqual(len(self.index.query("*.xlsx", self.src)), 3)
+        self.assertEqual(self.index.query("調査検討書_旧*"), [])
+
+    def test_phase_change_triggers_full_scan(self):
+        """
+        フェーズ構成が変わった場合は全体を走査し直すことを確認
+        """
+        self.index.refresh(self.src, PHASES)
+        stats = self.index.refresh(self.src, {"030.調査"})
+        self.assertTrue(stats.full_scan)
+
+    def test_fold_width_is_applied_and_recorded(self):
+        """
+        索引のファイル名の正規化が設定 (fold_width) に従い、設定が変わると作り直されることを確認
+        """
+        (self.src / "030.調査" / "ＡＢＣ_資料.xlsx").touch()
+        self.index.refresh(self.src, PHASES)
+        self.assertEqual(self.index.query("abc_*"), [])
+        self.index.close()
+
+        self.index = FileIndex(self.test_dir / "index.sqlite3", fold_name_width)
+        self.assertEqual(
+            [r.name for r in self.index.query("abc_*")], ["ＡＢＣ_資料.xlsx"]
+        )
+        folded = {r.entry.name: r.folded_name for r in self.index.records(self.src)}
+        self.assertEqual(folded["ＡＢＣ_資料.xlsx"], "abc_資料.xlsx")
+        self.index.close()
+
+        # 既定の正規化に戻すと、全角のままの名前に戻る
+        self.index = FileIndex(self.test_dir / "index.sqlite3")
+        self.assertEqual(self.index.query("abc_*"), [])
+        self.assertEqual(len(self.index.query("ａｂｃ_*")), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,545 @@
+###############################################################
+#
+# file_processor.process_files のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import threading
+import unicodedata
+import unittest
+import zipfile
+from pathlib import Path
+from unittest.mock import patch
+
+import checksums
+import config_manager
+import copy_executor
+import file_processor
+import manifest
+import metrics
+import walker
+
+
+class TestProcessFiles(unittest.TestCase):
+    """
+    一時ディレクトリにダミーのTeamsツリーを作成し、納品先へのコピー結果を確認する
+    """
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+        self.dst = self.test_dir / "delivery"
+
+        (self.src / "030.調査" / "成果物" / "内部").mkdir(parents=True)
+        (self.src / "030.調査" / "作業中").mkdir()
+        (self.src / "アーカイブ" / "030.調査").mkdir(parents=True)
+        self._write("030.調査/調査検討書_A.xlsx", "top")
+        self._write("030.調査/成果物/内部/レビュー記録表_調査_1.xlsx", "review")
+        self._write("030.調査/作業中/調査検討書_下書き.xlsx", "draft")
+        self._write("030.調査/メモ.txt", "memo")
+        self._write("アーカイブ/030.調査/調査検討書_旧.xlsx", "old")
+
+        self.config = {
+            "teams_root_path": self.src,
+            "delivery_root_path": self.dst,
+            "mappings": config_manager.DEFAULT_MAPPINGS,
+        }
+
+        self._stdout_patcher = patch("sys.stdout", new_callable=io.StringIO)
+        self.mock_stdout = self._stdout_patcher.start()
+
+    def tearDown(self):
+        self._stdout_patcher.stop()
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, rel_path: str, text: str):
+        path = self.src / rel_path
+        path.write_text(text, encoding="utf-8")
+        return path
+
+    def _delivered(self) -> list:
+        return sorted(
+            p.relative_to(self.dst).as_posix()
+            for p in self.dst.rglob("*")
+            if p.is_file() and p.name != manifest.MANIFEST_FILE_NAME
+        )
+
+    def test_copies_matching_files_into_delivery_layout(self):
+        """
+        フェーズ直下と成果物配下 (フラット化) のファイルだけがコピーされることを確認
+        """
+        summary = file_processor.process_files(self.config)
+
+        self.assertEqual(
+            self._delivered(),
+            [
+                "030.調査/成果物/レビュー記録表_調査_1.xlsx",
+                "030.調査/調査検討書_A.xlsx",
+            ],
+        )
+        self.assertEqual(summary.copied, 2)
+        self.assertEqual(summary.failed, 0)
+
+    def test_rerun_copies_only_changed_files(self):
+        """
+        再実行時は変更のあったファイルだけがコピー (上書き) されることを確認
+        """
+        file_processor.process_files(self.config)
+
+        summary = file_processor.process_files(self.config)
+        self.assertEqual((summary.copied, summary.skipped), (0, 2))
+
+        # コピー元を更新すると、コピー先も上書きされる
+        src = self._write("030.調査/調査検討書_A.xlsx", "updated")
+        st = src.stat()
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        summary = file_processor.process_files(self.config)
+
+        self.assertEqual((summary.copied, summary.skipped), (1, 1))
+        self.assertEqual(
+            (self.dst / "030.調査" / "調査検討書_A.xlsx").read_text(encoding="utf-8"),
+            "updated",
+        )
+
+    def test_existing_unmanaged_file_is_overwritten(self):
+        """
+        マニフェストにない既存ファイルは上書きされることを確認
+        """
+        (self.dst / "030.調査").mkdir(parents=True)
+        (self.dst / "030.調査" / "調査検討書_A.xlsx").write_text("古い内容")
+
+        file_processor.process_files(self.config)
+
+        self.assertEqual(
+            (self.dst / "030.調査" / "調査検討書_A.xlsx").read_text(encoding="utf-8"),
+            "top",
+        )
+
+    def test_stale_files_are_reported_or_deleted(self):
+        """
+        コピー元から消えたファイルは、既定では表示のみ、deleteでは削除されることを確認
+        """
+        file_processor.process_files(self.config)
+        (self.src / "030.調査" / "調査検討書_A.xlsx").unlink()
+
+        summary = file_processor.process_files(self.config)
+        self.assertEqual(summary.stale, 1)
+        self.assertIn(
+            "コピー元に存在しない納品済みファイル", self.mock_stdout.getvalue()
+        )
+        self.assertTrue((self.dst / "030.調査" / "調査検討書_A.xlsx").exists())
+
+        summary = file_processor.process_files(dict(self.config, stale_files="delete"))
+        self.assertEqual(summary.stale, 1)
+        self.assertFalse((self.dst / "030.調査" / "調査検討書_A.xlsx").exists())
+
+        summary = file_processor.process_files(self.config)
+        self.assertEqual(summary.stale, 0)
+
+    def test_manifest_records_hash(self):
+        """
+        hash_files有効時、マニフェストに内容のSHA-256が記録されることを確認
+        """
+        file_processor.process_files(dict(self.config, hash_files=True))
+
+        entries = manifest.Manifest.for_delivery_root(self.dst).entries
+        entry = entries["030.調査/調査検討書_A.xlsx"]
+        self.assertEqual(entry.size, 3)
+        self.assertEqual(entry.sha256, hashlib.sha256(b"top").hexdigest())
+
+    def test_checksum_file_is_written(self):
+        """
+        hash_files有効時は SHA256SUMS が出力され、後から有効にした場合は記録のないファイルをコピーし直すことを確認
+        """
+        config = dict(
+            self.config,
+            jobs=[
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        )
+        file_processor.process_jobs(config)
+        self.assertFalse((self.dst / checksums.CHECKSUM_FILE_NAME).exists())
+
+        results = file_processor.process_jobs(dict(config, hash_files=True))
+        self.assertEqual(results[0].summary.copied, 2)
+        self.assertEqual(checksums.verify_delivery(self.dst, workers=1).ok, 2)
+
+        results = file_processor.process_jobs(dict(config, hash_files=True))
+        self.assertEqual(results[0].summary.skipped, 2)
+
+    def test_zip_delivery_has_same_entries_as_folder(self):
+        """
+        ZIP形式の納品は、フォルダでの納品と同じエントリになり、Officeファイルは無圧縮で格納されることを確認
+        """
+        self._write("030.調査/調査検討書_メモ.txt", "text " * 100)
+        file_processor.process_files(self.config)
+
+        summary = file_processor.process_files(
+            dict(
+                self.config,
+                delivery_format="zip",
+                compression=config_manager.DEFAULT_COMPRESSION,
+            )
+        )
+        self.assertEqual(summary.copied, 3)
+
+        archive_path = self.test_dir / "delivery.zip"
+        with zipfile.ZipFile(archive_path) as zf:
+            files = sorted(name for name in zf.namelist() if not name.endswith("/"))
+            self.assertEqual(files, self._delivered())
+            self.assertEqual(
+                sorted(name for name in zf.namelist() if name.endswith("/")),
+                ["030.調査/", "030.調査/成果物/"],
+            )
+            infos = {info.filename: info for info in zf.infolist()}
+            self.assertEqual(
+                infos["030.調査/調査検討書_A.xlsx"].compress_type, zipfile.ZIP_STORED
+            )
+            self.assertEqual(
+                infos["030.調査/調査検討書_メモ.txt"].compress_type,
+                zipfile.ZIP_DEFLATED,
+            )
+            self.assertEqual(zf.read("030.調査/調査検討書_A.xlsx"), b"top")
+
+    def test_zip_delivery_uses_shared_pool(self):
+        """
+        ZIP形式の納品も共有プールで書き込まれ、ツリーにはZIPファイルのパスが出力されることを確認
+        """
+        config = dict(
+            self.config,
+            delivery_format="zip",
+            compression=config_manager.DEFAULT_COMPRESSION,
+            jobs=[
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        )
+        pool = copy_executor.CopyPool(2)
+        with pool, patch.object(
+            pool.threads, "submit", wraps=pool.threads.submit
+        ) as submit:
+            summary = file_processor.process_files(
+                dict(config, job_name=None), pool=pool
+            )
+        self.assertEqual(summary.copied, 2)
+        self.assertEqual(submit.call_count, 2)
+
+        results = file_processor.process_jobs(config)
+        output = self.test_dir / "tree.txt"
+        file_processor.generate_tree_output(results, output)
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines[0], str(self.test_dir / "delivery.zip"))
+        self.assertIn("    │  調査検討書_A.xlsx", lines)
+
+    def test_process_jobs_in_one_run(self):
+        """
+        複数ジョブが1回の実行で処理され、同じ納品先でも互いを不要ファイルと誤認しないことを確認
+        """
+        src2 = self.test_dir / "teams2"
+        (src2 / "040.設計").mkdir(parents=True)
+        (src2 / "040.設計" / "機能設計書_B.docx").write_text("design")
+
+        config = dict(
+            self.config,
+            jobs=[
+                {
+                    "name": "A",
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                },
+                {"name": "B", "teams_root_path": src2, "delivery_root_path": self.dst},
+                {
+                    "name": "C",
+                    "teams_root_path": self.test_dir / "存在しない",
+                    "delivery_root_path": self.dst,
+                },
+            ],
+        )
+
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.name for r in results], ["A", "B", "C"])
+        self.assertEqual([r.summary.copied for r in results], [2, 1, 0])
+        self.assertIn("040.設計/機能設計書_B.docx", self._delivered())
+
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.summary.stale for r in results], [0, 0, 0])
+        self.assertEqual([r.summary.skipped for r in results], [2, 1, 0])
+
+    def test_jobs_sharing_delivery_root(self):
+        """
+        同じ納品先の同名ファイルは先のジョブのものが納品され、他のジョブが納品するファイルは
+        不要ファイルとして削除されないことを確認
+        """
+        src2 = self.test_dir / "teams2"
+        (src2 / "030.調査").mkdir(parents=True)
+        (src2 / "040.設計").mkdir()
+        (src2 / "030.調査" / "調査検討書_A.xlsx").write_text("B", encoding="utf-8")
+        (src2 / "040.設計" / "機能設計書_B.docx").write_text("design")
+        config = dict(
+            self.config,
+            stale_files="delete",
+            jobs=[
+                {
+                    "name": "A",
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                },
+                {"name": "B", "teams_root_path": src2, "delivery_root_path": self.dst},
+            ],
+        )
+        shared_file = self.dst / "030.調査" / "調査検討書_A.xlsx"
+
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.summary.copied for r in results], [2, 1])
+        self.assertEqual(shared_file.read_text(encoding="utf-8"), "top")
+
+        # 先のジョブのファイルがなくなると、削除せずに後のジョブのファイルを納品する
+        (self.src / "030.調査" / "調査検討書_A.xlsx").unlink()
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.summary.stale for r in results], [0, 0])
+        self.assertEqual(shared_file.read_text(encoding="utf-8"), "B")
+
+        # 先のジョブのファイルが戻ると、先のジョブのものに置き換わる
+        self._write("030.調査/調査検討書_A.xlsx", "top2")
+        results = file_processor.process_jobs(config)
+        self.assertEqual(shared_file.read_text(encoding="utf-8"), "top2")
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.summary.copied for r in results], [0, 0])
+        self.assertEqual([r.summary.stale for r in results], [0, 0])
+        self.assertEqual([r.summary.skipped for r in results], [2, 1])
+        trees = file_processor._delivered_by_root(results)
+        self.assertEqual(
+            trees[str(self.dst)]["030.調査/調査検討書_A.xlsx"].src,
+            str(self.src / "030.調査" / "調査検討書_A.xlsx"),
+        )
+
+        # どのジョブも納品しなくなったファイルは削除される
+        (src2 / "040.設計" / "機能設計書_B.docx").unlink()
+        results = file_processor.process_jobs(config)
+        self.assertEqual([r.summary.stale for r in results], [0, 1])
+        self.assertNotIn("040.設計/機能設計書_B.docx", self._delivered())
+
+    def test_jobs_sharing_delivery_root_run_concurrently(self):
+        """
+        同じ納品先に納品するジョブも、走査は同時に進むことを確認
+        """
+        src2 = self.test_dir / "teams2"
+        (src2 / "040.設計").mkdir(parents=True)
+        (src2 / "040.設計" / "機能設計書_B.docx").write_text("design")
+        config = dict(
+            self.config,
+            jobs=[
+                {
+                    "name": "A",
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                },
+                {"name": "B", "teams_root_path": src2, "delivery_root_path": self.dst},
+            ],
+        )
+
+        # 両方のジョブが走査を始めるまで、どちらのジョブも先に進めない
+        barrier = threading.Barrier(2, timeout=5)
+        walk_phase_tree = walker.walk_phase_tree
+
+        def walk(*args, **kwargs):
+            barrier.wait()
+            return walk_phase_tree(*args, **kwargs)
+
+        with patch("walker.walk_phase_tree", side_effect=walk):
+            results = file_processor.process_jobs(config)
+        self.assertEqual([r.error for r in results], [None, None])
+        self.assertEqual([r.summary.copied for r in results], [2, 1])
+
+    def test_generate_tree_output(self):
+        """
+        納品済みファイルの記録からツリーが出力され、出力失敗でも例外にならないことを確認
+        """
+        config = dict(
+            self.config,
+            jobs=[
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        )
+        results = file_processor.process_jobs(config)
+
+        output = self.test_dir / "tree.txt"
+        file_processor.generate_tree_output(results, output)
+        lines = output.read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines[0], str(self.dst))
+        self.assertIn("    │  調査検討書_A.xlsx", lines)
+
+        file_processor.generate_tree_output(
+            results, self.test_dir / "なし" / "tree.txt"
+        )
+        self.assertIn("ツリーを出力できませんでした", self.mock_stdout.getvalue())
+
+    def test_plan_delivery_does_not_touch_delivery_root(self):
+        """
+        計画の作成だけではコピーもディレクトリの作成も行われないことを確認
+        """
+        ops = list(file_processor.plan_delivery(self.config))
+
+        self.assertEqual(
+            sorted((op.action, op.path) for op in ops),
+            [
+                ("copy", "030.調査/成果物/レビュー記録表_調査_1.xlsx"),
+                ("copy", "030.調査/調査検討書_A.xlsx"),
+            ],
+        )
+        self.assertFalse(self.dst.exists())
+
+    def test_saved_plan_is_replayed_without_walking(self):
+        """
+        ドライランで保存した計画を、コピー元を走査せずに後から実行できることを確認
+        """
+        config = dict(
+            self.config,
+            jobs=[
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        )
+        plan_path = self.test_dir / "plan.jsonl"
+        results = file_processor.plan_jobs(config, output_file_path=plan_path)
+        self.assertEqual(results[0].summary.copied, 2)
+        self.assertFalse(self.dst.exists())
+
+        with patch("walker.walk_phase_tree") as walk:
+            results = file_processor.replay_plan(config, plan_path)
+        walk.assert_not_called()
+        self.assertEqual(results[0].summary.copied, 2)
+        self.assertEqual(
+            self._delivered(),
+            [
+                "030.調査/成果物/レビュー記録表_調査_1.xlsx",
+                "030.調査/調査検討書_A.xlsx",
+            ],
+        )
+
+        # 実行後の計画では、すべて変更なしになる
+        results = file_processor.plan_jobs(config)
+        self.assertEqual(
+            (results[0].summary.copied, results[0].summary.skipped), (0, 2)
+        )
+
+    def test_replaying_plan_twice_does_not_count_missing_files(self):
+        """
+        計画を2回実行しても、既に削除された不要ファイルは削除済みとして数えないことを確認
+        """
+        config = dict(
+            self.config,
+            stale_files="delete",
+            jobs=[
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        )
+        file_processor.process_jobs(config)
+        (self.src / "030.調査" / "調査検討書_A.xlsx").unlink()
+        plan_path = self.test_dir / "plan.jsonl"
+        file_processor.plan_jobs(config, output_file_path=plan_path)
+
+        results = file_processor.replay_plan(config, plan_path)
+        self.assertEqual(results[0].summary.stale, 1)
+        self.assertNotIn("030.調査/調査検討書_A.xlsx", self._delivered())
+        self.mock_stdout.truncate(0)
+        self.mock_stdout.seek(0)
+
+        with self.assertLogs(level="INFO") as logs:
+            results = file_processor.replay_plan(config, plan_path)
+        self.assertEqual(results[0].summary.stale, 0)
+        self.assertNotIn("削除", self.mock_stdout.getvalue())
+        self.assertTrue(any("既にありません" in line for line in logs.output))
+
+    def test_run_metrics_are_collected(self):
+        """
+        計測値 (照合件数・フェーズ別件数・コピー件数・段階ごとの時間) が集計されることを確認
+        """
+        run_metrics = metrics.RunMetrics()
+        file_processor.process_files(self.config, run_metrics=run_metrics)
+        file_processor.process_files(self.config, run_metrics=run_metrics)
+
+        result = run_metrics.to_dict()
+        counters = result["counters"]
+        # 照合するのはフェーズ直下と成果物配下の3ファイル (作業中・アーカイブ配下は走査しない)
+        self.assertEqual(counters["files_examined"], 6)
+        self.assertEqual(counters["files_matched"], 4)
+        self.assertEqual(counters["files_copied"], 2)
+        self.assertEqual(counters["files_skipped_unchanged"], 2)
+        self.assertEqual(counters["bytes_copied"], len("top") + len("review"))
+        self.assertEqual(result["matched_by_phase"], {"030.調査": 4})
+        self.assertEqual(result["copy_latency_seconds"]["count"], 2)
+        for stage in ("walk", "match", "copy", "manifest"):
+            self.assertIn(stage, result["stage_seconds"])
+
+    def test_process_changes_touches_only_changed_dirs(self):
+        """
+        変更のあったディレクトリから納品したファイルだけが更新・不要扱いになることを確認
+        """
+        file_processor.process_files(self.config)
+        (
+            self.src / "030.調査" / "成果物" / "内部" / "レビュー記録表_調査_1.xlsx"
+        ).unlink()
+        internal = str(self.src / "030.調査" / "成果物" / "内部")
+        self.mock_stdout.truncate(0)
+        self.mock_stdout.seek(0)
+
+        summary = file_processor.process_changes(self.config, None, [], [internal])
+
+        self.assertEqual((summary.copied, summary.skipped, summary.stale), (0, 0, 1))
+        # 他のディレクトリから納品したファイルは不要扱いにならない
+        output = self.mock_stdout.getvalue()
+        self.assertIn("レビュー記録表_調査_1.xlsx", output)
+        self.assertNotIn("調査検討書_A.xlsx", output)
+
+    def test_nfd_names_are_matched(self):
+        """
+        macOS から同期した分解された形 (NFD) のフォルダ名・ファイル名でも照合され、
+        納品先のフェーズフォルダ名は設定どおり (NFC) になることを確認
+        """
+        phase_dir = unicodedata.normalize("NFD", "080.SD作成_レビュー")
+        file_name = unicodedata.normalize("NFD", "レビュー記録表_ゾーン.xlsx")
+        self.assertNotEqual(file_name, "レビュー記録表_ゾーン.xlsx")
+        (self.src / phase_dir).mkdir()
+        self._write(f"{phase_dir}/{file_name}", "nfd")
+        config = dict(
+            self.config, mappings=[("レビュー記録表_", "080.SD作成_レビュー", False)]
+        )
+
+        summary = file_processor.process_files(config)
+
+        self.assertEqual(summary.copied, 1)
+        self.assertEqual(
+            (self.dst / "080.SD作成_レビュー" / file_name).read_text(encoding="utf-8"),
+            "nfd",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
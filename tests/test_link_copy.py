@@ -0,0 +1,132 @@
+###############################################################
+#
+# link_copy (リンク・重複排除による納品) のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import errno
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import config_manager
+import copy_executor
+import file_processor
+import link_copy
+
+
+class TestLinkCopy(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+        self.dst = self.test_dir / "delivery"
+        (self.src / "030.調査" / "成果物").mkdir(parents=True)
+        (self.src / "040.設計" / "成果物").mkdir(parents=True)
+        self.checklist = b"checklist" * 1000
+        self._write("030.調査/成果物/レビュー記録表_調査_1.xlsx", self.checklist)
+        self._write("040.設計/成果物/レビュー記録表_設計_1.xlsx", self.checklist)
+        self._write("030.調査/調査検討書_A.xlsx", b"top")
+        self.config = {
+            "teams_root_path": self.src,
+            "delivery_root_path": self.dst,
+            "mappings": config_manager.DEFAULT_MAPPINGS,
+            "copy_workers": 1,
+        }
+        self._stdout_patcher = patch("sys.stdout", new_callable=io.StringIO)
+        self._stdout_patcher.start()
+
+    def tearDown(self):
+        self._stdout_patcher.stop()
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, rel_path: str, data: bytes) -> Path:
+        path = self.src / rel_path
+        path.write_bytes(data)
+        return path
+
+    def test_hardlink_mode_links_and_never_writes_through(self):
+        """
+        hardlink ではコピー元へのリンクになり、後でコピーに戻しても上書きでコピー元が変わらないことを確認
+        """
+        summary = file_processor.process_files(
+            dict(self.config, link_mode="hardlink", hash_files=True)
+        )
+        src = self.src / "030.調査" / "調査検討書_A.xlsx"
+        dst = self.dst / "030.調査" / "調査検討書_A.xlsx"
+        self.assertTrue(os.path.samefile(src, dst))
+        self.assertEqual(summary.copied, 3)
+        self.assertEqual(summary.bytes_linked, len(self.checklist) * 2 + len(b"top"))
+        sha256 = {entry.path: entry.sha256 for entry in summary.delivered}
+        self.assertEqual(
+            sha256["030.調査/調査検討書_A.xlsx"], hashlib.sha256(b"top").hexdigest()
+        )
+
+        # コピー元を更新 (新しいファイルに置き換え) してから、コピーで納品し直す
+        new_src = self.test_dir / "new.xlsx"
+        new_src.write_bytes(b"updated")
+        os.replace(new_src, src)
+        st = src.stat()
+        os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+        file_processor.process_files(self.config)
+        self.assertEqual(dst.read_bytes(), b"updated")
+
+        # リンクのまま残っている成果物を別の内容で上書きしても、コピー元は変わらない
+        checklist = self.src / "030.調査" / "成果物" / "レビュー記録表_調査_1.xlsx"
+        delivered = self.dst / "030.調査" / "成果物" / "レビュー記録表_調査_1.xlsx"
+        self.assertTrue(os.path.samefile(checklist, delivered))
+        other = self.test_dir / "other.xlsx"
+        other.write_bytes(b"other")
+        copy_executor.copy_file(str(other), str(delivered))
+        self.assertEqual(delivered.read_bytes(), b"other")
+        self.assertEqual(checklist.read_bytes(), self.checklist)
+
+    def test_dedup_stores_identical_files_once(self):
+        """
+        同じ内容のファイルは、納品先内の1つのファイルへのハードリンクになることを確認
+        """
+        summary = file_processor.process_files(dict(self.config, dedup=True))
+
+        first = self.dst / "030.調査" / "成果物" / "レビュー記録表_調査_1.xlsx"
+        second = self.dst / "040.設計" / "成果物" / "レビュー記録表_設計_1.xlsx"
+        self.assertTrue(os.path.samefile(first, second))
+        self.assertFalse(
+            os.path.samefile(
+                first, self.src / "030.調査" / "成果物" / "レビュー記録表_調査_1.xlsx"
+            )
+        )
+        self.assertEqual(summary.copied, 3)
+        self.assertEqual(summary.bytes_linked, len(self.checklist))
+
+    def test_unsupported_reflink_falls_back_to_copy(self):
+        """
+        reflink に対応していない場合はコピーし、以降のファイルでは reflink を試さないことを確認
+        """
+        copier = link_copy.LinkCopier("reflink")
+        calls = []
+
+        def unsupported(src, dst):
+            calls.append(src)
+            raise OSError(errno.EOPNOTSUPP, "not supported")
+
+        self.dst.mkdir()
+        with patch("link_copy._reflink", unsupported):
+            for name in ("a", "b"):
+                src = self._write(f"030.調査/{name}.txt", name.encode())
+                copier(str(src), str(self.dst / f"{name}.txt"))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual((self.dst / "b.txt").read_bytes(), b"b")
+        self.assertEqual(copier.stats.files, {link_copy.METHOD_COPY: 2})
+        self.assertEqual(copier.stats.bytes_saved, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
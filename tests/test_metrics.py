@@ -0,0 +1,89 @@
+###############################################################
+#
+# metrics のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import json
+import pstats
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import metrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_percentile(self):
+        """
+        最近傍順位法でパーセンタイルが求まることを確認
+        """
+        values = [float(i) for i in range(1, 21)]
+        self.assertEqual(metrics.percentile(values, 50), 10.0)
+        self.assertEqual(metrics.percentile(values, 95), 19.0)
+        self.assertEqual(metrics.percentile(values, 100), 20.0)
+        self.assertEqual(metrics.percentile([3.0], 95), 3.0)
+        self.assertIsNone(metrics.percentile([], 50))
+
+    def test_merge_from_threads_and_write_json(self):
+        """
+        複数スレッドから加えた計測値が失われず、JSONに出力されることを確認
+        """
+        run_metrics = metrics.RunMetrics()
+
+        def work():
+            for _ in range(100):
+                run_metrics.merge(
+                    counters={"files_copied": 1, "bytes_copied": 1024},
+                    matched_by_phase={"030.調査": 1},
+                    copy_latencies=[0.01],
+                )
+            with run_metrics.timer("walk"):
+                pass
+
+        threads = [threading.Thread(target=work) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        output_path = self.test_dir / "metrics.json"
+        run_metrics.write_json(output_path)
+        result = json.loads(output_path.read_text(encoding="utf-8"))
+
+        self.assertEqual(result["counters"]["files_copied"], 400)
+        self.assertEqual(result["matched_by_phase"], {"030.調査": 400})
+        self.assertEqual(result["copy_latency_seconds"]["count"], 400)
+        self.assertEqual(result["copy_latency_seconds"]["p95"], 0.01)
+        self.assertIn("walk", result["stage_seconds"])
+
+    def test_profiler_dumps_stats(self):
+        """
+        プロファイル結果が pstats で読み込める形式で出力されることを確認
+        """
+        profiler = metrics.ThreadProfiler()
+        with profiler.thread():
+            sorted(range(1000), key=lambda x: -x)
+
+        output_path = self.test_dir / "run.prof"
+        with patch("sys.stdout", new_callable=io.StringIO):
+            profiler.dump(output_path)
+        stats = pstats.Stats(str(output_path))
+        self.assertGreater(stats.total_calls, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,173 @@
+###############################################################
+#
+# rule_engine.RuleEngine と [Mappings] セクション読み込みのテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import shutil
+import tempfile
+import unicodedata
+import unittest
+from pathlib import Path
+
+import config_manager
+from rule_engine import RuleEngine
+
+
+class TestRuleEngine(unittest.TestCase):
+    def setUp(self):
+        self.engine = RuleEngine(
+            [
+                ("調査検討書_", "030.調査", False),
+                ("レビュー記録表_調査", "030.調査", True),
+                ("レビュー記録表_", "030.調査", True),
+                ("Review_*", "030.調査", True),
+                ("*.py", "050.製造", True),
+                ("Test_??.sql", "050.製造", True),
+            ]
+        )
+
+    def test_phases(self):
+        self.assertEqual(self.engine.phases, {"030.調査", "050.製造"})
+
+    def test_prefix_match_ignores_case(self):
+        """
+        前方一致で、大文字小文字を区別せずに照合されることを確認
+        """
+        rule = self.engine.match("030.調査", True, "REVIEW_a.xlsx")
+        self.assertEqual(rule.pattern, "Review_*")
+        rule = self.engine.match("030.調査", False, "調査検討書_A.xlsx")
+        self.assertEqual(rule.pattern, "調査検討書_")
+
+    def test_longest_prefix_wins(self):
+        """
+        重なるプレフィックスでは最長のものが返ることを確認
+        """
+        rule = self.engine.match("030.調査", True, "レビュー記録表_調査_1.xlsx")
+        self.assertEqual(rule.pattern, "レビュー記録表_調査")
+        rule = self.engine.match("030.調査", True, "レビュー記録表_設計_1.xlsx")
+        self.assertEqual(rule.pattern, "レビュー記録表_")
+
+    def test_wildcard_matches_whole_name(self):
+        """
+        ワイルドカードはファイル名全体と照合されることを確認
+        """
+        self.assertEqual(self.engine.match("050.製造", True, "main.PY").pattern, "*.py")
+        self.assertIsNone(self.engine.match("050.製造", True, "main.pyc"))
+        self.assertIsNotNone(self.engine.match("050.製造", True, "test_01.sql"))
+        self.assertIsNone(self.engine.match("050.製造", True, "test_001.sql"))
+
+    def test_names_are_unicode_normalized(self):
+        """
+        分解された形 (NFD) の名前も照合され、全角・半角の違いは fold_width の場合だけ無視されることを確認
+        """
+        nfd_name = unicodedata.normalize("NFD", "レビュー記録表_調査_1.xlsx")
+        rule = self.engine.match("030.調査", True, nfd_name)
+        self.assertEqual(rule.pattern, "レビュー記録表_調査")
+        nfd_engine = RuleEngine(
+            [(unicodedata.normalize("NFD", "レビュー記録表_"), "030.調査", True)]
+        )
+        self.assertIsNotNone(
+            nfd_engine.match("030.調査", True, "レビュー記録表_1.xlsx")
+        )
+
+        width_name = "ﾚﾋﾞｭｰ記録表＿調査_1.xlsx"
+        self.assertIsNone(self.engine.match("030.調査", True, width_name))
+        width_engine = RuleEngine.from_config(
+            {"mappings": [("レビュー記録表_", "030.調査", True)], "fold_width": True}
+        )
+        self.assertIsNotNone(width_engine.match("030.調査", True, width_name))
+
+    def test_rules_are_scoped_by_phase_and_location(self):
+        """
+        フェーズと成果物かどうかが異なるファイルには合致しないことを確認
+        """
+        self.assertIsNone(self.engine.match("030.調査", True, "調査検討書_A.xlsx"))
+        self.assertIsNone(self.engine.match("040.設計", False, "調査検討書_A.xlsx"))
+        self.assertIsNone(self.engine.match("050.製造", False, "main.py"))
+
+    def test_default_mappings_match_legacy_rules(self):
+        """
+        既定のマッピングで従来のハードコードされた条件と同じ結果になることを確認
+        """
+        engine = RuleEngine(config_manager.DEFAULT_MAPPINGS)
+        self.assertIn("050.製造", engine.phases)
+        self.assertIsNotNone(engine.match("090.SD消化", False, "試験結果報告書_1.xlsx"))
+        self.assertIsNotNone(engine.match("050.製造", True, "レビュー記録表_cd_1.xlsx"))
+        self.assertIsNone(engine.match("050.製造", False, "レビュー記録表_CD_1.xlsx"))
+
+
+class TestLoadMappings(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.config_path = self.test_dir / "config.ini"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, mappings: str):
+        self.config_path.write_text(
+            "[General]\n"
+            "teams_root_path = /tmp/teams\n"
+            "delivery_root_path = /tmp/delivery\n" + mappings,
+            encoding="utf-8",
+        )
+
+    def test_default_mappings_without_section(self):
+        self._write("")
+        config = config_manager.load_config(self.config_path)
+        self.assertEqual(config["mappings"], config_manager.DEFAULT_MAPPINGS)
+
+    def test_mappings_section(self):
+        self._write(
+            "[Mappings]\n"
+            "調査検討書_ = 030.調査\n"
+            "*.PY = 050.製造/成果物\n"
+            "レビュー記録表_ = 030.調査/成果物, 040.設計\\成果物\n"
+        )
+        config = config_manager.load_config(self.config_path)
+        self.assertEqual(
+            config["mappings"],
+            [
+                ("調査検討書_", "030.調査", False),
+                ("*.PY", "050.製造", True),
+                ("レビュー記録表_", "030.調査", True),
+                ("レビュー記録表_", "040.設計", True),
+            ],
+        )
+
+    def test_mapping_pattern_with_percent(self):
+        """
+        "%" を含むパターンを展開せずに読み込み、";" で始まる行はコメントとして無視されることを確認
+        """
+        self._write(
+            "[Mappings]\n"
+            "進捗100%_ = 030.調査\n"
+            "; 無視される行 = 040.設計\n"
+            "?memo_* = 030.調査/成果物\n"
+        )
+        config = config_manager.load_config(self.config_path)
+        self.assertEqual(
+            config["mappings"],
+            [("進捗100%_", "030.調査", False), ("?memo_*", "030.調査", True)],
+        )
+        rules = RuleEngine(config["mappings"])
+        self.assertIsNotNone(rules.match("030.調査", False, "進捗100%_A.xlsx"))
+        self.assertIsNotNone(rules.match("030.調査", True, "#memo_1.txt"))
+
+    def test_invalid_destination(self):
+        self._write("[Mappings]\n調査検討書_ = 030.調査/その他\n")
+        with self.assertRaisesRegex(ValueError, "コピー先が不正です"):
+            config_manager.load_config(self.config_path)
+
+    def test_empty_section(self):
+        self._write("[Mappings]\n")
+        with self.assertRaisesRegex(ValueError, "マッピングが1件もありません"):
+            config_manager.load_config(self.config_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+###############################################################
+#
+# skip_audit (納品対象にならなかったファイルの記録) のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import gzip
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import config_manager
+import file_processor
+import rule_engine
+import skip_audit
+
+
+class TestSkipAudit(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+        for rel_path in (
+            "030.調査/調査検討書_A.xlsx",
+            "030.調査/機能設計書_X.xlsx",
+            "030.調査/メモ.txt",
+            "030.調査/旧_調査検討書_C.xlsx",
+            "030.調査/調査検討書＿D.xlsx",
+            "030.調査/成果物/調査検討書_B.xlsx",
+            "030.調査/成果物/レビュー記録表_調査_1.xlsx",
+            "030.調査/成果物/b/レビュー記録表_調査_1.xlsx",
+            "030.調査/作業中/レビュー記録表_調査_2.xlsx",
+        ):
+            path = self.src / rel_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(rel_path, encoding="utf-8")
+        self.config = {
+            "teams_root_path": self.src,
+            "delivery_root_path": self.test_dir / "delivery",
+            "job_name": "調査",
+        }
+        self.rules = rule_engine.RuleEngine(config_manager.DEFAULT_MAPPINGS)
+        self.audit_path = self.test_dir / "skipped.jsonl.gz"
+        self._stdout_patcher = patch("sys.stdout", new_callable=io.StringIO)
+        self._stdout_patcher.start()
+
+    def tearDown(self):
+        self._stdout_patcher.stop()
+        shutil.rmtree(self.test_dir)
+
+    def test_skipped_files_are_recorded_with_reason(self):
+        """
+        スキップしたファイルが理由と惜しい候補とともに記録され、納品したファイルは記録されないことを確認
+        """
+        with skip_audit.SkipAuditWriter(self.audit_path, self.rules) as audit:
+            summary = file_processor.process_files(self.config, self.rules, audit=audit)
+        self.assertEqual(summary.copied, 2)
+
+        # gzip 圧縮の JSON Lines
+        with gzip.open(self.audit_path, "rt", encoding="utf-8") as f:
+            self.assertEqual(len(f.read().splitlines()), 7)
+
+        rows = {
+            Path(row["path"]).relative_to(self.src).as_posix(): row
+            for row in skip_audit.read_audit(self.audit_path)
+        }
+        actual = {
+            path: (
+                row["reason"],
+                row["rule"]["pattern"] if row["rule"] else None,
+                [(m["kind"], m["pattern"]) for m in row["near_misses"]],
+            )
+            for path, row in rows.items()
+        }
+        self.assertEqual(
+            actual,
+            {
+                "030.調査/機能設計書_X.xlsx": (
+                    skip_audit.REASON_WRONG_PHASE,
+                    "機能設計書_",
+                    [],
+                ),
+                "030.調査/メモ.txt": (skip_audit.REASON_NO_MATCH, None, []),
+                "030.調査/旧_調査検討書_C.xlsx": (
+                    skip_audit.REASON_NO_MATCH,
+                    None,
+                    [(skip_audit.NEAR_MISS_CONTAINS, "調査検討書_")],
+                ),
+                "030.調査/調査検討書＿D.xlsx": (
+                    skip_audit.REASON_NO_MATCH,
+                    None,
+                    [(skip_audit.NEAR_MISS_CASE_WIDTH, "調査検討書_")],
+                ),
+                "030.調査/成果物/調査検討書_B.xlsx": (
+                    skip_audit.REASON_OUTSIDE_ARTIFACT,
+                    "調査検討書_",
+                    [],
+                ),
+                "030.調査/成果物/b/レビュー記録表_調査_1.xlsx": (
+                    skip_audit.REASON_DUPLICATE_NAME,
+                    "レビュー記録表_調査",
+                    [],
+                ),
+                "030.調査/作業中/レビュー記録表_調査_2.xlsx": (
+                    skip_audit.REASON_OUTSIDE_ARTIFACT,
+                    "レビュー記録表_調査",
+                    [],
+                ),
+            },
+        )
+        self.assertEqual(rows["030.調査/メモ.txt"]["job"], "調査")
+        self.assertFalse(
+            rows["030.調査/作業中/レビュー記録表_調査_2.xlsx"]["in_artifact"]
+        )
+        self.assertEqual(audit.counts[skip_audit.REASON_NO_MATCH], 3)
+
+    def test_top_level_name_in_other_subfolder(self):
+        """
+        成果物以外のサブフォルダにあるフェーズ直下のルールどおりの名前のファイルが、
+        そのルールとともに記録され、惜しい候補にはならないことを確認
+        """
+        path = self.src / "030.調査" / "other" / "調査検討書_B.xlsx"
+        path.parent.mkdir()
+        path.write_text("other", encoding="utf-8")
+        with skip_audit.SkipAuditWriter(self.audit_path, self.rules) as audit:
+            file_processor.process_files(self.config, self.rules, audit=audit)
+
+        rows = {row["path"]: row for row in skip_audit.read_audit(self.audit_path)}
+        row = rows[str(path)]
+        self.assertEqual(row["reason"], skip_audit.REASON_OUTSIDE_ARTIFACT)
+        self.assertEqual(
+            row["rule"],
+            {"pattern": "調査検討書_", "phase": "030.調査", "is_artifact": False},
+        )
+        self.assertEqual(row["near_misses"], [])
+
+    def test_dry_run_records_skipped_files(self):
+        """
+        ドライランでもスキップしたファイルが記録されることを確認
+        """
+        config = {"jobs": [dict(self.config, name=None)]}
+        with skip_audit.SkipAuditWriter(self.audit_path, self.rules) as audit:
+            file_processor.plan_jobs(config, self.rules, audit=audit)
+        self.assertEqual(len(list(skip_audit.read_audit(self.audit_path))), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+###############################################################
+#
+# benchmarks/tree_generator のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import shutil
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "benchmarks"))
+
+import file_processor  # noqa: E402
+import tree_generator  # noqa: E402
+
+
+class TestTreeGenerator(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.spec = tree_generator.TreeSpec(
+            depth=2, fanout=2, files_per_dir=6, max_file_size=64, match_ratio=0.5
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _listing(self, root: Path) -> list:
+        return sorted(
+            (p.relative_to(root).as_posix(), p.stat().st_size) for p in root.rglob("*")
+        )
+
+    def test_same_seed_builds_same_tree(self):
+        """
+        同じ条件なら同じツリー、シード値が違えば違うツリーになることを確認
+        """
+        first = tree_generator.generate_tree(self.test_dir / "a", self.spec)
+        tree_generator.generate_tree(self.test_dir / "b", self.spec)
+        self.spec.seed = 1
+        tree_generator.generate_tree(self.test_dir / "c", self.spec)
+
+        self.assertEqual(
+            self._listing(self.test_dir / "a"), self._listing(self.test_dir / "b")
+        )
+        self.assertNotEqual(
+            self._listing(self.test_dir / "a"), self._listing(self.test_dir / "c")
+        )
+        self.assertEqual(
+            first.files, sum(1 for p in (self.test_dir / "a").rglob("*") if p.is_file())
+        )
+
+    def test_expected_matches_are_delivered(self):
+        """
+        納品対象になるはずのファイル数と、実際にコピーされたファイル数が一致することを確認
+        """
+        generated = tree_generator.generate_tree(self.test_dir / "teams", self.spec)
+        self.assertGreater(generated.expected_matches, 0)
+
+        with patch("sys.stdout", new_callable=io.StringIO):
+            summary = file_processor.process_files(
+                {
+                    "teams_root_path": self.test_dir / "teams",
+                    "delivery_root_path": self.test_dir / "delivery",
+                    "mappings": self.spec.mappings,
+                }
+            )
+        self.assertEqual(summary.copied, generated.expected_matches)
+        self.assertEqual(summary.failed, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
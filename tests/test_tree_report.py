@@ -0,0 +1,94 @@
+###############################################################
+#
+# tree_report のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import tree_report
+from manifest import ManifestEntry
+
+
+def _entry(path: str, size: int = 0, sha256: str = None) -> ManifestEntry:
+    return ManifestEntry(path, "/src/" + path, size, 0, sha256)
+
+
+ENTRIES = [
+    _entry("040.設計/機能設計書_B.xlsx", 2048),
+    _entry("030.調査/成果物/レビュー記録表_調査.xlsx", 10, "ab" * 32),
+    _entry("030.調査/調査検討書_A.xlsx", 5),
+]
+
+
+class TestTreeReport(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.output = self.test_dir / "tree.txt"
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_text_matches_tree_f_layout(self):
+        """
+        tree /F と同じ形式 (ファイルが先、罫線付き) で出力されることを確認
+        """
+        tree_report.write_tree_report(self.output, [("D:\\納品物", ENTRIES)])
+
+        self.assertEqual(
+            self.output.read_text(encoding="utf-8"),
+            "D:\\納品物\n"
+            "├─030.調査\n"
+            "│  │  調査検討書_A.xlsx\n"
+            "│  │\n"
+            "│  └─成果物\n"
+            "│          レビュー記録表_調査.xlsx\n"
+            "│\n"
+            "└─040.設計\n"
+            "        機能設計書_B.xlsx\n"
+            "\n",
+        )
+
+    def test_text_details(self):
+        tree_report.write_tree_report(self.output, [("root", ENTRIES)], details=True)
+
+        text = self.output.read_text(encoding="utf-8")
+        self.assertIn("機能設計書_B.xlsx  (2,048 bytes)", text)
+        self.assertIn(f"レビュー記録表_調査.xlsx  (10 bytes, sha256:{'ab' * 32})", text)
+
+    def test_json(self):
+        """
+        tree -J と同じ構造のJSONが出力されることを確認
+        """
+        tree_report.write_tree_report(
+            self.output, [("root", ENTRIES)], fmt="json", details=True
+        )
+
+        data = json.loads(self.output.read_text(encoding="utf-8"))
+        self.assertEqual(data[-1], {"type": "report", "directories": 3, "files": 3})
+        root = data[0]
+        self.assertEqual(root["name"], "root")
+        self.assertEqual(
+            [c["name"] for c in root["contents"]], ["030.調査", "040.設計"]
+        )
+        research = root["contents"][0]["contents"]
+        self.assertEqual(
+            research[0], {"type": "file", "name": "調査検討書_A.xlsx", "size": 5}
+        )
+        self.assertEqual(research[1]["contents"][0]["sha256"], "ab" * 32)
+
+    def test_empty_delivery(self):
+        tree_report.write_tree_report(self.output, [("root", [])], fmt="json")
+        data = json.loads(self.output.read_text(encoding="utf-8"))
+        self.assertEqual(data[1], {"type": "report", "directories": 0, "files": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+###############################################################
+#
+# walker.walk_phase_tree のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+import walker
+
+
+class TestWalkPhaseTree(unittest.TestCase):
+    """
+    一時ディレクトリにダミーのTeamsツリーを作成し、走査結果と枝刈りを確認する
+    """
+
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+
+        # フェーズフォルダ
+        phase_dir = self.test_dir / "030.調査"
+        (phase_dir / "成果物" / "内部").mkdir(parents=True)
+        (phase_dir / "作業中").mkdir()
+        (phase_dir / "調査検討書_A.xlsx").touch()
+        (phase_dir / "成果物" / "レビュー記録表_調査.xlsx").touch()
+        (phase_dir / "成果物" / "内部" / "030_レビューチェックリスト_A.xlsx").touch()
+        (phase_dir / "作業中" / "調査検討書_下書き.xlsx").touch()
+
+        # フェーズ以外のフォルダとルート直下のファイル
+        (self.test_dir / "アーカイブ" / "2023" / "成果物").mkdir(parents=True)
+        (self.test_dir / "アーカイブ" / "2023" / "成果物" / "古い.xlsx").touch()
+        (self.test_dir / "ルート.txt").touch()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_yields_only_phase_root_and_artifact_files(self):
+        """
+        フェーズ直下と成果物配下のファイルのみが返ることを確認
+        """
+        records = walker.walk_phase_tree(self.test_dir, {"030.調査"})
+        result = sorted((r.phase, r.is_artifact, r.entry.name) for r in records)
+        self.assertEqual(
+            result,
+            [
+                ("030.調査", False, "調査検討書_A.xlsx"),
+                ("030.調査", True, "030_レビューチェックリスト_A.xlsx"),
+                ("030.調査", True, "レビュー記録表_調査.xlsx"),
+            ],
+        )
+
+    def test_prunes_non_phase_directories(self):
+        """
+        フェーズ以外のフォルダには降りないことを確認
+        """
+        stats = walker.WalkStats()
+        list(walker.walk_phase_tree(self.test_dir, {"030.調査"}, stats))
+
+        # ルート, 030.調査, 成果物, 内部, 作業中 の5つのみ
+        self.assertEqual(stats.dirs_visited, 5)
+        self.assertEqual(stats.dirs_pruned, 1)
+        self.assertEqual(stats.files_yielded, 3)
+        self.assertLess(stats.dirs_visited, sum(1 for _ in os.walk(self.test_dir)))
+
+    def test_missing_root_is_not_fatal(self):
+        """
+        ルートが存在しない場合もエラーで停止せず、何も返さないことを確認
+        """
+        records = list(
+            walker.walk_phase_tree(self.test_dir / "存在しない", {"030.調査"})
+        )
+        self.assertEqual(records, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+###############################################################
+#
+# watcher (監視モード) のテスト
+#
+# 実行コマンド
+# python -m unittest discover tests
+#
+##############################################################
+
+import io
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import config_manager
+import manifest
+import rule_engine
+import watcher
+
+
+class TestTreeSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+        (self.src / "030.調査" / "成果物" / "内部").mkdir(parents=True)
+        (self.src / "030.調査" / "作業中").mkdir()
+        self._write("030.調査/調査検討書_A.xlsx", "top")
+        self._write("030.調査/メモ.txt", "memo")
+        self.snapshot = watcher.TreeSnapshot(
+            self.src, rule_engine.RuleEngine(config_manager.DEFAULT_MAPPINGS)
+        )
+        self.snapshot.build()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def _write(self, rel_path: str, text: str, mtime_offset: int = 0) -> Path:
+        path = self.src / rel_path
+        path.write_text(text, encoding="utf-8")
+        if mtime_offset:
+            st = path.stat()
+            os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + mtime_offset))
+        return path
+
+    def _touch_dir(self, rel_path: str):
+        # ディレクトリの更新日時の分解能に左右されないよう、明示的にずらす
+        path = self.src / rel_path
+        st = path.stat()
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_polling_detects_only_relevant_changes(self):
+        """
+        合致するファイルの追加・上書き・削除を検出し、合致しないファイルの変更は無視することを確認
+        """
+        phase = str(self.src / "030.調査")
+        internal = str(self.src / "030.調査" / "成果物" / "内部")
+        self.assertEqual(self.snapshot.changed_dirs(), set())
+        self.assertEqual(
+            [r.entry.name for r in self.snapshot.records()], ["調査検討書_A.xlsx"]
+        )
+
+        # 合致しないファイルの変更: ディレクトリは読み直すが、影響なし
+        self._write("030.調査/メモ.txt", "memo2")
+        self._touch_dir("030.調査")
+        changed = self.snapshot.changed_dirs()
+        self.assertEqual(changed, {phase})
+        self.assertEqual(self.snapshot.rescan(changed), set())
+
+        # 合致するファイルの上書き (ディレクトリの更新日時は変わらない)
+        self._write("030.調査/調査検討書_A.xlsx", "updated", 1_000_000_000)
+        changed = self.snapshot.changed_dirs()
+        self.assertEqual(changed, {phase})
+        self.assertEqual(self.snapshot.rescan(changed), {phase})
+
+        # 成果物配下への追加
+        self._write("030.調査/成果物/内部/レビュー記録表_調査_1.xlsx", "review")
+        self._touch_dir("030.調査/成果物/内部")
+        self.assertEqual(self.snapshot.rescan(self.snapshot.changed_dirs()), {internal})
+        self.assertEqual(
+            [r.entry.name for r in self.snapshot.records([internal])],
+            ["レビュー記録表_調査_1.xlsx"],
+        )
+
+        # サブディレクトリごと削除すると、配下のディレクトリも影響ありになる
+        shutil.rmtree(self.src / "030.調査" / "成果物")
+        self._touch_dir("030.調査")
+        affected = self.snapshot.rescan(self.snapshot.changed_dirs())
+        self.assertIn(internal, affected)
+        self.assertNotIn(internal, self.snapshot.dirs)
+
+
+class TestWatchJobs(unittest.TestCase):
+    def setUp(self):
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.src = self.test_dir / "teams"
+        self.dst = self.test_dir / "delivery"
+        (self.src / "030.調査" / "成果物" / "内部").mkdir(parents=True)
+        (self.src / "030.調査" / "調査検討書_A.xlsx").write_text(
+            "top", encoding="utf-8"
+        )
+        self.config = {
+            "mappings": config_manager.DEFAULT_MAPPINGS,
+            "jobs": [
+                {
+                    "name": None,
+                    "teams_root_path": self.src,
+                    "delivery_root_path": self.dst,
+                }
+            ],
+        }
+        self._stdout_patcher = patch("sys.stdout", new_callable=io.StringIO)
+        self._stdout_patcher.start()
+
+    def tearDown(self):
+        self._stdout_patcher.stop()
+        shutil.rmtree(self.test_dir)
+
+    def _delivered(self) -> list:
+        return sorted(
+            p.relative_to(self.dst).as_posix()
+            for p in self.dst.rglob("*")
+            if p.is_file() and p.name != manifest.MANIFEST_FILE_NAME
+        )
+
+    def _run_watch(self, use_inotify: bool):
+        batches = []
+        ready = threading.Event()
+        stop = threading.Event()
+
+        def on_batch(batch, latest):
+            batches.append([result.summary for result in batch])
+            ready.set()
+
+        thread = threading.Thread(
+            target=watcher.watch_jobs,
+            args=(self.config,),
+            kwargs=dict(
+                interval=0.05,
+                debounce=0.5,
+                use_inotify=use_inotify,
+                on_batch=on_batch,
+                stop_event=stop,
+            ),
+        )
+        thread.start()
+        try:
+            self.assertTrue(ready.wait(10))
+            self.assertEqual(self._delivered(), ["030.調査/調査検討書_A.xlsx"])
+            ready.clear()
+
+            # 連続した保存は、まとめて1回だけ反映される
+            review = (
+                self.src / "030.調査" / "成果物" / "内部" / "レビュー記録表_調査_1.xlsx"
+            )
+            for i in range(3):
+                review.write_text(f"review{i}", encoding="utf-8")
+                time.sleep(0.05)
+            self.assertTrue(ready.wait(10))
+            time.sleep(0.7)
+        finally:
+            stop.set()
+            thread.join(10)
+
+        self.assertEqual(len(batches), 2)
+        summary = batches[1][0]
+        self.assertEqual((summary.copied, summary.stale), (1, 0))
+        self.assertEqual(
+            self._delivered(),
+            [
+                "030.調査/成果物/レビュー記録表_調査_1.xlsx",
+                "030.調査/調査検討書_A.xlsx",
+            ],
+        )
+        self.assertEqual(
+            (self.dst / "030.調査" / "成果物" / "レビュー記録表_調査_1.xlsx").read_text(
+                encoding="utf-8"
+            ),
+            "review2",
+        )
+
+    def test_changes_are_copied_with_polling(self):
+        """
+        ポーリングで変更を検出し、変更のあったファイルだけがコピーされることを確認
+        """
+        self._run_watch(use_inotify=False)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify は Linux のみ")
+    def test_changes_are_copied_with_inotify(self):
+        """
+        inotify で変更を検出し、変更のあったファイルだけがコピーされることを確認
+        """
+        try:
+            watcher.InotifyWatcher([]).close()
+        except OSError as e:
+            self.skipTest(f"inotify を使えません ({e})")
+        self._run_watch(use_inotify=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
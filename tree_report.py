@@ -0,0 +1,167 @@
+import json
+import logging
+from typing import Iterable, Iterator, List, Tuple
+
+import manifest
+
+logger = logging.getLogger(__name__)
+
+# 出力形式
+TREE_FORMATS = ("text", "json")
+
+
+class _Dir:
+    """ツリーの1ディレクトリ (描画前の構造だけを持つ)"""
+
+    __slots__ = ("dirs", "files")
+
+    def __init__(self):
+        self.dirs = {}  # 名前 -> _Dir
+        self.files = []  # manifest.ManifestEntry
+
+
+def build_tree(entries: Iterable[manifest.ManifestEntry]) -> _Dir:
+    """
+    納品済みファイルの記録 (納品先ルートからの相対パス) からツリー構造を作る。
+    納品先フォルダを走査し直す必要はない。
+    """
+
+    root = _Dir()
+    for entry in entries:
+        *dir_names, _ = entry.path.split("/")
+        node = root
+        for name in dir_names:
+            node = node.dirs.setdefault(name, _Dir())
+        node.files.append(entry)
+    return root
+
+
+def iter_text_lines(
+    root_label: str, tree: _Dir, details: bool = False
+) -> Iterator[str]:
+    """
+    `tree /F` と同じ形式の行を1行ずつ返す (全体を1つの文字列にはしない)。
+
+    例:
+        D:\\納品物
+        ├─030.調査
+        │  │  調査検討書_A.xlsx
+        │  │
+        │  └─成果物
+        │          レビュー記録表_調査.xlsx
+        │
+        └─040.設計
+                機能設計書_B.xlsx
+    """
+
+    yield root_label
+    yield from _iter_dir_lines(tree, "", details)
+
+
+def _iter_dir_lines(node: _Dir, prefix: str, details: bool) -> Iterator[str]:
+    dir_names = sorted(node.dirs)
+
+    # ファイルはサブディレクトリより先に並べる。サブディレクトリがあれば縦線を引き続ける
+    file_prefix = prefix + ("│  " if dir_names else "    ")
+    files = sorted(node.files, key=lambda e: e.path)
+    for entry in files:
+        yield file_prefix + _file_label(entry, details)
+    if files:
+        yield file_prefix.rstrip()
+
+    for i, name in enumerate(dir_names):
+        is_last = i == len(dir_names) - 1
+        yield prefix + ("└─" if is_last else "├─") + name
+        yield from _iter_dir_lines(
+            node.dirs[name], prefix + ("    " if is_last else "│  "), details
+        )
+
+
+def _file_label(entry: manifest.ManifestEntry, details: bool) -> str:
+    name = entry.path.rsplit("/", 1)[-1]
+    if not details:
+        return name
+    label = f"{name}  ({entry.size:,} bytes"
+    if entry.sha256:
+        label += f", sha256:{entry.sha256}"
+    return label + ")"
+
+
+def iter_json_chunks(
+    trees: List[Tuple[str, _Dir]], details: bool = False
+) -> Iterator[str]:
+    """
+    `tree -J` と同じ構造のJSONを、少しずつ文字列で返す。
+
+    [
+      {"type": "directory", "name": "<納品先ルート>", "contents": [...]},
+      {"type": "report", "directories": 3, "files": 5}
+    ]
+    """
+
+    counts = {"directories": 0, "files": 0}
+    yield "["
+    for i, (root_label, tree) in enumerate(trees):
+        if i:
+            yield ","
+        yield from _iter_json_dir(root_label, tree, details, counts)
+    if trees:
+        yield ","
+    yield json.dumps(dict(type="report", **counts))
+    yield "]\n"
+
+
+def _iter_json_dir(name: str, node: _Dir, details: bool, counts: dict) -> Iterator[str]:
+    yield '{"type":"directory","name":' + json.dumps(name, ensure_ascii=False)
+    yield ',"contents":['
+    first = True
+    for entry in sorted(node.files, key=lambda e: e.path):
+        counts["files"] += 1
+        item = {"type": "file", "name": entry.path.rsplit("/", 1)[-1]}
+        if details:
+            item["size"] = entry.size
+            if entry.sha256:
+                item["sha256"] = entry.sha256
+        yield ("" if first else ",") + json.dumps(item, ensure_ascii=False)
+        first = False
+    for dir_name in sorted(node.dirs):
+        counts["directories"] += 1
+        if not first:
+            yield ","
+        first = False
+        yield from _iter_json_dir(dir_name, node.dirs[dir_name], details, counts)
+    yield "]}"
+
+
+def write_tree_report(
+    output_file_path,
+    trees: List[Tuple[str, Iterable[manifest.ManifestEntry]]],
+    fmt: str = "text",
+    details: bool = False,
+):
+    """
+    納品先ごとのツリーをファイルに書き出す。行ごと (JSONは要素ごと) に書き出すため、
+    大きなツリーでも出力全体を1つの文字列としてメモリに持たない。
+
+    Args:
+        output_file_path: 出力先ファイルパス
+        trees (list): (納品先ルートの表示名, 納品済みファイルの記録) の並び
+        fmt (str): "text" (tree /F 形式) または "json"
+        details (bool): ファイルサイズとSHA-256 (記録があれば) を含めるか
+
+    Raises:
+        OSError: ファイルの書き込みに失敗した場合。
+    """
+
+    built = [(label, build_tree(entries)) for label, entries in trees]
+    with open(output_file_path, "w", encoding="utf-8") as f:
+        if fmt == "json":
+            for chunk in iter_json_chunks(built, details):
+                f.write(chunk)
+            return
+
+        for i, (label, tree) in enumerate(built):
+            if i:
+                f.write("\n")
+            for line in iter_text_lines(label, tree, details):
+                f.write(line + "\n")
@@ -0,0 +1,201 @@
+import itertools
+import logging
+import os
+import unicodedata
+from dataclasses import dataclass
+from typing import Callable, Container, Iterator, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+# 成果物フォルダの名前。パスのどこかにこのフォルダが含まれていれば成果物扱いとする
+ARTIFACT_DIR_NAME = "成果物"
+
+
+class WalkRecord(NamedTuple):
+    """
+    走査結果の1ファイル分のレコード。
+
+    Attributes:
+        phase (str): ファイルが属するフェーズフォルダ名 (例: "030.調査"。NFC に正規化済み)
+        is_artifact (bool): 「成果物」フォルダ配下のファイルならTrue、フェーズフォルダ直下ならFalse
+        entry (os.DirEntry): os.scandirが返したエントリ (name, path, stat()を持つ)
+        folded_name (str): 照合用に正規化したファイル名 (走査時に fold を指定した場合のみ)
+    """
+
+    phase: str
+    is_artifact: bool
+    entry: os.DirEntry
+    folded_name: Optional[str] = None
+
+
+@dataclass
+class WalkStats:
+    """
+    走査の統計情報。ベンチマークやログ出力に使用する。
+
+    Attributes:
+        dirs_visited (int): os.scandirで中身を列挙したディレクトリ数
+        dirs_pruned (int): フェーズフォルダでないため降りなかったディレクトリ数
+        files_yielded (int): マッチング対象として返したファイル数
+    """
+
+    dirs_visited: int = 0
+    dirs_pruned: int = 0
+    files_yielded: int = 0
+
+
+class DirTask(NamedTuple):
+    """
+    走査するフェーズフォルダ配下のディレクトリ1つ分の情報。
+
+    Attributes:
+        phase (str): 属するフェーズフォルダ名
+        in_artifact (bool): パスに「成果物」フォルダを含むか
+        path (str): ディレクトリのパス
+        is_phase_root (bool): フェーズフォルダそのものか
+    """
+
+    phase: str
+    in_artifact: bool
+    path: str
+    is_phase_root: bool
+
+
+def walk_phase_tree(
+    src_base,
+    phases: Container[str],
+    stats: WalkStats = None,
+    on_skip: Callable[[DirTask, os.DirEntry], None] = None,
+    fold: Callable[[str], str] = None,
+) -> Iterator[WalkRecord]:
+    """
+    Teamsのルートフォルダを走査し、マッチングの対象になり得るファイルだけを返す。
+
+    os.walkと違い、ルート直下でフェーズフォルダ (phasesに含まれる名前) 以外の
+    ディレクトリには一切降りない。また、ファイル/ディレクトリの判定は
+    os.DirEntryが持つ種別情報を使うため、追加のstat呼び出しは発生しない。
+
+    返すファイルは次の2種類のみ。
+      - フェーズフォルダ直下のファイル (is_artifact=False)
+      - フェーズフォルダ配下で、パスに「成果物」フォルダを含むファイル (is_artifact=True)
+
+    Args:
+        src_base: 走査するルートパス (teams_root_path)
+        phases (Container[str]): フェーズフォルダ名の集合 (例: {"030.調査", "040.設計"})
+        stats (WalkStats): 指定された場合、走査の統計情報を加算する
+        on_skip (Callable[[DirTask, os.DirEntry], None]): 指定された場合、フェーズフォルダ配下で
+            返さなかったファイル (成果物フォルダの外のサブフォルダにあるファイル) ごとに呼び出す
+        fold (Callable[[str], str]): 指定された場合、照合用に正規化したファイル名を
+            WalkRecord.folded_name に入れて返す (rule_engine.RuleEngine.fold)
+
+    Yields:
+        WalkRecord: マッチング対象のファイル
+    """
+
+    if stats is None:
+        stats = WalkStats()
+
+    # 深さ優先で走査する (os.walkと同様にシンボリックリンクのディレクトリには降りない)
+    stack = list_phase_dirs(src_base, phases, stats)
+    stack.reverse()
+    while stack:
+        records, subdirs = scan_dir(stack.pop(), stats, on_skip, fold)
+        yield from records
+        stack.extend(reversed(subdirs))
+
+
+def list_phase_dirs(src_base, phases: Container[str], stats: WalkStats) -> list:
+    """
+    ルート直下のフェーズフォルダを列挙する。それ以外のディレクトリは枝刈りする。
+    フォルダ名は NFC に正規化して phases と比べる (macOS から同期したフォルダ名は NFD のため)。
+
+    Returns:
+        list[DirTask]: フェーズフォルダ
+    """
+
+    phase_dirs = []
+    for entry in _scandir(src_base, stats):
+        if not entry.is_dir():
+            # ルート直下のファイルはどのルールの対象にもならない
+            continue
+        phase = normalize_nfc(entry.name)
+        if phase in phases and not entry.is_symlink():
+            phase_dirs.append(DirTask(phase, False, entry.path, True))
+        else:
+            stats.dirs_pruned += 1
+    return phase_dirs
+
+
+def scan_dir(
+    task: DirTask,
+    stats: WalkStats,
+    on_skip: Callable[[DirTask, os.DirEntry], None] = None,
+    fold: Callable[[str], str] = None,
+) -> tuple:
+    """
+    フェーズフォルダ配下のディレクトリ1つの中身を列挙する。
+    返さないファイルは、on_skip が指定されていれば on_skip(task, entry) を呼び出す。
+    fold が指定されていれば、返すファイルの名前をディレクトリごとにまとめて正規化しておく
+    (監視モードのようにディレクトリの走査結果を使い回す場合、正規化も1回で済む)。
+
+    Returns:
+        tuple[list[WalkRecord], list[DirTask]]: マッチング対象のファイルと、サブディレクトリ
+    """
+
+    files = []
+    subdirs = []
+    for entry in _scandir(task.path, stats):
+        if entry.is_dir():
+            if not entry.is_symlink():
+                in_artifact = (
+                    task.in_artifact or normalize_nfc(entry.name) == ARTIFACT_DIR_NAME
+                )
+                subdirs.append(DirTask(task.phase, in_artifact, entry.path, False))
+            continue
+
+        # フェーズ直下のファイル、または成果物配下のファイルのみ返す
+        if task.is_phase_root or task.in_artifact:
+            files.append(entry)
+        elif on_skip is not None:
+            on_skip(task, entry)
+
+    folded_names = (
+        map(fold, [entry.name for entry in files])
+        if fold is not None
+        else itertools.repeat(None)
+    )
+    records = [
+        WalkRecord(task.phase, task.in_artifact, entry, folded)
+        for entry, folded in zip(files, folded_names)
+    ]
+    stats.files_yielded += len(records)
+    return records, subdirs
+
+
+def normalize_nfc(name: str) -> str:
+    """
+    名前を NFC (合成済みの形) に正規化する。macOS (NFD) から同期したフォルダでは、
+    濁点・半濁点を含む名前 (例: "レビュー") が分解された形で返るため、比較の前にそろえる。
+    ASCIIのみの名前はそのまま返す。既に NFC の名前は unicodedata.normalize の
+    クイックチェックでそのまま返るため、is_normalized で事前に調べることはしない
+    (NFD の名前では is_normalized と normalize で2回分解することになる)。
+    """
+
+    if name.isascii():
+        return name
+    return unicodedata.normalize("NFC", name)
+
+
+def _scandir(dir_path, stats: WalkStats) -> list:
+    """
+    ディレクトリの中身を列挙する。読み込みに失敗した場合は警告を出して空として扱う
+    (設計書5.2: エラーが発生しても処理を中断しない)。
+    """
+
+    stats.dirs_visited += 1
+    try:
+        with os.scandir(dir_path) as it:
+            return list(it)
+    except OSError as e:
+        logging.warning(f"ディレクトリを読み込めませんでした: {dir_path} ({e})")
+        return []
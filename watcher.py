@@ -0,0 +1,579 @@
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+
+import config_manager
+import copy_executor
+import file_processor
+import rule_engine
+import walker
+from config_manager import DEFAULT_DEBOUNCE_SECONDS, DEFAULT_POLL_INTERVAL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 変更が続いても、最初の変更からこの秒数が経てば一度反映する
+DEFAULT_MAX_DELAY_SECONDS = 30.0
+
+# inotify の定数 (linux/inotify.h)
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_MOVE_SELF = 0x00000800
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ONLYDIR = 0x01000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+# 書き込み中の変更 (IN_MODIFY) は数が多いため監視せず、書き込みの完了 (IN_CLOSE_WRITE) を待つ
+_WATCH_MASK = (
+    _IN_ATTRIB
+    | _IN_CLOSE_WRITE
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+    | _IN_MOVE_SELF
+    | _IN_ONLYDIR
+)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+class _DirState(NamedTuple):
+    """
+    スナップショット内のディレクトリ1つ分の状態。
+
+    Attributes:
+        task (walker.DirTask): 走査時のディレクトリ情報
+        mtime_ns (int): 走査直前のディレクトリの更新日時
+        records (list[walker.WalkRecord]): マッチングルールに合致したファイル
+        files (dict): 合致したファイルの名前 -> (サイズ, 更新日時)
+        subdirs (list[str]): サブディレクトリのパス
+    """
+
+    task: walker.DirTask
+    mtime_ns: Optional[int]
+    records: list
+    files: dict
+    subdirs: list
+
+
+class TreeSnapshot:
+    """
+    Teamsフォルダのフェーズフォルダ配下の状態をメモリ上に保持する。
+
+    ディレクトリごとに、マッチングルールに合致したファイルのサイズと更新日時、
+    サブディレクトリの一覧を持つ。変更のあったディレクトリだけを rescan() で読み直す。
+    """
+
+    def __init__(self, src_base, rules: rule_engine.RuleEngine):
+        self.src_base = str(src_base)
+        self.rules = rules
+        self.root_mtime_ns = None
+        self.phase_dirs: List[str] = []
+        self.dirs: Dict[str, _DirState] = {}
+        self.stats = walker.WalkStats()
+
+    def build(self):
+        """ルートから全体を走査する"""
+
+        self.dirs.clear()
+        self.phase_dirs = []
+        self.rescan([self.src_base])
+
+    def owns(self, path: str) -> bool:
+        return path == self.src_base or path in self.dirs
+
+    def rescan(self, dir_paths) -> Set[str]:
+        """
+        指定されたディレクトリを読み直す。新しいサブディレクトリは配下をすべて読み、
+        なくなったサブディレクトリは配下ごとスナップショットから除く。
+
+        Returns:
+            set[str]: 納品対象に影響する変更のあったディレクトリのパス (削除されたものを含む)。
+                合致しないファイルだけが変わったディレクトリは含まない
+        """
+
+        affected = set()
+        for path in dir_paths:
+            if path == self.src_base:
+                self._scan_root(affected)
+            elif path in self.dirs:
+                self._scan(self.dirs[path].task, affected)
+        return affected
+
+    def changed_dirs(self) -> Set[str]:
+        """
+        ディレクトリの更新日時と、合致したファイルのサイズ・更新日時を前回の走査時と比べ、
+        変わったディレクトリを返す (ポーリング用。ディレクトリの中身は列挙しない)。
+        """
+
+        changed = set()
+        if _mtime_ns(self.src_base) != self.root_mtime_ns:
+            changed.add(self.src_base)
+        for path, state in self.dirs.items():
+            if _mtime_ns(path) != state.mtime_ns:
+                changed.add(path)
+                continue
+            # 上書き保存ではディレクトリの更新日時が変わらないため、ファイルも確認する
+            for name, stat in state.files.items():
+                if _stat(os.path.join(path, name)) != stat:
+                    changed.add(path)
+                    break
+        return changed
+
+    def records(self, dir_paths=None) -> List[walker.WalkRecord]:
+        """
+        合致したファイルを走査順に返す。dir_paths を指定した場合はそのディレクトリ内のもののみ。
+        """
+
+        if dir_paths is None:
+            states = self.dirs.values()
+        else:
+            states = (self.dirs[p] for p in dir_paths if p in self.dirs)
+        return [record for state in states for record in state.records]
+
+    def _scan_root(self, affected: Set[str]):
+        self.root_mtime_ns = _mtime_ns(self.src_base)
+        tasks = walker.list_phase_dirs(self.src_base, self.rules.phases, self.stats)
+        paths = [task.path for task in tasks]
+        for path in set(self.phase_dirs) - set(paths):
+            self._drop(path, affected)
+        for task in tasks:
+            if task.path not in self.dirs:
+                self._scan(task, affected)
+        self.phase_dirs = paths
+
+    def _scan(self, task: walker.DirTask, affected: Set[str]):
+        # 中身を列挙する前に更新日時を取る (列挙中の変更は次回に検出される)
+        mtime_ns = _mtime_ns(task.path)
+        if mtime_ns is None:
+            self._drop(task.path, affected)
+            return
+
+        records, subtasks = walker.scan_dir(task, self.stats, fold=self.rules.fold)
+        matched = []
+        files = {}
+        for record in records:
+            if self.rules.match(
+                record.phase, record.is_artifact, record.entry.name, record.folded_name
+            ):
+                stat = _entry_stat(record.entry)
+                if stat is not None:
+                    matched.append(record)
+                    files[record.entry.name] = stat
+        subdirs = [subtask.path for subtask in subtasks]
+
+        old = self.dirs.get(task.path)
+        self.dirs[task.path] = _DirState(task, mtime_ns, matched, files, subdirs)
+        if old is None or old.files != files:
+            affected.add(task.path)
+
+        old_subdirs = set(old.subdirs) if old is not None else set()
+        for path in old_subdirs - set(subdirs):
+            self._drop(path, affected)
+        for subtask in subtasks:
+            if subtask.path not in old_subdirs:
+                self._scan(subtask, affected)
+
+    def _drop(self, path: str, affected: Set[str]):
+        state = self.dirs.pop(path, None)
+        if state is None:
+            return
+        affected.add(path)
+        for subdir in state.subdirs:
+            self._drop(subdir, affected)
+
+
+class PollingWatcher:
+    """
+    ディレクトリの更新日時を一定間隔で比べて変更を検出する (inotifyを使えない環境用)。
+    """
+
+    def __init__(self, snapshots: List[TreeSnapshot]):
+        self.snapshots = snapshots
+
+    def wait(self, timeout: float) -> List[Set[str]]:
+        """
+        timeout 秒待ってから変更を確認する。
+
+        Returns:
+            list[set[str]]: スナップショットごとの、変更のあったディレクトリのパス
+        """
+
+        time.sleep(timeout)
+        return [snapshot.changed_dirs() for snapshot in self.snapshots]
+
+    def sync(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """
+    inotify (Linux) でディレクトリの変更を検出する。
+
+    スナップショット内のすべてのディレクトリとルートを監視する。
+    ディレクトリの増減は sync() で監視対象に反映する。
+    """
+
+    def __init__(self, snapshots: List[TreeSnapshot]):
+        self.snapshots = snapshots
+        self._libc = _load_libc()
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._paths_by_wd: Dict[int, str] = {}
+        self._wds_by_path: Dict[str, int] = {}
+        try:
+            self.sync(strict=True)
+        except OSError:
+            self.close()
+            raise
+
+    def sync(self, strict: bool = False):
+        """
+        スナップショットにあるディレクトリを監視対象に加え、なくなったものを外す。
+
+        Raises:
+            OSError: strict=True で、監視を追加できなかった場合 (監視数の上限など)。
+        """
+
+        wanted = set()
+        for snapshot in self.snapshots:
+            wanted.add(snapshot.src_base)
+            wanted.update(snapshot.dirs)
+
+        for path in set(self._wds_by_path) - wanted:
+            wd = self._wds_by_path.pop(path)
+            self._paths_by_wd.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+
+        for path in wanted - set(self._wds_by_path):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+            if wd < 0:
+                err = ctypes.get_errno()
+                if strict and err != errno.ENOENT:
+                    raise OSError(err, os.strerror(err), path)
+                if err != errno.ENOENT:
+                    logging.warning(
+                        f"フォルダを監視できませんでした: {path} ({os.strerror(err)})"
+                    )
+                continue
+            self._wds_by_path[path] = wd
+            self._paths_by_wd[wd] = path
+
+    def wait(self, timeout: float) -> List[Set[str]]:
+        """
+        最大 timeout 秒、変更を待つ。
+
+        Returns:
+            list[set[str]]: スナップショットごとの、変更のあったディレクトリのパス
+        """
+
+        changed = [set() for _ in self.snapshots]
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return changed
+
+        paths = set()
+        overflow = False
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size + name_len
+                if mask & _IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+                path = self._paths_by_wd.get(wd)
+                if path is None:
+                    continue
+                if mask & _IN_IGNORED:
+                    # 監視対象のディレクトリが削除された
+                    self._paths_by_wd.pop(wd, None)
+                    self._wds_by_path.pop(path, None)
+                paths.add(path)
+
+        for i, snapshot in enumerate(self.snapshots):
+            if overflow:
+                # 取りこぼしたイベントがあるため、すべて読み直す
+                changed[i].add(snapshot.src_base)
+                changed[i].update(snapshot.dirs)
+            else:
+                changed[i].update(p for p in paths if snapshot.owns(p))
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(snapshots: List[TreeSnapshot], use_inotify: bool = True):
+    """
+    Linux では inotify を、使えない場合はポーリングで変更を検出する監視オブジェクトを作る。
+    """
+
+    if use_inotify and sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(snapshots)
+            logging.info("inotify でフォルダを監視します")
+            return watcher
+        except OSError as e:
+            logging.warning(
+                f"inotify を使えないため、ポーリングでフォルダを監視します ({e})"
+            )
+    return PollingWatcher(snapshots)
+
+
+def watch_jobs(
+    config: dict,
+    rules: rule_engine.RuleEngine = None,
+    interval: float = DEFAULT_POLL_INTERVAL_SECONDS,
+    debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+    use_inotify: bool = True,
+    on_batch: Callable[[list, list], None] = None,
+    stop_event: threading.Event = None,
+    max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+):
+    """
+    全ジョブのTeamsフォルダを監視し、変更のあった納品対象だけを納品先にコピーし続ける。
+
+    最初に全体を走査して納品し、以降は変更のあったディレクトリだけを読み直す。
+    変更が続いている間は反映を待ち、debounce 秒変更がなければまとめて1回コピーする
+    (ただし最初の変更から max_delay 秒経った場合はその時点で反映する)。
+
+    Args:
+        config (dict): config_manager.load_config の戻り値
+        rules (rule_engine.RuleEngine): コンパイル済みのマッチングルール
+        interval (float): ポーリングの間隔 (秒)。inotify使用時は停止の確認間隔
+        debounce (float): 最後の変更から反映までの待ち時間 (秒)
+        use_inotify (bool): Linux で inotify を使うか。False の場合は常にポーリングする
+        on_batch: 反映のたびに (今回反映したジョブの JobResult のリスト,
+            全ジョブの最新の JobResult のリスト) を受け取る関数
+        stop_event (threading.Event): セットされると監視を終了する。省略時は中断されるまで続ける
+        max_delay (float): 変更が続く場合に反映を待つ最大秒数
+    """
+
+    if rules is None:
+        rules = rule_engine.RuleEngine.from_config(config)
+    jobs = config["jobs"]
+    snapshots = [TreeSnapshot(job["teams_root_path"], rules) for job in jobs]
+    for snapshot in snapshots:
+        snapshot.build()
+
+    pool = copy_executor.CopyPool(
+        config.get("copy_workers", config_manager.DEFAULT_COPY_WORKERS),
+        config.get("max_inflight_mb", config_manager.DEFAULT_MAX_INFLIGHT_MB)
+        * 1024
+        * 1024,
+    )
+    watcher = create_watcher(snapshots, use_inotify)
+    with pool, contextlib.closing(watcher):
+        # 監視開始時点の内容で一度納品する (走査済みのスナップショットを使い、走査し直さない)
+        # 同じ納品先ルートのジョブは、同名のファイルを先のジョブから納品する
+        shared_roots = file_processor.SharedDeliveryRoot.for_jobs(config, jobs)
+        latest = [
+            _deliver(config, job, rules, snapshot, None, pool, shared)
+            for job, snapshot, shared in zip(jobs, snapshots, shared_roots)
+        ]
+        for root in {shared.root for shared in shared_roots if shared is not None}:
+            root.finish()
+        _finish_batch(config, latest, latest, on_batch)
+        logging.info("--- フォルダの監視を開始しました (Ctrl+Cで終了) ---")
+
+        pending = [set() for _ in jobs]
+        first_change = last_change = None
+        while stop_event is None or not stop_event.is_set():
+            timeout = interval
+            if last_change is not None:
+                remaining = (
+                    min(last_change + debounce, first_change + max_delay)
+                    - time.monotonic()
+                )
+                timeout = max(0.0, min(interval, remaining))
+
+            changed = watcher.wait(timeout)
+            now = time.monotonic()
+            rescanned = False
+            for i, dir_paths in enumerate(changed):
+                if not dir_paths:
+                    continue
+                rescanned = True
+                affected = snapshots[i].rescan(dir_paths)
+                if affected:
+                    pending[i] |= affected
+                    last_change = now
+                    if first_change is None:
+                        first_change = now
+            if rescanned:
+                # 新しくできたディレクトリを監視対象に加える
+                watcher.sync()
+
+            if last_change is None:
+                continue
+            if now - last_change < debounce and now - first_change < max_delay:
+                continue
+
+            batch = []
+            for i, job in enumerate(jobs):
+                if pending[i]:
+                    latest[i] = _deliver(
+                        config,
+                        job,
+                        rules,
+                        snapshots[i],
+                        pending[i],
+                        pool,
+                        claimed=_claimed_by_other_jobs(i, shared_roots, latest),
+                    )
+                    batch.append(latest[i])
+                    pending[i] = set()
+            first_change = last_change = None
+            _finish_batch(config, batch, latest, on_batch)
+
+
+def _deliver(
+    config: dict,
+    job: dict,
+    rules: rule_engine.RuleEngine,
+    snapshot: TreeSnapshot,
+    dir_paths: Optional[Set[str]],
+    pool: copy_executor.CopyPool,
+    shared: file_processor.SharedRootJob = None,
+    claimed: Set[str] = frozenset(),
+) -> file_processor.JobResult:
+    """
+    1ジョブ分の変更を反映する。dir_paths が None の場合は全体を納品する。
+    ジョブが例外で失敗しても、監視は続ける。
+
+    全体の納品では shared で同じ納品先ルートのジョブと調整し、変更の反映では
+    同じ納品先ルートに他のジョブが納品済みのパス (claimed) を上書きしない。
+    """
+
+    job_config = file_processor.make_job_config(
+        config, job["teams_root_path"], job["delivery_root_path"], job["name"]
+    )
+    start = time.perf_counter()
+    try:
+        if dir_paths is None or job_config.get("delivery_format") == "zip":
+            # ZIPはファイル単位で更新できないため、スナップショット全体から作り直す
+            summary = file_processor.process_files(
+                job_config, rules, snapshot.records(), pool, shared=shared
+            )
+        else:
+            summary = file_processor.process_changes(
+                job_config,
+                rules,
+                snapshot.records(dir_paths),
+                dir_paths,
+                pool,
+                claimed,
+            )
+    except Exception as e:
+        logging.error(f"ジョブ {job['name'] or ''} の実行中にエラーが発生しました: {e}")
+        return file_processor.JobResult(
+            job["name"],
+            None,
+            time.perf_counter() - start,
+            e,
+            str(job["delivery_root_path"]),
+        )
+    return file_processor.JobResult(
+        job["name"],
+        summary,
+        time.perf_counter() - start,
+        None,
+        str(job["delivery_root_path"]),
+    )
+
+
+def _claimed_by_other_jobs(
+    i: int, shared_roots: list, latest: List[file_processor.JobResult]
+) -> Set[str]:
+    """i 番目のジョブと同じ納品先ルートに、他のジョブが納品済みのパス"""
+
+    claimed = set()
+    if shared_roots[i] is None:
+        return claimed
+    for j, result in enumerate(latest):
+        if (
+            j != i
+            and shared_roots[j] is not None
+            and shared_roots[j].root is shared_roots[i].root
+            and result.summary is not None
+        ):
+            claimed.update(entry.path for entry in result.summary.delivered)
+    return claimed
+
+
+def _finish_batch(config: dict, batch: list, latest: list, on_batch):
+    # チェックサムファイルは、反映しなかったジョブも含めた最新の納品内容で書き直す
+    if config.get("hash_files", False) and config.get("delivery_format") != "zip":
+        file_processor.write_checksum_files(
+            [result for result in latest if result.summary is not None]
+        )
+    if on_batch is not None:
+        on_batch(batch, latest)
+
+
+def _load_libc():
+    """
+    inotify の関数を持つ libc を読み込む。
+
+    Raises:
+        OSError: libc に inotify の関数がない場合。
+    """
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError(errno.ENOSYS, "inotify is not available")
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def _mtime_ns(path: str):
+    """更新日時 (ナノ秒)。存在しない場合はNone"""
+
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _stat(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+def _entry_stat(entry: os.DirEntry):
+    try:
+        st = entry.stat()
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns